@@ -0,0 +1,227 @@
+r"""
+Checkpoints for long computations.
+
+A :class:`Checkpoint` is a file on disk that holds the state of a
+computation. The state is saved periodically so that the computation can be
+resumed exactly where it stopped if the process dies.
+
+The flow of a straight-line trajectory can be run with
+:func:`checkpointed_flow`. Only a compact state is saved (see
+:meth:`~flatsurf.geometry.straight_line_trajectory.AbstractStraightLineTrajectory.checkpoint_state`):
+the label, the position and the direction of the point reached by the flow,
+the statistics and the number of remaining steps. The flow is resumed from
+this point without flowing again through the segments already done. The
+functions
+:func:`~flatsurf.geometry.saddle_connection.saddle_connections` and
+:func:`~flatsurf.geometry.direction_sweep.direction_sweep` accept a
+checkpoint as optional argument.
+
+EXAMPLES::
+
+    sage: from flatsurf import *
+    sage: from flatsurf.geometry.checkpoint import Checkpoint, checkpointed_flow
+    sage: from flatsurf.geometry.trajectory_statistics import TrajectoryStatistics
+    sage: O = translation_surfaces.regular_octagon()
+    sage: L = O.tangent_vector(0, (1,1), (33,45)).straight_line_trajectory(max_segments=10)
+    sage: c = Checkpoint(tmp_dir() + 'flow.sobj', interval=0)
+    sage: L, S = checkpointed_flow(c, L, 1000, TrajectoryStatistics())
+    sage: S
+    Statistics of 1000 segments
+
+The flow is resumed from the file when it exists::
+
+    sage: L1, S1 = checkpointed_flow(c, L, 1000, TrajectoryStatistics())
+    sage: S1
+    Statistics of 1000 segments
+    sage: c.remove()
+    sage: L1, S1 = checkpointed_flow(c, L1, 500, S1)
+    sage: S1
+    Statistics of 1500 segments
+    sage: L2 = O.tangent_vector(0, (1,1), (33,45)).straight_line_trajectory(max_segments=10)
+    sage: L2.flow(1500)
+    sage: L1.segments() == L2.segments() and L1.time_range() == L2.time_range()
+    True
+"""
+
+import os
+import time
+
+from sage.misc.persist import dumps, loads
+
+class Checkpoint(object):
+    r"""
+    A file holding the state of a computation.
+
+    INPUT:
+
+    - ``filename`` -- the name of the file
+
+    - ``interval`` -- the minimal number of seconds between two automatic
+      saves (see :meth:`update`)
+
+    EXAMPLES::
+
+        sage: from flatsurf.geometry.checkpoint import Checkpoint
+        sage: c = Checkpoint(tmp_dir() + 'state.sobj', interval=3600)
+        sage: c.exists()
+        False
+        sage: c.load() is None
+        True
+        sage: c.update([1, 2])
+        False
+        sage: c.save([1, 2])
+        sage: c.load()
+        [1, 2]
+        sage: c.remove()
+        sage: c.exists()
+        False
+    """
+    def __init__(self, filename, interval=60):
+        self._filename = filename
+        self._interval = interval
+        self._last_save = time.time()
+
+    def __repr__(self):
+        return "Checkpoint in {}".format(self._filename)
+
+    def filename(self):
+        r"""
+        Return the name of the file.
+        """
+        return self._filename
+
+    def exists(self):
+        r"""
+        Return whether a state has been saved in the file.
+        """
+        return os.path.exists(self._filename)
+
+    def load(self):
+        r"""
+        Return the saved state or ``None`` if there is none.
+        """
+        if not self.exists():
+            return None
+        with open(self._filename, 'rb') as f:
+            return loads(f.read())
+
+    def save(self, state):
+        r"""
+        Save ``state`` to the file.
+
+        The state is first written to a temporary file which then replaces
+        the file so that the previous state is kept if the process dies while
+        saving.
+        """
+        tmp = self._filename + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(dumps(state))
+        os.rename(tmp, self._filename)
+        self._last_save = time.time()
+
+    def update(self, state):
+        r"""
+        Save ``state`` if the last save is older than the interval of this
+        checkpoint and return whether it was saved.
+        """
+        if time.time() - self._last_save >= self._interval:
+            self.save(state)
+            return True
+        return False
+
+    def remove(self):
+        r"""
+        Remove the file.
+        """
+        if self.exists():
+            os.remove(self._filename)
+
+def checkpointed_flow(checkpoint, trajectory, steps, statistics=None, chunk_size=100, window=False):
+    r"""
+    Flow ``trajectory`` by ``steps`` segments (backward if ``steps`` is
+    negative) and return the pair ``(trajectory, statistics)``.
+
+    The triple made of the state of the trajectory (see
+    :meth:`~flatsurf.geometry.straight_line_trajectory.AbstractStraightLineTrajectory.checkpoint_state`),
+    the statistics and the number of remaining steps is saved in
+    ``checkpoint`` (see :meth:`Checkpoint.update`) every ``chunk_size`` steps
+    and at the end. If ``checkpoint`` already holds a state, the flow is
+    resumed from it on the surface of ``trajectory`` and the arguments
+    ``steps`` and ``statistics`` are ignored. The resumed trajectory only
+    starts with the last segment reached by the flow (the segments before are
+    counted as dropped, see
+    :meth:`~flatsurf.geometry.straight_line_trajectory.AbstractStraightLineTrajectory.dropped_segments`).
+
+    The flow stops early if the trajectory hits a singularity or closes up.
+
+    INPUT:
+
+    - ``checkpoint`` -- a :class:`Checkpoint`
+
+    - ``trajectory`` -- a straight-line trajectory
+
+    - ``steps`` -- an integer
+
+    - ``statistics`` -- optional statistics updated while flowing (see
+      :class:`~flatsurf.geometry.trajectory_statistics.TrajectoryStatistics`)
+
+    - ``chunk_size`` -- the number of steps between two attempts to save
+
+    - ``window`` -- if ``True``, the whole window of segments kept by the
+      trajectory is saved and it is flowed again when the state is loaded
+
+    EXAMPLES::
+
+        sage: from flatsurf import *
+        sage: from flatsurf.geometry.checkpoint import Checkpoint, checkpointed_flow
+        sage: t = translation_surfaces.square_torus()
+        sage: L = t.tangent_vector(0, (1/2,1/3), (1,2)).straight_line_trajectory()
+        sage: c = Checkpoint(tmp_dir() + 'flow.sobj')
+        sage: L, _ = checkpointed_flow(c, L, -100)
+        sage: L
+        Straight line trajectory made of 3 segments from (5/6, 0) in polygon 0 to (5/6, 1) in polygon 0
+        sage: L.is_closed()
+        True
+        sage: c.load()[2]
+        0
+
+    The saved state does not depend on the length of the trajectory::
+
+        sage: O = translation_surfaces.regular_octagon()
+        sage: L = O.tangent_vector(0, (1,1), (33,45)).straight_line_trajectory()
+        sage: c = Checkpoint(tmp_dir() + 'flow.sobj')
+        sage: L, _ = checkpointed_flow(c, L, 200)
+        sage: state, _, steps = c.load()
+        sage: state['num_segments'], state['dropped'], steps
+        (1, (200, 0), 0)
+        sage: L1, _ = checkpointed_flow(c, L, 200)
+        sage: L1.segment(0) == L.segment(-1)
+        True
+
+    With ``window`` the whole trajectory is restored::
+
+        sage: c.remove()
+        sage: L2, _ = checkpointed_flow(c, L, 10, window=True)
+        sage: L3, _ = checkpointed_flow(c, L, 10, window=True)
+        sage: L3.segments() == L2.segments()
+        True
+    """
+    state = checkpoint.load()
+    if state is not None:
+        state, statistics, steps = state
+        trajectory = trajectory.resume(state)
+
+    sign = 1 if steps >= 0 else -1
+    while steps:
+        n = sign * min(abs(steps), chunk_size)
+        i = 0 if sign == 1 else 1
+        before = trajectory.combinatorial_length() + trajectory.dropped_segments()[i]
+        trajectory.flow(n, statistics)
+        after = trajectory.combinatorial_length() + trajectory.dropped_segments()[i]
+        if after - before < abs(n):
+            steps = 0
+        else:
+            steps -= n
+        checkpoint.update((trajectory.checkpoint_state(sign == -1, window), statistics, steps))
+    checkpoint.save((trajectory.checkpoint_state(sign == -1, window), statistics, steps))
+    return trajectory, statistics
@@ -9,6 +9,9 @@ class ConeSurface(SimilaritySurface):
         r"""
         Return the set of angles around the vertices of the surface.
 
+        The angles are divided by `2\pi` and listed in the order of the
+        singularities of :meth:`vertex_index`.
+
         EXAMPLES::
 
             sage: import flatsurf.geometry.similarity_surface_generators as sfg
@@ -17,18 +20,4 @@ class ConeSurface(SimilaritySurface):
         """
         if not self.is_finite():
             raise NotImplementedError("the set of edges is infinite!")
-
-        edges = [pair for pair in self.edge_iterator()]
-        edges = set(edges)
-        angles = []
-        while edges:
-            p,e = edges.pop()
-            angle = self.polygon(p).angle(e)
-            pp,ee = self.opposite_edge(p,(e-1)%self.polygon(p).num_edges())
-            while pp != p or ee != e:
-                edges.remove((pp,ee))
-                angle += self.polygon(pp).angle(ee)
-                pp,ee = self.opposite_edge(pp,(ee-1)%self.polygon(pp).num_edges())
-            angles.append(angle)
-        return angles
-
+        return self.vertex_index().angles()
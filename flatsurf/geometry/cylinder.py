@@ -0,0 +1,353 @@
+r"""
+Cylinders of translation surfaces.
+
+In a completely periodic direction a translation surface decomposes into
+cylinders bounded by saddle connections. The decomposition is computed by
+chaining the flow maps of the polygons (see
+:class:`~flatsurf.geometry.directional_flow.DirectionalFlow`): the outgoing
+separatrices are followed until they reach a singularity which cuts the
+bottom edges of the polygons into intervals permuted by the flow. Each cycle
+of this permutation is a cylinder.
+
+EXAMPLES::
+
+    sage: from flatsurf import *
+    sage: O = translation_surfaces.regular_octagon()
+    sage: C = O.cylinder_decomposition((1,0))
+    sage: C
+    [Cylinder with holonomy (a + 2, 0) and area a + 1,
+     Cylinder with holonomy (a + 1, 0) and area a + 1]
+    sage: [c.modulus() for c in C]
+    [1/2*a - 1/2, a - 1]
+"""
+
+from bisect import bisect
+from collections import defaultdict
+
+from sage.structure.sage_object import SageObject
+from sage.rings.qqbar import AA
+
+from flatsurf.geometry.polygon import wedge_product
+
+class Cylinder(SageObject):
+    r"""
+    A cylinder in a translation surface.
+
+    It is represented by its core curve: the sequence of intervals
+    ``(p, e, x0, x1)`` on the bottom edges of the polygons that it crosses
+    (see :class:`~flatsurf.geometry.directional_flow.DirectionalFlow`).
+    """
+    def __init__(self, flow, intervals, holonomy, left_boundary, right_boundary):
+        self._flow = flow
+        self._intervals = intervals
+        self._holonomy = holonomy
+        self._left_boundary = left_boundary
+        self._right_boundary = right_boundary
+
+    def _repr_(self):
+        return "Cylinder with holonomy {} and area {}".format(self._holonomy, self.area())
+
+    def surface(self):
+        r"""
+        Return the underlying surface.
+        """
+        return self._flow.surface()
+
+    def direction(self):
+        r"""
+        Return the direction of the cylinder.
+        """
+        return self._flow.direction()
+
+    def intervals(self):
+        r"""
+        Return the list of intervals ``(p, e, x0, x1)`` on the bottom edges
+        crossed by the core curve of the cylinder.
+        """
+        return self._intervals
+
+    def labels(self):
+        r"""
+        Return the labels of the polygons crossed by the core curve of the
+        cylinder (in order).
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: s = translation_surfaces.mcmullen_L(1,1,1,1)
+            sage: [c.labels() for c in s.cylinder_decomposition((1,0))]
+            [[0], [1]]
+            sage: [c.labels() for c in s.cylinder_decomposition((0,1))]
+            [[0, 1], [0]]
+        """
+        return [p for p,_,_,_ in self._intervals]
+
+    def holonomy(self):
+        r"""
+        Return the holonomy of the core curve of the cylinder.
+        """
+        return self._holonomy
+
+    def _width(self):
+        r"""
+        Return the width of the cylinder measured in the transversal
+        coordinate of the flow maps (that is, multiplied by the norm of the
+        direction).
+        """
+        p,e,x0,x1 = self._intervals[0]
+        return x1 - x0
+
+    def _scaling(self):
+        r"""
+        Return the ratio between the holonomy and the direction.
+        """
+        h = self._holonomy
+        d = self._flow.direction()
+        return h[0]/d[0] if d[0] else h[1]/d[1]
+
+    def area(self):
+        r"""
+        Return the area of the cylinder.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: t = translation_surfaces.square_torus()
+            sage: t.cylinder_decomposition((2,3))[0].area()
+            1
+        """
+        return self._scaling() * self._width()
+
+    def modulus(self):
+        r"""
+        Return the modulus of the cylinder, that is its height divided by its
+        circumference.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: t = translation_surfaces.square_torus()
+            sage: t.cylinder_decomposition((2,3))[0].modulus()
+            1/13
+        """
+        d = self._flow.direction()
+        return self._width() / (self._scaling() * d.dot_product(d))
+
+    def circumference(self):
+        r"""
+        Return the circumference of the cylinder as an algebraic number.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: t = translation_surfaces.square_torus()
+            sage: c = t.cylinder_decomposition((2,3))[0]
+            sage: c.circumference()
+            3.605551275463990?
+            sage: c.circumference()**2 == 13
+            True
+        """
+        h = self._holonomy
+        return AA(h.dot_product(h)).sqrt()
+
+    def height(self):
+        r"""
+        Return the height of the cylinder (its width in the direction
+        orthogonal to its core curve) as an algebraic number.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: t = translation_surfaces.square_torus()
+            sage: c = t.cylinder_decomposition((2,3))[0]
+            sage: c.height() * c.circumference() == c.area()
+            True
+        """
+        d = self._flow.direction()
+        return AA(self._width()) / AA(d.dot_product(d)).sqrt()
+
+    def left_boundary(self):
+        r"""
+        Return the saddle connections on the boundary of the cylinder to the
+        left of the direction.
+        """
+        return self._left_boundary
+
+    def right_boundary(self):
+        r"""
+        Return the saddle connections on the boundary of the cylinder to the
+        right of the direction.
+        """
+        return self._right_boundary
+
+    def boundary(self):
+        r"""
+        Return the saddle connections on the boundary of the cylinder.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: t = translation_surfaces.square_torus()
+            sage: t.cylinder_decomposition((1,0))[0].boundary()
+            [Saddle connection with holonomy (1, 0) from (0, 0) to (0, 1),
+             Saddle connection with holonomy (1, 0) from (0, 0) to (0, 1)]
+        """
+        return self._left_boundary + self._right_boundary
+
+def cylinder_decomposition(surface, direction, limit=None):
+    r"""
+    Return the list of cylinders of the finite translation surface
+    ``surface`` in the direction ``direction``.
+
+    INPUT:
+
+    - ``surface`` -- a finite translation surface without free edges
+
+    - ``direction`` -- a vector
+
+    - ``limit`` -- an optional bound on the number of polygons crossed by
+      each separatrix. If not provided and the direction is not completely
+      periodic the computation does not terminate.
+
+    EXAMPLES::
+
+        sage: from flatsurf import *
+        sage: from flatsurf.geometry.cylinder import cylinder_decomposition
+        sage: t = translation_surfaces.square_torus()
+        sage: cylinder_decomposition(t, (2,3))
+        [Cylinder with holonomy (2, 3) and area 1]
+
+        sage: s = translation_surfaces.mcmullen_L(1,1,1,1)
+        sage: cylinder_decomposition(s, (1,0))
+        [Cylinder with holonomy (2, 0) and area 2, Cylinder with holonomy (1, 0) and area 1]
+        sage: C = cylinder_decomposition(s, (1,1))
+        sage: C
+        [Cylinder with holonomy (3, 3) and area 3]
+        sage: sum(len(c.left_boundary()) for c in C)
+        3
+        sage: sum(len(c.right_boundary()) for c in C)
+        3
+
+        sage: O = translation_surfaces.regular_octagon()
+        sage: K = O.base_ring()
+        sage: a = K.gen()
+        sage: sum(c.area() for c in cylinder_decomposition(O, (1,1+a)))
+        2*a + 2
+        sage: K.<sqrt2> = QuadraticField(2)
+        sage: cylinder_decomposition(t, (1,sqrt2), limit=50)
+        Traceback (most recent call last):
+        ...
+        ValueError: the direction is not completely periodic (or the limit is too small)
+
+        sage: w = translation_surfaces.infinite_staircase1().window(1)
+        sage: cylinder_decomposition(w, (1,1))
+        Traceback (most recent call last):
+        ...
+        ValueError: the surface has free edges
+    """
+    if surface.has_free_edges():
+        raise ValueError("the surface has free edges")
+
+    from flatsurf.geometry.directional_flow import DirectionalFlow
+    from flatsurf.geometry.saddle_connection import SaddleConnection
+
+    F = DirectionalFlow(surface, direction)
+    intervals = F.bottom_intervals()
+    zero = intervals[0][2].parent().zero()
+
+    # follow the outgoing separatrices, i.e. the flow from the vertices between
+    # two bottom edges of a polygon, and record the points where they cross the
+    # bottom edges
+    cuts = {(p,e): [] for p,e,_ in intervals}
+    saddle_connections = []
+    left = defaultdict(list)   # saddle connections on the left of (p, e, x0)
+    right = defaultdict(list)  # saddle connections on the right of (p, e, x1)
+    for p in surface.label_iterator():
+        bot = F.bottom_edges(p)
+        for i in range(1, len(bot)):
+            e = bot[i]
+            sc_index = len(saddle_connections)
+            left[(p, e, zero)].append(sc_index)
+            right[(p, bot[i-1], F.flow_map(p).length_bot(bot[i-1]))].append(sc_index)
+            holonomy = surface.vector_space().zero()
+            t = (p, e, zero)
+            n = 0
+            while True:
+                point0, e1, point1 = F.segment_endpoints(*t)
+                holonomy += point1 - point0
+                tt = F.forward_image(*t)
+                if tt[2].is_zero():
+                    break
+                t = tt
+                cuts[(t[0],t[1])].append(t[2])
+                left[t].append(sc_index)
+                right[t].append(sc_index)
+                n += 1
+                if limit is not None and n >= limit:
+                    raise ValueError("the direction is not completely periodic (or the limit is too small)")
+            q = t[0]
+            end = (q, (e1+1) % surface.polygon(q).num_edges())
+            saddle_connections.append(SaddleConnection(surface, (p, e), end, holonomy))
+
+    # the edges parallel to the direction are saddle connections on the right
+    # (resp. left) side of the polygons when they point forward (resp.
+    # backward)
+    d = F.direction()
+    parallel = {}
+    for p in surface.label_iterator():
+        poly = surface.polygon(p)
+        bot = F.bottom_edges(p)
+        T = F.flow_map(p)
+        for e in range(poly.num_edges()):
+            u = poly.edge(e)
+            if wedge_product(d, u):
+                continue
+            if d.dot_product(u) > 0:
+                pe = (p,e)
+                side = right[(p, bot[-1], T.length_bot(bot[-1]))]
+            else:
+                pe = surface.opposite_edge(p,e)
+                side = left[(p, bot[0], zero)]
+            if pe not in parallel:
+                pp,ee = pe
+                pol = surface.polygon(pp)
+                parallel[pe] = len(saddle_connections)
+                saddle_connections.append(SaddleConnection(surface, pe,
+                    (pp, (ee+1) % pol.num_edges()), pol.edge(ee)))
+            side.append(parallel[pe])
+
+    # the intervals between the cuts are permuted by the flow
+    for k in cuts:
+        cuts[k].sort()
+    pieces = {}
+    for p,e,l in intervals:
+        c = [zero] + cuts[(p,e)] + [l]
+        for i in range(len(c)-1):
+            pieces[(p,e,i)] = (c[i], c[i+1])
+
+    cylinders = []
+    done = set()
+    for p,e,l in intervals:
+        for i in range(len(cuts[(p,e)])+1):
+            if (p,e,i) in done:
+                continue
+            cycle = []
+            holonomy = surface.vector_space().zero()
+            lb = []
+            rb = []
+            k = (p,e,i)
+            while k not in done:
+                done.add(k)
+                pp,ee,j = k
+                x0,x1 = pieces[k]
+                cycle.append((pp,ee,x0,x1))
+                lb.extend(saddle_connections[n] for n in left.get((pp,ee,x0), ()))
+                rb.extend(saddle_connections[n] for n in right.get((pp,ee,x1), ()))
+                x = (x0+x1)/2
+                point0, _, point1 = F.segment_endpoints(pp, ee, x)
+                holonomy += point1 - point0
+                pp,ee,x = F.forward_image(pp, ee, x)
+                k = (pp, ee, bisect(cuts[(pp,ee)], x))
+            cylinders.append(Cylinder(F, cycle, holonomy, lb, rb))
+
+    return cylinders
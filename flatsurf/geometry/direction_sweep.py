@@ -0,0 +1,289 @@
+r"""
+Sweeping the straight-line flow over many directions.
+
+A *sweep* runs the same job on the straight-line trajectories starting from a
+fixed point in each direction of a list (or of any iterable). The job is a
+function that takes a tangent vector as argument. The jobs can be distributed
+over a pool of processes, in which case the surface and the job are sent once
+to each process and the results still come in the order of the directions.
+
+For the jobs to be sent to other processes they must be picklable. The
+classes :class:`ClosingJob`, :class:`StatisticsJob`,
+:class:`PeriodicOrbitJob` and :class:`CodingJob` cover the most common
+studies.
+
+EXAMPLES:
+
+The proportion of the directions ``(1,n)`` for which the trajectory from the
+point (1/2, 1/3) of the square closes within 10 segments::
+
+    sage: from flatsurf import *
+    sage: from flatsurf.geometry.direction_sweep import direction_sweep, ClosingJob
+    sage: t = translation_surfaces.square_torus()
+    sage: directions = [(1,n) for n in range(1,21)]
+    sage: res = list(direction_sweep(t, 0, (1/2,1/3), directions, ClosingJob(10)))
+    sage: res
+    [2, 3, 4, 5, 6, 7, 8, 9, 10, None, None, None, None, None, None, None, None, None, None, None]
+    sage: sum(1 for x in res if x is not None) / len(res)
+    9/20
+
+The same computation with two processes::
+
+    sage: res == list(direction_sweep(t, 0, (1/2,1/3), directions, ClosingJob(10), processes=2))
+    True
+"""
+
+from itertools import islice
+
+from flatsurf.geometry.trajectory_statistics import TrajectoryStatistics
+
+class ClosingJob(object):
+    r"""
+    Job returning the number of segments of the trajectory if it closes up
+    within ``steps`` segments and ``None`` otherwise (in particular when it
+    hits a singularity).
+
+    EXAMPLES::
+
+        sage: from flatsurf import *
+        sage: from flatsurf.geometry.direction_sweep import ClosingJob
+        sage: t = translation_surfaces.square_torus()
+        sage: ClosingJob(10)(t.tangent_vector(0, (1/2,1/2), (2,3)))
+        5
+        sage: ClosingJob(10)(t.tangent_vector(0, (1/2,1/2), (1,1))) is None
+        True
+    """
+    def __init__(self, steps):
+        self._steps = steps
+
+    def __call__(self, v):
+        traj = v.straight_line_trajectory()
+        traj.flow(self._steps - 1)
+        return traj.combinatorial_length() if traj.is_closed() else None
+
+class StatisticsJob(object):
+    r"""
+    Job returning the statistics (see
+    :class:`~flatsurf.geometry.trajectory_statistics.TrajectoryStatistics`)
+    of the first ``steps`` segments of the forward trajectory.
+
+    The statistics of the different directions can be added together.
+
+    EXAMPLES::
+
+        sage: from flatsurf import *
+        sage: from flatsurf.geometry.direction_sweep import direction_sweep, StatisticsJob
+        sage: s = translation_surfaces.mcmullen_L(1,1,1,1)
+        sage: res = list(direction_sweep(s, 0, (1/2,1/3), [(3,5), (5,3)], StatisticsJob(100)))
+        sage: res
+        [Statistics of 100 segments, Statistics of 100 segments]
+        sage: sum(res[1:], res[0]).polygon_hits()
+        {0: 124, 1: 76}
+    """
+    def __init__(self, steps, observables=None):
+        self._steps = steps
+        self._observables = observables
+
+    def __call__(self, v):
+        S = TrajectoryStatistics(self._observables)
+        S.add_trajectory(v.straight_line_trajectory(), self._steps)
+        return S
+
+class PeriodicOrbitJob(object):
+    r"""
+    Job returning the periodic orbit found by
+    :meth:`~flatsurf.geometry.straight_line_trajectory.StraightLineTrajectory.periodic_orbit`.
+
+    EXAMPLES::
+
+        sage: from flatsurf import *
+        sage: from flatsurf.geometry.direction_sweep import PeriodicOrbitJob
+        sage: t = translation_surfaces.square_torus()
+        sage: v = t.tangent_vector(0, (1/2,1/2), (1,2))
+        sage: PeriodicOrbitJob(10)(v)
+        (3, [(0, 2), (0, 1), (0, 2)], (1, 2))
+    """
+    def __init__(self, limit=None, alphabet=None):
+        self._limit = limit
+        self._alphabet = alphabet
+
+    def __call__(self, v):
+        return v.straight_line_trajectory().periodic_orbit(self._limit, self._alphabet)
+
+class CodingJob(object):
+    r"""
+    Job returning the list of the first letters of the coding of the
+    trajectory (see
+    :meth:`~flatsurf.geometry.straight_line_trajectory.AbstractStraightLineTrajectory.coding_iterator`).
+
+    EXAMPLES::
+
+        sage: from flatsurf import *
+        sage: from flatsurf.geometry.direction_sweep import direction_sweep, CodingJob
+        sage: t = translation_surfaces.square_torus()
+        sage: alphabet = {(0,0): 'a', (0,1): 'b', (0,2):'a', (0,3): 'b'}
+        sage: job = CodingJob(6, alphabet)
+        sage: [''.join(w) for w in direction_sweep(t, 0, (1/2,1/3), [(1,1),(2,1),(1,2)], job)]
+        ['abababa', 'bbabbab', 'aabaaba']
+    """
+    def __init__(self, steps, alphabet=None):
+        self._steps = steps
+        self._alphabet = alphabet
+
+    def __call__(self, v):
+        return list(v.straight_line_trajectory().coding_iterator(self._steps, self._alphabet))
+
+def compact_surface(surface):
+    r"""
+    Return a copy of ``surface`` that only stores its polygons and gluings.
+
+    This is the version of the surface sent to the worker processes in
+    :func:`direction_sweep`. Infinite surfaces are returned unchanged.
+
+    EXAMPLES::
+
+        sage: from flatsurf import *
+        sage: from flatsurf.geometry.direction_sweep import compact_surface
+        sage: O = translation_surfaces.regular_octagon()
+        sage: c = compact_surface(O)
+        sage: c
+        TranslationSurface built from 1 polygon
+        sage: loads(dumps(c)) == O
+        True
+    """
+    if not surface.is_finite():
+        return surface
+    from flatsurf.geometry.surface import Surface_polygons_and_gluings
+    return surface.__class__(Surface_polygons_and_gluings(surface))
+
+# surface and job shared with the worker processes (see direction_sweep)
+_worker_surface = None
+_worker_job = None
+
+def _init_worker(surface, job):
+    global _worker_surface, _worker_job
+    _worker_surface = surface
+    _worker_job = job
+
+def _worker_run(args):
+    label, point, directions = args
+    return [_worker_job(_worker_surface.tangent_vector(label, point, direction))
+            for direction in directions]
+
+def _sweep(surface, label, point, directions, job, processes, chunksize):
+    r"""
+    Iterator over the results of the sweep without checkpoint (see
+    :func:`direction_sweep`).
+    """
+    if processes is None:
+        for direction in directions:
+            yield job(surface.tangent_vector(label, point, direction))
+        return
+
+    from collections import deque
+    from multiprocessing import Pool
+
+    directions = iter(directions)
+    pool = Pool(processes, _init_worker, (compact_surface(surface), job))
+    try:
+        # at most two chunks per process are waiting to be computed
+        pending = deque()
+        while True:
+            while len(pending) < 2 * processes:
+                chunk = list(islice(directions, chunksize))
+                if not chunk:
+                    break
+                pending.append(pool.apply_async(_worker_run, ((label, point, chunk),)))
+            if not pending:
+                break
+            for res in pending.popleft().get():
+                yield res
+        pool.close()
+    finally:
+        # when the iteration is stopped early the remaining jobs are discarded
+        pool.terminate()
+        pool.join()
+
+def direction_sweep(surface, label, point, directions, job, processes=None, chunksize=1, checkpoint=None):
+    r"""
+    Iterator over the results of ``job`` on the tangent vectors based at
+    ``point`` in the polygon ``label`` with the directions ``directions``.
+
+    INPUT:
+
+    - ``surface`` -- a similarity surface
+
+    - ``label``, ``point`` -- the base point of the tangent vectors
+
+    - ``directions`` -- an iterable of vectors (it may be infinite)
+
+    - ``job`` -- a function that takes a tangent vector as argument
+
+    - ``processes`` -- if provided, the jobs are distributed over a pool of
+      that many processes. The compact version of the surface (see
+      :func:`compact_surface`) and the job are sent once to each process.
+      The results are yielded as soon as they are available, in the order of
+      ``directions``. Only a bounded number of directions are read in advance
+      from ``directions``.
+
+    - ``chunksize`` -- the number of directions sent at once to a process
+
+    - ``checkpoint`` -- an optional
+      :class:`~flatsurf.geometry.checkpoint.Checkpoint` where the list of the
+      results obtained so far is saved (see
+      :meth:`~flatsurf.geometry.checkpoint.Checkpoint.update`). If it
+      already holds some results, they are yielded first and the
+      corresponding directions are skipped so that ``directions`` must be the
+      same as for the interrupted sweep.
+
+    EXAMPLES::
+
+        sage: from flatsurf import *
+        sage: from flatsurf.geometry.direction_sweep import direction_sweep, PeriodicOrbitJob
+        sage: O = translation_surfaces.regular_octagon()
+        sage: a = O.base_ring().gen()
+        sage: directions = [(1,0), (1,1), (1,a+1), (1,a)]
+        sage: res = list(direction_sweep(O, 0, (1,1/2), directions, PeriodicOrbitJob(50)))
+        sage: [r[0] for r in res]
+        [2, 2, 2, 8]
+        sage: res == list(direction_sweep(O, 0, (1,1/2), directions, PeriodicOrbitJob(50), processes=2, chunksize=2))
+        True
+
+    The directions may come from an infinite generator::
+
+        sage: from itertools import count, islice
+        sage: it = direction_sweep(O, 0, (1,1/2), ((1,n) for n in count()), PeriodicOrbitJob(10), processes=2)
+        sage: [r is None for r in islice(it, 3)]
+        [False, False, True]
+
+    A sweep interrupted after three directions and resumed from its
+    checkpoint::
+
+        sage: from flatsurf.geometry.checkpoint import Checkpoint
+        sage: c = Checkpoint(tmp_dir() + 'sweep.sobj', interval=0)
+        sage: it = direction_sweep(O, 0, (1,1/2), directions, PeriodicOrbitJob(50), checkpoint=c)
+        sage: [r[0] for r in islice(it, 3)]
+        [2, 2, 2]
+        sage: len(c.load())
+        3
+        sage: res == list(direction_sweep(O, 0, (1,1/2), directions, PeriodicOrbitJob(50), checkpoint=c))
+        True
+        sage: len(c.load())
+        4
+    """
+    if checkpoint is None:
+        for res in _sweep(surface, label, point, directions, job, processes, chunksize):
+            yield res
+        return
+
+    results = checkpoint.load()
+    if results is None:
+        results = []
+    for res in results:
+        yield res
+    directions = islice(directions, len(results), None)
+    for res in _sweep(surface, label, point, directions, job, processes, chunksize):
+        results.append(res)
+        checkpoint.update(results)
+        yield res
+    checkpoint.save(results)
@@ -0,0 +1,505 @@
+r"""
+Straight-line flow in a fixed direction on a translation surface.
+
+The flow is encoded by the maps :meth:`ConvexPolygon.flow_map` of each
+polygon. A point of the surface on the boundary of a polygon is given by a
+triple ``(p, e, x)`` where ``p`` is a polygon label, ``e`` is an edge of ``p``
+crossed upward by the flow (a *bottom edge*) and ``x`` is the position of the
+point on this edge measured in the transversal coordinate used by
+:class:`~flatsurf.geometry.interval_exchange_transformation.FlowPolygonMap`.
+
+The flow stops at the edges that are not glued to any other edge (the *free
+edges*, see :meth:`~flatsurf.geometry.surface.Surface.opposite_edge`) as it
+does at the vertices.
+
+EXAMPLES::
+
+    sage: from flatsurf import *
+    sage: from flatsurf.geometry.directional_flow import DirectionalFlow
+    sage: t = translation_surfaces.square_torus()
+    sage: F = DirectionalFlow(t, (2,3))
+    sage: F
+    Flow in direction (2, 3) on TranslationSurface built from 1 polygon
+    sage: F.bottom_edges(0)
+    [3, 0]
+    sage: F.forward_image(0, 3, 1)
+    (0, 0, 1)
+"""
+
+from sage.structure.sage_object import SageObject
+from sage.modules.free_module_element import vector
+
+def _merge_pieces(pieces):
+    r"""
+    Merge the consecutive pieces ``(s, p, e, y0, y1)`` of the list ``pieces``
+    that lie on the same edge and are contiguous both in the source interval
+    and on the edge.
+
+    EXAMPLES::
+
+        sage: from flatsurf.geometry.directional_flow import _merge_pieces
+        sage: _merge_pieces([(0, 0, 1, 0, 1), (1, 0, 1, 1, 2), (2, 0, 1, 3, 4)])
+        [(0, 0, 1, 0, 2), (2, 0, 1, 3, 4)]
+    """
+    merged = []
+    for piece in pieces:
+        if merged:
+            s, p, e, y0, y1 = merged[-1]
+            if piece[1] == p and piece[2] == e and piece[3] == y1 and piece[0] == s + y1 - y0:
+                merged[-1] = (s, p, e, y0, piece[4])
+                continue
+        merged.append(piece)
+    return merged
+
+class DirectionalFlow(SageObject):
+    r"""
+    The straight-line flow in direction ``direction`` on the translation
+    surface ``surface``.
+
+    The flow maps of the polygons are computed once and cached.
+    """
+    def __init__(self, surface, direction):
+        self._s = surface
+        self._direction = vector(direction)
+        self._flow_maps = {}
+        self._exits = {}
+        self._entries = {}
+
+    def _repr_(self):
+        return "Flow in direction {} on {}".format(self._direction, self._s)
+
+    def surface(self):
+        r"""
+        Return the underlying surface.
+        """
+        return self._s
+
+    def direction(self):
+        r"""
+        Return the direction of the flow.
+        """
+        return self._direction
+
+    def flow_map(self, label):
+        r"""
+        Return the flow map of the polygon ``label`` (see
+        :meth:`~flatsurf.geometry.polygon.ConvexPolygon.flow_map`).
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: from flatsurf.geometry.directional_flow import DirectionalFlow
+            sage: t = translation_surfaces.square_torus()
+            sage: DirectionalFlow(t, (1,0)).flow_map(0)
+            Flow polygon map:
+             1
+             3
+            top lengths: [1]
+            bot lengths: [1]
+        """
+        try:
+            return self._flow_maps[label]
+        except KeyError:
+            T = self._flow_maps[label] = self._s.polygon(label).flow_map(self._direction)
+            return T
+
+    def _exit_table(self, p):
+        r"""
+        Return the list whose ``j``-th element is the edge ``(p', e')`` glued
+        to the ``j``-th atom of the top partition of the flow map of ``p`` (or
+        ``None`` if this edge is free).
+        """
+        try:
+            return self._exits[p]
+        except KeyError:
+            exits = self._exits[p] = [self._s.opposite_edge(p, e) for e in self.flow_map(p).top_labels()]
+            return exits
+
+    def _entry(self, p, e):
+        r"""
+        Return the pair ``(p', j)`` where ``(p', e')`` is the edge glued to
+        the edge ``e`` of ``p`` and ``j`` is the position of ``e'`` in the top
+        partition of the flow map of ``p'`` (or ``None`` if the edge ``e`` of
+        ``p`` is free).
+        """
+        try:
+            return self._entries[(p,e)]
+        except KeyError:
+            glued = self._s.opposite_edge(p, e)
+            if glued is None:
+                entry = None
+            else:
+                pp, ee = glued
+                entry = (pp, self.flow_map(pp).top_index(ee))
+            self._entries[(p,e)] = entry
+            return entry
+
+    def _glued_edge(self, p, e):
+        r"""
+        Return the edge glued to the edge ``e`` of the polygon ``p`` and raise
+        a ``ValueError`` if this edge is free.
+        """
+        glued = self._s.opposite_edge(p, e)
+        if glued is None:
+            raise ValueError("edge {} of polygon {} is free".format(e, p))
+        return glued
+
+    def bottom_edges(self, label):
+        r"""
+        Return the list of edges of the polygon ``label`` crossed upward by the
+        flow (from left to right with respect to the direction).
+        """
+        return self.flow_map(label).bot_labels()
+
+    def bottom_intervals(self):
+        r"""
+        Return the list of triples ``(p, e, length)`` of bottom edges of a
+        finite surface together with their transversal lengths.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: from flatsurf.geometry.directional_flow import DirectionalFlow
+            sage: t = translation_surfaces.square_torus()
+            sage: DirectionalFlow(t, (2,3)).bottom_intervals()
+            [(0, 3, 2), (0, 0, 3)]
+        """
+        if not self._s.is_finite():
+            raise ValueError("the surface must be finite")
+        return [(p, e, self.flow_map(p).length_bot(e))
+                for p in self._s.label_iterator()
+                for e in self.bottom_edges(p)]
+
+    def forward_image(self, p, e, x):
+        r"""
+        Return the point ``(p', e', x')`` where the flow starting from ``(p, e,
+        x)`` enters the next polygon.
+
+        If the flow hits a vertex, the output has ``x' = 0``. If the flow
+        leaves the polygon through a free edge, the output is ``None``.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: from flatsurf.geometry.directional_flow import DirectionalFlow
+            sage: t = translation_surfaces.square_torus()
+            sage: F = DirectionalFlow(t, (2,3))
+            sage: F.forward_image(0, 3, 1)
+            (0, 0, 1)
+            sage: F.forward_image(0, 0, 2)
+            (0, 3, 1)
+
+        The point ``(0, 0, 1)`` flows into the vertex at the top right corner
+        of the square::
+
+            sage: F.forward_image(0, 0, 1)
+            (0, 3, 0)
+
+        The vertical edges of the square ``1`` of a window of the infinite
+        staircase are free::
+
+            sage: w = translation_surfaces.infinite_staircase1().window(1)
+            sage: w.opposite_edge(1, 1) is None
+            True
+            sage: F = DirectionalFlow(w, (1,0))
+            sage: F.forward_image(0, 3, 1/2)
+            (2, 3, 1/2)
+            sage: F.forward_image(1, 3, 1/2) is None
+            True
+            sage: F.backward_image(1, 3, 1/2) is None
+            True
+        """
+        T = self.flow_map(p)
+        j, x = T.forward_image_by_index(T.bot_index(e), x)
+        glued = self._exit_table(p)[j]
+        if glued is None:
+            return None
+        p, e = glued
+        return (p, e, x)
+
+    def backward_image(self, p, e, x):
+        r"""
+        Return the preimage of ``(p, e, x)`` under :meth:`forward_image` (or
+        ``None`` if the edge ``e`` of ``p`` is free).
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: from flatsurf.geometry.directional_flow import DirectionalFlow
+            sage: t = translation_surfaces.square_torus()
+            sage: F = DirectionalFlow(t, (2,3))
+            sage: F.backward_image(*F.forward_image(0, 3, 1/2))
+            (0, 3, 1/2)
+        """
+        entry = self._entry(p, e)
+        if entry is None:
+            return None
+        p, i = entry
+        T = self.flow_map(p)
+        j, x = T.backward_image_by_index(i, x)
+        return (p, T.bot_label(j), x)
+
+    def forward_step(self, p, e, x):
+        r"""
+        Return the quadruple ``(e1, p', e', x')`` where ``e1`` is the edge
+        through which the flow starting from ``(p, e, x)`` leaves the polygon
+        ``p`` and ``(p', e', x')`` is its :meth:`forward_image`. If the edge
+        ``e1`` is free, both ``p'`` and ``e'`` are ``None``.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: from flatsurf.geometry.directional_flow import DirectionalFlow
+            sage: t = translation_surfaces.square_torus()
+            sage: F = DirectionalFlow(t, (2,3))
+            sage: F.forward_step(0, 3, 1)
+            (2, 0, 0, 1)
+        """
+        T = self.flow_map(p)
+        j, x = T.forward_image_by_index(T.bot_index(e), x)
+        glued = self._exit_table(p)[j]
+        if glued is None:
+            return (T.top_label(j), None, None, x)
+        pp, ee = glued
+        return (T.top_label(j), pp, ee, x)
+
+    def segment_endpoints(self, p, e, x):
+        r"""
+        Return the triple ``(point0, e1, point1)`` where ``point0`` and
+        ``point1`` are the coordinates of the endpoints in the polygon ``p``
+        of the segment of flow starting from ``(p, e, x)`` and ``e1`` is the
+        edge through which it leaves the polygon.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: from flatsurf.geometry.directional_flow import DirectionalFlow
+            sage: t = translation_surfaces.square_torus()
+            sage: F = DirectionalFlow(t, (2,3))
+            sage: F.segment_endpoints(0, 0, 1/2)
+            ((1/6, 0), 2, (5/6, 1))
+        """
+        T = self.flow_map(p)
+        i = T.bot_index(e)
+        j, x1 = T.forward_image_by_index(i, x)
+        e1 = T.top_label(j)
+        poly = self._s.polygon(p)
+
+        l0 = T.length_bot_by_index(i)
+        l1 = T.length_top_by_index(j)
+
+        point0 = poly.vertex(e) + poly.edge(e) * x/l0
+        point1 = poly.vertex(e1) + poly.edge(e1) * (l1-x1)/l1
+        return (point0, e1, point1)
+
+    def forward_interval_image(self, p, e, x0, x1):
+        r"""
+        Return the image of the interval ``[x0, x1]`` of the bottom edge ``e``
+        of the polygon ``p`` in the next polygons as a list of quadruples
+        ``(p', e', y0, y1)``.
+
+        The interval is cut exactly at the points whose trajectory hits a
+        vertex of ``p``. The images are sorted as the points of ``[x0, x1]``.
+        A ``ValueError`` is raised if some part of the interval leaves ``p``
+        through a free edge.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: from flatsurf.geometry.directional_flow import DirectionalFlow
+            sage: t = translation_surfaces.square_torus()
+            sage: F = DirectionalFlow(t, (2,3))
+            sage: F.forward_interval_image(0, 0, 0, 3)
+            [(0, 0, 2, 3), (0, 3, 0, 2)]
+        """
+        images = []
+        for ee, y0, y1 in self.flow_map(p).forward_interval_image(e, x0, x1):
+            pp, ee = self._glued_edge(p, ee)
+            images.append((pp, ee, y0, y1))
+        return images
+
+    def flow_interval(self, p, e, x0, x1, steps=1, stop=None):
+        r"""
+        Push the interval ``[x0, x1]`` of the bottom edge ``e`` of the polygon
+        ``p`` through the polygons.
+
+        The interval is handled as a whole: it is cut exactly at the points
+        whose trajectory hits a vertex and the pieces that become adjacent
+        again after a vertex (e.g. a marked point) are merged.
+
+        INPUT:
+
+        - ``p``, ``e``, ``x0``, ``x1`` -- the initial interval
+
+        - ``steps`` -- the number of polygons crossed by each piece (if
+          ``None``, the pieces are pushed until they all reach ``stop``)
+
+        - ``stop`` -- an optional set of pairs ``(label, edge)`` of bottom
+          edges. The pieces that arrive on these edges are not pushed further.
+
+        OUTPUT: the list of pieces ``(s, p', e', y0, y1)`` sorted by ``s``.
+        Such piece means that the subinterval ``[s, s + y1 - y0]`` of ``[x0,
+        x1]`` is sent to the interval ``[y0, y1]`` of the edge ``e'`` of
+        ``p'``.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: from flatsurf.geometry.directional_flow import DirectionalFlow
+            sage: t = translation_surfaces.square_torus()
+            sage: F = DirectionalFlow(t, (2,3))
+            sage: F.flow_interval(0, 0, 0, 3)
+            [(0, 0, 0, 2, 3), (1, 0, 3, 0, 2)]
+            sage: F.flow_interval(0, 0, 0, 3, steps=None, stop=[(0,0)])
+            [(0, 0, 0, 2, 3), (1, 0, 0, 0, 2)]
+
+        The four squares of this torus meet at marked points. The interval is
+        cut by a marked point and its two pieces meet again after three
+        steps::
+
+            sage: S = SymmetricGroup(4)
+            sage: o = translation_surfaces.origami(S('(1,2)(3,4)'), S('(1,3)(2,4)'))
+            sage: F = DirectionalFlow(o, (1,2))
+            sage: F.flow_interval(1, 0, 0, 2)
+            [(0, 3, 0, 1, 2), (1, 2, 3, 0, 1)]
+            sage: F.flow_interval(1, 0, 0, 2, 2)
+            [(0, 4, 3, 0, 1), (1, 4, 0, 0, 1)]
+            sage: F.flow_interval(1, 0, 0, 2, 3)
+            [(0, 2, 0, 0, 2)]
+        """
+        if steps is None and stop is None:
+            raise ValueError("either steps or stop must be provided")
+        stop = frozenset() if stop is None else frozenset(stop)
+        done = []
+        pieces = [(x0, p, e, x0, x1)]
+        n = 0
+        while pieces and (steps is None or n < steps):
+            new_pieces = []
+            for s, p, e, y0, y1 in pieces:
+                for pp, ee, z0, z1 in self.forward_interval_image(p, e, y0, y1):
+                    piece = (s, pp, ee, z0, z1)
+                    if (pp, ee) in stop:
+                        done.append(piece)
+                    else:
+                        new_pieces.append(piece)
+                    s += z1 - z0
+            pieces = _merge_pieces(new_pieces)
+            n += 1
+        done.extend(pieces)
+        done.sort(key=lambda piece: piece[0])
+        return _merge_pieces(done)
+
+    def transversal(self, edges=None):
+        r"""
+        Return the list of triples ``(p, e, length)`` of bottom edges that form
+        the transversal given by ``edges``.
+
+        INPUT:
+
+        - ``edges`` -- an optional list of pairs ``(label, edge)``. Edges
+          crossed downward by the flow are replaced by the edges they are glued
+          to. If not provided, all the bottom edges of the surface are used.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: from flatsurf.geometry.directional_flow import DirectionalFlow
+            sage: t = translation_surfaces.square_torus()
+            sage: F = DirectionalFlow(t, (2,3))
+            sage: F.transversal([(0,2)])
+            [(0, 0, 3)]
+        """
+        if edges is None:
+            return self.bottom_intervals()
+        transversal = []
+        for p,e in edges:
+            if e not in self.bottom_edges(p):
+                pp,ee = self._glued_edge(p,e)
+                if ee not in self.bottom_edges(pp):
+                    raise ValueError("edge {} of polygon {} is parallel to the flow".format(e, p))
+                p,e = pp,ee
+            if any(q == p and f == e for q,f,_ in transversal):
+                raise ValueError("edge {} of polygon {} appears twice in the transversal".format(e, p))
+            transversal.append((p, e, self.flow_map(p).length_bot(e)))
+        return transversal
+
+    def first_return_map(self, edges=None, limit=None):
+        r"""
+        Return the first return map of the flow on the transversal made of the
+        edges ``edges`` as an interval exchange transformation.
+
+        The domain of the interval exchange transformation is the
+        concatenation of the edges of :meth:`transversal` in this order, each
+        of them being measured in the transversal coordinate of the flow maps.
+
+        INPUT:
+
+        - ``edges`` -- an optional list of pairs ``(label, edge)`` (see
+          :meth:`transversal`)
+
+        - ``limit`` -- an optional bound on the number of polygons crossed
+          before returning to the transversal. If not provided and some
+          trajectory does not come back, the computation does not terminate.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: from flatsurf.geometry.directional_flow import DirectionalFlow
+            sage: t = translation_surfaces.square_torus()
+            sage: F = DirectionalFlow(t, (2,3))
+            sage: F.first_return_map([(0,0)])
+            Interval exchange transformation:
+             0 1
+             1 0
+            lengths: [1, 2]
+
+        On the regular octagon, the first return map on the horizontal edge is
+        an interval exchange transformation on four intervals::
+
+            sage: O = translation_surfaces.regular_octagon()
+            sage: F = DirectionalFlow(O, (1,2))
+            sage: T = F.first_return_map([(0,0)])
+            sage: T
+            Interval exchange transformation:
+             0 1 2 3
+             3 2 1 0
+            lengths: [-1/2*a + 2, a - 1, 3/2*a - 2, -2*a + 3]
+            sage: T.length() == F.transversal([(0,0)])[0][2]
+            True
+
+        Edges parallel to the flow are not transversal::
+
+            sage: F = DirectionalFlow(t, (1,0))
+            sage: F.first_return_map([(0,0)])
+            Traceback (most recent call last):
+            ...
+            ValueError: edge 0 of polygon 0 is parallel to the flow
+
+        Some points of the horizontal edge of the torus cross two polygons
+        before coming back::
+
+            sage: F = DirectionalFlow(t, (2,3))
+            sage: F.first_return_map([(0,0)], limit=1)
+            Traceback (most recent call last):
+            ...
+            ValueError: some trajectory does not come back to the transversal before the limit
+        """
+        from flatsurf.geometry.interval_exchange_transformation import interval_exchange_from_pieces
+
+        transversal = self.transversal(edges)
+        start = {}
+        x = transversal[0][2].parent().zero()
+        for p,e,l in transversal:
+            start[(p,e)] = x
+            x += l
+
+        # push each edge of the transversal through the polygons until all the
+        # pieces are back
+        pieces = []
+        for p,e,l in transversal:
+            for s, pp, ee, y0, y1 in self.flow_interval(p, e, x.parent().zero(), l, limit, start):
+                if (pp,ee) not in start:
+                    raise ValueError("some trajectory does not come back to the transversal before the limit")
+                pieces.append((start[(p,e)] + s, y1 - y0, start[(pp,ee)] + y0))
+
+        return interval_exchange_from_pieces(x.parent(), pieces)
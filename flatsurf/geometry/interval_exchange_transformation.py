@@ -1,3 +1,9 @@
+r"""
+Interval exchange transformations and the flow maps of polygons.
+"""
+
+from bisect import bisect
+
 from sage.structure.sage_object import SageObject
 
 class FlowPolygonMap(SageObject):
@@ -59,45 +65,80 @@ class FlowPolygonMap(SageObject):
         if len(self._top_labels) != len(self._top_labels_to_index):
             raise ValueError("non unique labels in top: {}".format(top_labels))
 
-        self._bot_lengths = map(ring,bot_lengths)
-        self._top_lengths = map(ring,top_lengths)
+        self._bot_lengths = [ring(x) for x in bot_lengths]
+        self._top_lengths = [ring(x) for x in top_lengths]
 
+        # cumulative offsets of the atoms: the atom i of the bottom (resp.
+        # top) partition is [self._bot_offsets[i], self._bot_offsets[i+1]]
+        self._bot_offsets = [ring.zero()]
+        for x in self._bot_lengths:
+            self._bot_offsets.append(self._bot_offsets[-1] + x)
+        self._top_offsets = [ring.zero()]
+        for x in self._top_lengths:
+            self._top_offsets.append(self._top_offsets[-1] + x)
 
-        # forward image of intervals
-        it = 0
-        lt = x1 = top_lengths[it]
-        self._forward_images = []
-        for ib in range(len(bot_lengths)):
-            lenb = bot_lengths[ib]
-            self._forward_images.append((it,lt-x1))
+    def bot_index(self, i):
+        r"""
+        Return the position of the label ``i`` in the bottom partition.
 
-            while lenb and lenb >= x1:
-                lenb -= x1
-                it += 1
-                if it < len(top_lengths):
-                    lt = x1 = top_lengths[it]
-                else:
-                    lt = ring.zero()
-            if lenb:
-                x1 -= lenb
-
-        # backward image of intervals
-        ib = 0
-        lb = x1 = bot_lengths[ib]
-        self._backward_images = []
-        for it in range(len(top_lengths)):
-            lent = top_lengths[it]
-            self._backward_images.append((ib,lb-x1))
-
-            while lent and lent >= x1:
-                lent -= x1
-                ib += 1
-                if ib < len(bot_lengths):
-                    lb = x1 = bot_lengths[ib]
-                else:
-                    lb = ring.zero()
-            if lent:
-                x1 -= lent
+        EXAMPLES::
+
+            sage: from flatsurf.geometry.interval_exchange_transformation import FlowPolygonMap
+            sage: T = FlowPolygonMap(QQ, [0,1,2], [2,3,1], [2,1,0], [1,3,2])
+            sage: T.bot_index(2)
+            2
+            sage: T.top_index(2)
+            0
+        """
+        return self._bot_labels_to_index[i]
+
+    def top_index(self, i):
+        r"""
+        Return the position of the label ``i`` in the top partition.
+        """
+        return self._top_labels_to_index[i]
+
+    def bot_labels(self):
+        r"""
+        Return the list of the labels of the bottom partition.
+
+        EXAMPLES::
+
+            sage: from flatsurf.geometry.interval_exchange_transformation import FlowPolygonMap
+            sage: T = FlowPolygonMap(QQ, [0,1,2], [2,3,1], [2,1,0], [1,3,2])
+            sage: T.bot_labels()
+            [0, 1, 2]
+            sage: T.top_labels()
+            [2, 1, 0]
+        """
+        return list(self._bot_labels)
+
+    def top_labels(self):
+        r"""
+        Return the list of the labels of the top partition.
+        """
+        return list(self._top_labels)
+
+    def bot_label(self, i):
+        r"""
+        Return the label of the ``i``-th atom of the bottom partition.
+
+        EXAMPLES::
+
+            sage: from flatsurf.geometry.interval_exchange_transformation import FlowPolygonMap
+            sage: T = FlowPolygonMap(QQ, [0,1,2], [2,3,1], [2,1,0], [1,3,2])
+            sage: T.bot_label(0)
+            0
+            sage: T.top_label(0)
+            2
+        """
+        return self._bot_labels[i]
+
+    def top_label(self, i):
+        r"""
+        Return the label of the ``i``-th atom of the top partition.
+        """
+        return self._top_labels[i]
 
     def length_bot(self, i):
         i = self._bot_labels_to_index[i]
@@ -107,6 +148,27 @@ class FlowPolygonMap(SageObject):
         i = self._top_labels_to_index[i]
         return self._top_lengths[i]
 
+    def length_bot_by_index(self, i):
+        r"""
+        Return the length of the ``i``-th atom of the bottom partition.
+
+        EXAMPLES::
+
+            sage: from flatsurf.geometry.interval_exchange_transformation import FlowPolygonMap
+            sage: T = FlowPolygonMap(QQ, [0,1,2], [2,3,1], [2,1,0], [1,3,2])
+            sage: T.length_bot_by_index(1)
+            3
+            sage: T.length_top_by_index(1)
+            3
+        """
+        return self._bot_lengths[i]
+
+    def length_top_by_index(self, i):
+        r"""
+        Return the length of the ``i``-th atom of the top partition.
+        """
+        return self._top_lengths[i]
+
     def _repr_(self):
         s = ["Flow polygon map:"]
         s.append(" " + " ".join(str(x) for x in self._top_labels))
@@ -132,17 +194,63 @@ class FlowPolygonMap(SageObject):
             (3, 0)
         """
         i = self._bot_labels_to_index[i]
+        j, x = self.forward_image_by_index(i, x)
+        return (self._top_labels[j], x)
+
+    def forward_image_by_index(self, i, x):
+        r"""
+        Return the forward image of the point ``x`` in the ``i``-th atom of
+        the bottom partition as a pair ``(j, y)`` where ``j`` is the position
+        of the atom in the top partition.
+
+        EXAMPLES::
+
+            sage: from flatsurf.geometry.interval_exchange_transformation import FlowPolygonMap
+            sage: T = FlowPolygonMap(QQ, [0,1], [2,1], [2,3,4], [1,1,1])
+            sage: T.forward_image_by_index(0, 1)
+            (1, 0)
+            sage: T.forward_image_by_index(1, 1/2)
+            (2, 1/2)
+        """
         if x < self._ring.zero() or x > self._bot_lengths[i]:
             raise ValueError("x = {} is out of the interval".format(x))
-        j,y = self._forward_images[i]
-        if x+y < self._top_lengths[j]:
-            return (self._top_labels[j], x+y)
-        x -= self._top_lengths[j]-y
-        j += 1
-        while x > self._top_lengths[j]:
-            x -= self._top_lengths[j]
+        x += self._bot_offsets[i]
+        j = bisect(self._top_offsets, x, 0, len(self._top_lengths)) - 1
+        return (j, x - self._top_offsets[j])
+
+    def forward_interval_image(self, i, x0, x1):
+        r"""
+        Return the image of the interval ``[x0, x1]`` of the bottom atom ``i``
+        as a list of triples ``(j, y0, y1)`` where ``[y0, y1]`` is an interval
+        in the top atom ``j``.
+
+        The interval is cut exactly at the singularities it contains.
+
+        EXAMPLES::
+
+            sage: from flatsurf.geometry.interval_exchange_transformation import FlowPolygonMap
+            sage: T = FlowPolygonMap(QQ, [0,1,2], [2,3,1], [2,1,0], [1,3,2])
+            sage: T.forward_interval_image(0, 0, 2)
+            [(2, 0, 1), (1, 0, 1)]
+            sage: T.forward_interval_image(1, 1/2, 3)
+            [(1, 3/2, 3), (0, 0, 1)]
+            sage: T.forward_interval_image(2, 0, 1)
+            [(0, 1, 2)]
+        """
+        i = self._bot_labels_to_index[i]
+        if x0 < self._ring.zero() or x1 > self._bot_lengths[i] or x0 >= x1:
+            raise ValueError("[{}, {}] is not a subinterval".format(x0, x1))
+        j, y0 = self.forward_image_by_index(i, x0)
+        x1 += self._bot_offsets[i]
+        images = []
+        while True:
+            y1 = x1 - self._top_offsets[j]
+            if y1 <= self._top_lengths[j]:
+                images.append((self._top_labels[j], y0, y1))
+                return images
+            images.append((self._top_labels[j], y0, self._top_lengths[j]))
             j += 1
-        return (self._top_labels[j],x)
+            y0 = self._ring.zero()
 
     def backward_image(self, i, x):
         r"""
@@ -186,14 +294,266 @@ class FlowPolygonMap(SageObject):
 
         """
         i = self._top_labels_to_index[i]
+        j, x = self.backward_image_by_index(i, x)
+        return (self._bot_labels[j], x)
+
+    def backward_image_by_index(self, i, x):
+        r"""
+        Return the backward image of the point ``x`` in the ``i``-th atom of
+        the top partition as a pair ``(j, y)`` where ``j`` is the position of
+        the atom in the bottom partition.
+        """
         if x < self._ring.zero() or x > self._top_lengths[i]:
             raise ValueError("x = {} is out of the interval".format(x))
-        j,y = self._backward_images[i]
-        if x+y < self._bot_lengths[j]:
-            return (self._bot_labels[j], x+y)
-        x -= self._bot_lengths[j]-y
-        j += 1
-        while x > self._bot_lengths[j]:
-            x -= self._bot_lengths[j]
-            j += 1
-        return (self._bot_labels[j],x)
+        x += self._top_offsets[i]
+        j = bisect(self._bot_offsets, x, 0, len(self._bot_lengths)) - 1
+        return (j, x - self._bot_offsets[j])
+
+class IntervalExchangeTransformation(SageObject):
+    r"""
+    An interval exchange transformation.
+
+    The intervals are labeled ``0``, ``1``, ..., ``n-1`` in the order they
+    appear in the domain. The interval ``i`` has length ``lengths[i]`` and is
+    translated so that it becomes the ``permutation[i]``-th interval of the
+    image.
+
+    EXAMPLES::
+
+        sage: from flatsurf.geometry.interval_exchange_transformation import IntervalExchangeTransformation
+        sage: K.<sqrt2> = NumberField(x^2 - 2, embedding=AA(2).sqrt())
+        sage: T = IntervalExchangeTransformation(K, [1, sqrt2, 2], [2, 0, 1])
+        sage: T
+        Interval exchange transformation:
+         0 1 2
+         1 2 0
+        lengths: [1, sqrt2, 2]
+        sage: T(0)
+        sqrt2 + 2
+        sage: T(1)
+        0
+        sage: T.inverse()(T(1/2))
+        1/2
+    """
+    def __init__(self, ring, lengths, permutation):
+        r"""
+        INPUT:
+
+        - ``ring`` -- the base ring for the lengths of the intervals
+
+        - ``lengths`` -- the lengths of the intervals
+
+        - ``permutation`` -- the list of the positions of the intervals in the
+          image
+        """
+        n = len(lengths)
+        if sorted(permutation) != list(range(n)):
+            raise ValueError("invalid permutation: {}".format(permutation))
+        self._ring = ring
+        self._lengths = [ring(x) for x in lengths]
+        if any(x <= ring.zero() for x in self._lengths):
+            raise ValueError("lengths must be positive")
+        self._permutation = list(permutation)
+
+        self._top = [ring.zero()]
+        for x in self._lengths:
+            self._top.append(self._top[-1] + x)
+        inv = [None] * n
+        for i,j in enumerate(self._permutation):
+            inv[j] = i
+        bot = [ring.zero()]
+        for i in inv:
+            bot.append(bot[-1] + self._lengths[i])
+        self._bot = [bot[j] for j in self._permutation]
+
+    def _repr_(self):
+        inv = [None] * len(self._permutation)
+        for i,j in enumerate(self._permutation):
+            inv[j] = i
+        s = ["Interval exchange transformation:"]
+        s.append(" " + " ".join(str(i) for i in range(len(inv))))
+        s.append(" " + " ".join(str(i) for i in inv))
+        s.append("lengths: {}".format(self._lengths))
+        return "\n".join(s)
+
+    def __eq__(self, other):
+        return isinstance(other, IntervalExchangeTransformation) and \
+               self._lengths == other._lengths and \
+               self._permutation == other._permutation
+
+    def __ne__(self, other):
+        return not self == other
+
+    def base_ring(self):
+        r"""
+        Return the ring of the lengths.
+        """
+        return self._ring
+
+    def num_intervals(self):
+        r"""
+        Return the number of intervals.
+        """
+        return len(self._lengths)
+
+    def lengths(self):
+        r"""
+        Return the list of lengths of the intervals.
+        """
+        return self._lengths
+
+    def length(self):
+        r"""
+        Return the length of the domain.
+        """
+        return self._top[-1]
+
+    def permutation(self):
+        r"""
+        Return the list of the positions of the intervals in the image.
+        """
+        return self._permutation
+
+    def __call__(self, x):
+        r"""
+        Return the image of ``x``.
+
+        The map is continuous on the right so that the image of the left
+        endpoint of an interval is the left endpoint of its image.
+        """
+        x = self._ring(x)
+        if x < self._ring.zero() or x >= self._top[-1]:
+            raise ValueError("x = {} is out of the interval".format(x))
+        i = bisect(self._top, x) - 1
+        return x - self._top[i] + self._bot[i]
+
+    def inverse(self):
+        r"""
+        Return the inverse of this interval exchange transformation.
+
+        EXAMPLES::
+
+            sage: from flatsurf.geometry.interval_exchange_transformation import IntervalExchangeTransformation
+            sage: T = IntervalExchangeTransformation(QQ, [1, 2, 3], [1, 2, 0])
+            sage: T.inverse()
+            Interval exchange transformation:
+             0 1 2
+             1 2 0
+            lengths: [3, 1, 2]
+            sage: all(T.inverse()(T(x)) == x for x in range(6))
+            True
+        """
+        inv = [None] * len(self._permutation)
+        for i,j in enumerate(self._permutation):
+            inv[j] = i
+        return IntervalExchangeTransformation(self._ring,
+                [self._lengths[i] for i in inv], inv)
+
+    def orbit(self, x, n):
+        r"""
+        Return the list of the first ``n`` points of the orbit of ``x``.
+
+        EXAMPLES::
+
+            sage: from flatsurf.geometry.interval_exchange_transformation import IntervalExchangeTransformation
+            sage: T = IntervalExchangeTransformation(QQ, [1, 2], [1, 0])
+            sage: T.orbit(1/2, 5)
+            [1/2, 5/2, 3/2, 1/2, 5/2]
+        """
+        orbit = []
+        for _ in range(n):
+            orbit.append(x)
+            x = self(x)
+        return orbit
+
+    def induced(self, a, limit=None):
+        r"""
+        Return the first return map of this interval exchange transformation
+        on the interval ``[0, a)``.
+
+        INPUT:
+
+        - ``a`` -- a positive length not larger than :meth:`length`
+
+        - ``limit`` -- an optional bound on the return time
+
+        EXAMPLES::
+
+            sage: from flatsurf.geometry.interval_exchange_transformation import IntervalExchangeTransformation
+            sage: K.<sqrt2> = NumberField(x^2 - 2, embedding=AA(2).sqrt())
+            sage: T = IntervalExchangeTransformation(K, [1, sqrt2], [1, 0])
+            sage: T.induced(sqrt2)
+            Interval exchange transformation:
+             0 1
+             1 0
+            lengths: [1, sqrt2 - 1]
+            sage: T = IntervalExchangeTransformation(QQ, [1, 2, 3], [2, 1, 0])
+            sage: T.induced(3)
+            Interval exchange transformation:
+             0 1
+             1 0
+            lengths: [1, 2]
+        """
+        a = self._ring(a)
+        if a <= self._ring.zero() or a > self._top[-1]:
+            raise ValueError("a = {} is out of the interval".format(a))
+
+        # pieces (x0, length, y0) of the return map, obtained by pushing the
+        # subintervals of [0, a) until they come back
+        pieces = []
+        todo = [(x0, min(x1, a), x0, 0) for x0,x1 in zip(self._top, self._top[1:]) if x0 < a]
+        while todo:
+            x0, x1, y0, n = todo.pop()
+            if limit is not None and n >= limit:
+                raise ValueError("the return time exceeds the limit")
+            i = bisect(self._top, y0) - 1
+            y1 = y0 + (x1 - x0)
+            if y1 > self._top[i+1]:
+                # split at the discontinuity
+                w = self._top[i+1]
+                todo.append((x0 + w - y0, x1, w, n))
+                x1 = x0 + w - y0
+                y1 = w
+            z0 = y0 - self._top[i] + self._bot[i]
+            z1 = z0 + (y1 - y0)
+            if z0 < a:
+                if z1 <= a:
+                    pieces.append((x0, x1 - x0, z0))
+                else:
+                    pieces.append((x0, a - z0, z0))
+                    todo.append((x0 + a - z0, x1, a, n+1))
+            else:
+                todo.append((x0, x1, z0, n+1))
+        return interval_exchange_from_pieces(self._ring, pieces)
+
+def interval_exchange_from_pieces(ring, pieces):
+    r"""
+    Return the interval exchange transformation defined by ``pieces``.
+
+    Each piece is a triple ``(x0, length, y0)`` meaning that the interval
+    ``[x0, x0 + length)`` is translated to ``[y0, y0 + length)``. The pieces
+    must tile the domain and the image. Consecutive pieces that are translated
+    together are merged.
+
+    EXAMPLES::
+
+        sage: from flatsurf.geometry.interval_exchange_transformation import interval_exchange_from_pieces
+        sage: interval_exchange_from_pieces(QQ, [(0, 1, 2), (1, 1, 3), (2, 2, 0)])
+        Interval exchange transformation:
+         0 1
+         1 0
+        lengths: [2, 2]
+    """
+    pieces = sorted(pieces)
+    merged = []
+    for x0, l, y0 in pieces:
+        if merged and merged[-1][0] + merged[-1][1] == x0 and \
+           merged[-1][2] + merged[-1][1] == y0:
+            merged[-1] = (merged[-1][0], merged[-1][1] + l, merged[-1][2])
+        else:
+            merged.append((x0, l, y0))
+    order = sorted(range(len(merged)), key=lambda i: merged[i][2])
+    permutation = [None] * len(merged)
+    for j,i in enumerate(order):
+        permutation[i] = j
+    return IntervalExchangeTransformation(ring, [l for _,l,_ in merged], permutation)
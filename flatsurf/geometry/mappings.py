@@ -4,10 +4,33 @@ from flatsurf.geometry.polygon import Polygons, wedge_product
 from flatsurf.geometry.surface import Surface, Surface_polygons_and_gluings
 from flatsurf.geometry.similarity_surface import SimilaritySurface
 from flatsurf.geometry.translation import TranslationGroup
+from flatsurf.geometry.tangent_bundle import SimilaritySurfaceTangentVector
 
 from sage.rings.infinity import Infinity
 from sage.structure.sage_object import SageObject
 
+def _glued_edge(s, p, e):
+    r"""
+    Return the edge of the surface ``s`` glued to the edge ``e`` of the
+    polygon ``p`` and raise a ``ValueError`` if this edge is free.
+
+    EXAMPLES::
+
+        sage: from flatsurf import *
+        sage: from flatsurf.geometry.mappings import _glued_edge
+        sage: w = translation_surfaces.infinite_staircase1().window(1)
+        sage: _glued_edge(w, 0, 0)
+        (1, 2)
+        sage: _glued_edge(w, 1, 1)
+        Traceback (most recent call last):
+        ...
+        ValueError: edge 1 of polygon 1 is free
+    """
+    glued = s.opposite_edge(p, e)
+    if glued is None:
+        raise ValueError("edge {} of polygon {} is free".format(e, p))
+    return glued
+
 class SurfaceMapping:
     r"""Abstract class for any mapping between surfaces."""
     
@@ -154,22 +177,24 @@ class IdentityMapping(SurfaceMapping):
 
     def push_vector_forward(self,tangent_vector):
         r"""Applies the mapping to the provided vector."""
+        # the position in the polygon is unchanged
         ring = tangent_vector.bundle().base_ring()
-        return self._codomain.tangent_vector( \
+        return SimilaritySurfaceTangentVector( \
+            self._codomain.tangent_bundle(ring), \
             tangent_vector.polygon_label(), \
             tangent_vector.point(), \
             tangent_vector.vector(), \
-            ring = ring)
-
+            tangent_vector.position())
 
     def pull_vector_back(self,tangent_vector):
         r"""Applies the pullback mapping to the provided vector."""
         ring = tangent_vector.bundle().base_ring()
-        return self._domain.tangent_vector( \
+        return SimilaritySurfaceTangentVector( \
+            self._domain.tangent_bundle(ring), \
             tangent_vector.polygon_label(), \
             tangent_vector.point(), \
             tangent_vector.vector(), \
-            ring = ring)
+            tangent_vector.position())
 
 class MatrixListDeformedSurface(Surface):
     r"""
@@ -290,7 +315,7 @@ class SimilarityJoinPolygonsMapping(SurfaceMapping):
         Join polygon with label p1 of s to polygon sharing edge e1.
         """
         poly1=s.polygon(p1)
-        p2,e2 = s.opposite_edge(p1,e1)
+        p2,e2 = _glued_edge(s,p1,e1)
         poly2=s.polygon(p2)
         t=s.edge_transformation(p2, e2)
         dt=t.derivative()
@@ -319,7 +344,7 @@ class SimilarityJoinPolygonsMapping(SurfaceMapping):
         glue_dictionary={}
         for i in range(len(vs)):
             p3,e3 = edge_map[i]
-            p4,e4 = s.opposite_edge(p3,e3)
+            p4,e4 = _glued_edge(s,p3,e3)
             if p4 == p1 or p4 == p2: 
                 glue_dictionary[(p1,i)] = inv_edge_map[(p4,e4)]
             else:
@@ -493,7 +518,7 @@ class SplitPolygonsMapping(SurfaceMapping):
         glue_dictionary = {(p,0):(new_label,0)}
         for e in range(ne):
             ll,ee = old_to_new_labels[e]
-            lll,eee = s.opposite_edge(p,e)
+            lll,eee = _glued_edge(s,p,e)
             if lll == p:
                 glue_dictionary[(ll,ee)]=old_to_new_labels[eee]
             else:
@@ -630,8 +655,19 @@ def triangulation_mapping(s):
         Polygon: (0, 0), (-1, -sqrt2 - 1), (1/2*sqrt2, -1/2*sqrt2)
         Polygon: (0, 0), (0, -sqrt2 - 1), (1, 0)
         Polygon: (0, 0), (-1/2*sqrt2 - 1, -1/2*sqrt2), (-1/2*sqrt2, -1/2*sqrt2)
+
+    Surfaces with free edges are not supported::
+
+        sage: from flatsurf import translation_surfaces
+        sage: w = translation_surfaces.infinite_staircase1().window(2)
+        sage: triangulation_mapping(w)
+        Traceback (most recent call last):
+        ...
+        ValueError: the surface has free edges
     """
     assert(s.is_finite())
+    if s.has_free_edges():
+        raise ValueError("the surface has free edges")
     m=subdivide_a_polygon(s)
     if m is None:
         return None
@@ -648,7 +684,7 @@ def edge_needs_flip(s,p1,e1):
     Return if the provided edge which bounds two triangles should be flipped
     to get closer to the Delaunay decomposition
     """
-    p2,e2=s.opposite_edge(p1,e1)
+    p2,e2=_glued_edge(s,p1,e1)
     poly1=s.polygon(p1)
     poly2=s.polygon(p2)
     assert poly1.num_edges()==3
@@ -688,7 +724,7 @@ def edge_needs_flip_Linfinity(s, p1, e1):
         sage: edge_needs_flip_Linfinity(s, 1, 2)
         False
     """
-    p2,e2 = s.opposite_edge(p1,e1)
+    p2,e2 = _glued_edge(s,p1,e1)
     poly1 = s.polygon(p1)
     poly2 = s.polygon(p2)
     assert poly1.num_edges() == 3
@@ -731,7 +767,7 @@ def edge_needs_join(s,p1,e1):
     Return if the provided edge which bounds two triangles should be flipped
     to get closer to the Delaunay decomposition
     """
-    p2,e2=s.opposite_edge(p1,e1)
+    p2,e2=_glued_edge(s,p1,e1)
     poly1=s.polygon(p1)
     poly2=s.polygon(p2)
     assert poly1.num_edges()==3
@@ -745,8 +781,20 @@ def edge_needs_join(s,p1,e1):
 def delaunay_triangulation_mapping(s):
     r"""
     Returns a mapping to a Delaunay triangulation or None if the surface already is Delaunay triangulated.
+
+    EXAMPLES::
+
+        sage: from flatsurf import translation_surfaces
+        sage: from flatsurf.geometry.mappings import delaunay_triangulation_mapping
+        sage: w = translation_surfaces.infinite_staircase1().window(2)
+        sage: delaunay_triangulation_mapping(w)
+        Traceback (most recent call last):
+        ...
+        ValueError: the surface has free edges
     """
     assert(s.is_finite())
+    if s.has_free_edges():
+        raise ValueError("the surface has free edges")
     m=triangulation_mapping(s)
     if m is None:
         s1=s
@@ -770,6 +818,16 @@ def delaunay_triangulation_mapping(s):
 def delaunay_decomposition_mapping(s):
     r"""
     Returns a mapping to a Delaunay decomposition or possibly None if the surface already is Delaunay.
+
+    EXAMPLES::
+
+        sage: from flatsurf import translation_surfaces
+        sage: from flatsurf.geometry.mappings import delaunay_decomposition_mapping
+        sage: w = translation_surfaces.infinite_staircase1().window(2)
+        sage: delaunay_decomposition_mapping(w)
+        Traceback (most recent call last):
+        ...
+        ValueError: the surface has free edges
     """
     m=delaunay_triangulation_mapping(s)
     if m is None:
@@ -828,6 +886,8 @@ class CanonicalizePolygonsMapping(SurfaceMapping):
         """
         if not s.is_finite():
             raise ValueError("Currently only works with finite surfaces.""")
+        if s.has_free_edges():
+            raise ValueError("the surface has free edges")
         ring=s.base_ring()
         T=TranslationGroup(ring)
         P=Polygons(ring)
@@ -925,7 +985,10 @@ class ReindexMapping(SurfaceMapping):
         
         def opposite_edge(self, p, e):
             p_back = self._r._b[p]
-            pp_back,ee = self._s.opposite_edge(p_back,e)
+            glued = self._s.opposite_edge(p_back,e)
+            if glued is None:
+                return None
+            pp_back,ee = glued
             pp = self._r._f[pp_back]
             return (pp,ee)
         
@@ -996,8 +1059,16 @@ def translation_surface_cmp(s1, s2):
             return ret
     # Polygons are identical. Compare edge gluings.
     for pair1,pair2 in izip_longest(lw1.edge_iterator(), lw2.edge_iterator()):
-        l1,e1 = s1.opposite_edge_pair(pair1)
-        l2,e2 = s2.opposite_edge_pair(pair2)
+        glued1 = s1.opposite_edge_pair(pair1)
+        glued2 = s2.opposite_edge_pair(pair2)
+        if glued1 is None or glued2 is None:
+            # free edges come after the glued ones
+            ret = cmp(glued1 is None, glued2 is None)
+            if ret!=0:
+                return ret
+            continue
+        l1,e1 = glued1
+        l2,e2 = glued2
         num1 = lw1.label_to_number(l1)
         num2 = lw2.label_to_number(l2)
         ret = cmp(num1,num2)
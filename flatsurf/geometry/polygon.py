@@ -192,9 +192,20 @@ class MatrixActionOnPolygons(Action):
         return x.parent()(vertices=[g*v for v in x.vertices()])
 
 
-class PolygonPosition:
+class PolygonPosition(object):
     r"""
     Class for describing the position of a point within or outside of a polygon.
+
+    EXAMPLES::
+
+        sage: from flatsurf.geometry.polygon import polygons, PolygonPosition
+        sage: pos = polygons.square().get_point_position(vector((1/2,0)))
+        sage: pos
+        point positioned on interior of edge 0 of polygon
+        sage: pos == PolygonPosition(PolygonPosition.EDGE_INTERIOR, edge=0)
+        True
+        sage: hash(pos) == hash(PolygonPosition(PolygonPosition.EDGE_INTERIOR, edge=0))
+        True
     """
     # Position Types:
     OUTSIDE = 0
@@ -202,8 +213,11 @@ class PolygonPosition:
     EDGE_INTERIOR = 2
     VERTEX = 3
 
+    __slots__ = ['_position_type', '_edge', '_vertex']
+
     def __init__(self, position_type, edge = None, vertex = None):
         self._position_type=position_type
+        self._edge = self._vertex = None
         if self.is_vertex():
             if vertex is None:
                 raise ValueError("Constructed vertex position with no specified vertex.")
@@ -213,6 +227,18 @@ class PolygonPosition:
                 raise ValueError("Constructed edge position with no specified edge.")
             self._edge=edge
 
+    def __eq__(self, other):
+        return isinstance(other, PolygonPosition) and \
+               self._position_type == other._position_type and \
+               self._edge == other._edge and \
+               self._vertex == other._vertex
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self._position_type, self._edge, self._vertex))
+
     def __repr__(self):
         if self.is_outside():
             return "point positioned outside polygon"
@@ -151,8 +151,9 @@ class RelativeHomology(Module):
                     total -=  self._cached_edges[(label,e2)]
                 # Cache this edge's value and the opposite edge's value.
                 self._cached_edges[(label,e)] = total
-                label2,e2 = self._s.opposite_edge(label,e)
-                self._cached_edges[(label2,e2)] = -total
+                glued = self._s.opposite_edge(label,e)
+                if glued is not None:
+                    self._cached_edges[glued] = -total
                 return total
             else:
                 # At least one other edge is not cached, so we can think of
@@ -162,6 +163,7 @@ class RelativeHomology(Module):
                 v = self._element_from_dict(d)
                 # Cache this edge's value and the opposite edge's value.
                 self._cached_edges[(label,e)] = v
-                label2,e2 = self._s.opposite_edge(label,e)
-                self._cached_edges[(label2,e2)] = -v
+                glued = self._s.opposite_edge(label,e)
+                if glued is not None:
+                    self._cached_edges[glued] = -v
                 return v
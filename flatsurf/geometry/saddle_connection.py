@@ -0,0 +1,550 @@
+r"""
+Saddle connections in similarity surfaces.
+
+A saddle connection is a straight line trajectory joining two vertices of the
+surface that does not meet any vertex in between. They are enumerated by
+increasing length from each corner of the polygons by developing the
+surface in the plane.
+
+EXAMPLES::
+
+    sage: from flatsurf import *
+    sage: t = translation_surfaces.square_torus()
+    sage: for sc in t.saddle_connections(2):
+    ....:     print(sc)
+    Saddle connection with holonomy (1, 0) from (0, 0) to (0, 1)
+    Saddle connection with holonomy (0, 1) from (0, 1) to (0, 2)
+    Saddle connection with holonomy (-1, 0) from (0, 2) to (0, 3)
+    Saddle connection with holonomy (0, -1) from (0, 3) to (0, 0)
+    Saddle connection with holonomy (1, 1) from (0, 0) to (0, 2)
+    Saddle connection with holonomy (-1, 1) from (0, 1) to (0, 3)
+    Saddle connection with holonomy (-1, -1) from (0, 2) to (0, 0)
+    Saddle connection with holonomy (1, -1) from (0, 3) to (0, 1)
+"""
+
+import heapq
+
+from sage.structure.sage_object import SageObject
+
+from flatsurf.geometry.polygon import wedge_product
+from flatsurf.geometry.similarity import SimilarityGroup
+
+class SaddleConnection(SageObject):
+    r"""
+    A saddle connection in a similarity surface.
+
+    It is determined by its starting corner ``(label, vertex)`` and its
+    holonomy developed in the polygon ``label``.
+
+    EXAMPLES::
+
+        sage: from flatsurf import *
+        sage: from flatsurf.geometry.saddle_connection import SaddleConnection
+        sage: t = translation_surfaces.square_torus()
+        sage: V = t.vector_space()
+        sage: sc = SaddleConnection(t, (0,0), (0,2), V((1,1)))
+        sage: sc
+        Saddle connection with holonomy (1, 1) from (0, 0) to (0, 2)
+        sage: sc.invert()
+        Saddle connection with holonomy (-1, -1) from (0, 2) to (0, 0)
+        sage: sc.trajectory()
+        Straight line trajectory made of 1 segments from (0, 0) in polygon 0 to (1, 1) in polygon 0
+    """
+    def __init__(self, surface, start_data, end_data, holonomy, end_holonomy=None):
+        r"""
+        INPUT:
+
+        - ``surface`` -- a similarity surface
+
+        - ``start_data`` -- a pair ``(label, vertex)`` for the corner the saddle
+          connection starts from
+
+        - ``end_data`` -- a pair ``(label, vertex)`` for the corner the saddle
+          connection arrives in
+
+        - ``holonomy`` -- the holonomy in the coordinates of the polygon of
+          ``start_data``
+
+        - ``end_holonomy`` -- the holonomy of the inverse saddle connection in
+          the coordinates of the polygon of ``end_data`` (by default the
+          opposite of ``holonomy`` which is correct for translation surfaces)
+        """
+        self._s = surface
+        self._start_data = start_data
+        self._end_data = end_data
+        self._holonomy = holonomy
+        if end_holonomy is None:
+            end_holonomy = -holonomy
+        self._end_holonomy = end_holonomy
+
+    def _repr_(self):
+        return "Saddle connection with holonomy {} from {} to {}".format(
+                self._holonomy, self._start_data, self._end_data)
+
+    def __eq__(self, other):
+        return isinstance(other, SaddleConnection) and \
+               self._s is other._s and \
+               self._start_data == other._start_data and \
+               self._end_data == other._end_data and \
+               self._holonomy == other._holonomy
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash((self._start_data, self._end_data, tuple(self._holonomy)))
+
+    def surface(self):
+        r"""
+        Return the underlying surface.
+        """
+        return self._s
+
+    def start_data(self):
+        r"""
+        Return the pair ``(label, vertex)`` of the corner the saddle connection
+        starts from.
+        """
+        return self._start_data
+
+    def end_data(self):
+        r"""
+        Return the pair ``(label, vertex)`` of the corner the saddle connection
+        arrives in.
+        """
+        return self._end_data
+
+    def start_singularity(self):
+        r"""
+        Return the number of the singularity the saddle connection starts
+        from (see
+        :class:`~flatsurf.geometry.vertex_index.VertexIndex`).
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: S = SymmetricGroup(2)
+            sage: t = translation_surfaces.origami(S('(1,2)'), S('()'))
+            sage: sc = next(sc for sc in t.saddle_connections(1) if sc.holonomy()[1] == 0)
+            sage: sc.start_singularity() != sc.end_singularity()
+            True
+        """
+        return self._s.vertex_index().singularity(*self._start_data)
+
+    def end_singularity(self):
+        r"""
+        Return the number of the singularity the saddle connection arrives in
+        (see :class:`~flatsurf.geometry.vertex_index.VertexIndex`).
+        """
+        return self._s.vertex_index().singularity(*self._end_data)
+
+    def holonomy(self):
+        r"""
+        Return the holonomy vector of this saddle connection in the coordinates
+        of its starting polygon.
+        """
+        return self._holonomy
+
+    def end_holonomy(self):
+        r"""
+        Return the holonomy vector of the inverse saddle connection in the
+        coordinates of the polygon it arrives in.
+        """
+        return self._end_holonomy
+
+    def invert(self):
+        r"""
+        Return the same saddle connection with the opposite orientation.
+        """
+        return SaddleConnection(self._s, self._end_data, self._start_data,
+                self._end_holonomy, self._holonomy)
+
+    def trajectory(self):
+        r"""
+        Return the straight line trajectory associated to this saddle
+        connection.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: O = translation_surfaces.regular_octagon()
+            sage: for sc in O.saddle_connections(5, 0, 0):
+            ....:     assert sc.trajectory().is_saddle_connection()
+        """
+        label, vertex = self._start_data
+        v = self._s.tangent_vector(label, self._s.polygon(label).vertex(vertex), self._holonomy)
+        traj = v.straight_line_trajectory()
+        while not traj.is_forward_separatrix():
+            traj.flow(16)
+        return traj
+
+def _squared_distance_to_segment(u0, u1):
+    r"""
+    Return the square of the distance between the origin and the segment
+    ``[u0, u1]``.
+
+    EXAMPLES::
+
+        sage: from flatsurf.geometry.saddle_connection import _squared_distance_to_segment
+        sage: V = VectorSpace(QQ, 2)
+        sage: _squared_distance_to_segment(V((1,-1)), V((1,1)))
+        1
+        sage: _squared_distance_to_segment(V((1,1)), V((2,1)))
+        2
+        sage: _squared_distance_to_segment(V((2,0)), V((0,2)))
+        2
+    """
+    d = u1 - u0
+    t = -u0.dot_product(d)
+    if t <= 0:
+        return u0.dot_product(u0)
+    dd = d.dot_product(d)
+    if t >= dd:
+        return u1.dot_product(u1)
+    return u0.dot_product(u0) - t*t/dd
+
+def _intersect_cones(a, b, u, v):
+    r"""
+    Return the intersection of the open cones spanned by ``(a, b)`` and
+    ``(u, v)`` (both of angle less than pi) or ``None`` if it is empty.
+
+    EXAMPLES::
+
+        sage: from flatsurf.geometry.saddle_connection import _intersect_cones
+        sage: V = VectorSpace(QQ, 2)
+        sage: _intersect_cones(V((1,0)), V((0,1)), V((1,-1)), V((1,1)))
+        ((1, 0), (1, 1))
+        sage: _intersect_cones(V((1,0)), V((0,1)), V((1,1)), V((-1,1)))
+        ((1, 1), (0, 1))
+        sage: _intersect_cones(V((1,0)), V((1,1)), V((0,1)), V((-1,1))) is None
+        True
+    """
+    if wedge_product(u, a) >= 0 and wedge_product(a, v) >= 0:
+        aa = a
+    elif wedge_product(a, u) >= 0 and wedge_product(u, b) >= 0:
+        aa = u
+    else:
+        return None
+    if wedge_product(u, b) >= 0 and wedge_product(b, v) >= 0:
+        bb = b
+    elif wedge_product(a, v) >= 0 and wedge_product(v, b) >= 0:
+        bb = v
+    else:
+        return None
+    if wedge_product(aa, bb) <= 0:
+        return None
+    return (aa, bb)
+
+def _corner_saddle_connections(surface, label, vertex, squared_length_bound, squared_length_min=0):
+    r"""
+    Iterator over the tuples ``(squared_length, end_data, holonomy,
+    end_holonomy)`` of saddle connections leaving the corner ``(label,
+    vertex)`` by increasing length. Only the saddle connections whose squared
+    length is larger than ``squared_length_min`` are returned.
+
+    The corner owns the directions from its outgoing edge (included) to its
+    incoming edge (excluded) so that iterating over all corners of a surface
+    gives each saddle connection exactly once.
+    """
+    G = SimilarityGroup(surface.base_ring())
+    L2 = squared_length_bound
+    poly = surface.polygon(label)
+    x = poly.vertex(vertex)
+    a = poly.edge(vertex)
+    b = -poly.edge(vertex-1)
+
+    # The heap contains both the saddle connections found so far and the
+    # edges through which the exploration continues. The key of an edge is
+    # its distance to the corner which is a lower bound for the length of
+    # the saddle connections found beyond it. Hence saddle connections are
+    # popped by increasing length.
+    heap = []
+    count = 0
+    if a.dot_product(a) <= L2:
+        end_data = (label, (vertex+1)%poly.num_edges())
+        heapq.heappush(heap, (a.dot_product(a), count, True, (end_data, a, -a)))
+        count += 1
+
+    # polygon to explore as (label, entry edge, position, cone)
+    todo = (label, None, G(1, 0, -x[0], -x[1]), a, b)
+
+    while True:
+        q, e0, g, a, b = todo
+        poly = surface.polygon(q)
+        n = poly.num_edges()
+        if e0 is None:
+            skip = ()
+        else:
+            skip = (e0, (e0+1)%n)
+
+        for j in range(n):
+            if j in skip:
+                continue
+            w = g(poly.vertex(j))
+            l2 = w.dot_product(w)
+            if l2 <= L2 and wedge_product(a, w) > 0 and wedge_product(w, b) > 0:
+                hol = (~g.derivative()) * (-w)
+                heapq.heappush(heap, (l2, count, True, ((q, j), w, hol)))
+                count += 1
+
+        for e in range(n):
+            if e == e0 or surface.opposite_edge(q, e) is None:
+                # the entry edge or a free edge
+                continue
+            u0 = g(poly.vertex(e))
+            u1 = g(poly.vertex(e+1))
+            if wedge_product(u0, u1) <= 0:
+                # the edge is not crossed by any ray from the corner
+                continue
+            cone = _intersect_cones(a, b, u0, u1)
+            if cone is None:
+                continue
+            d2 = _squared_distance_to_segment(u0, u1)
+            if d2 > L2:
+                continue
+            heapq.heappush(heap, (d2, count, False, (q, e, g) + cone))
+            count += 1
+
+        while True:
+            if not heap:
+                return
+            l2, _, is_saddle_connection, data = heapq.heappop(heap)
+            if not is_saddle_connection:
+                break
+            if l2 > squared_length_min:
+                end_data, w, hol = data
+                yield (l2, end_data, w, hol)
+
+        q, e, g, a, b = data
+        qq, ee = surface.opposite_edge(q, e)
+        todo = (qq, ee, g * ~surface.edge_transformation(q, e), a, b)
+
+def _corners(surface, label=None, vertex=None):
+    r"""
+    Return the list of corners ``(label, vertex)`` to start the search from.
+    """
+    if vertex is not None:
+        if label is None:
+            raise ValueError("a vertex can only be specified together with a label")
+        return [(label, vertex)]
+    if label is not None:
+        return [(label, v) for v in range(surface.polygon(label).num_edges())]
+    if not surface.is_finite():
+        raise ValueError("a starting label must be specified for infinite surfaces")
+    return [(lab, v) for lab,p in surface.label_polygon_iterator() for v in range(p.num_edges())]
+
+def _shells(surface, corners, squared_length_bound):
+    r"""
+    Return the increasing list of the squared length bounds of the shells in
+    which the search is split when it is run in parallel or checkpointed.
+
+    The first bound is the smallest squared length of the outgoing edges of
+    the corners and each bound is four times the previous one (that is the
+    length doubles) until ``squared_length_bound`` is reached. The
+    exploration of a shell does again the work of the previous shells but
+    this only costs a constant factor as the number of polygons explored
+    grows with the square of the length.
+
+    EXAMPLES::
+
+        sage: from flatsurf import *
+        sage: from flatsurf.geometry.saddle_connection import _shells
+        sage: t = translation_surfaces.square_torus()
+        sage: _shells(t, [(0,0)], 100)
+        [1, 4, 16, 64, 100]
+        sage: _shells(t, [(0,0)], 1/2)
+        [1/2]
+    """
+    edges = [surface.polygon(label).edge(vertex) for label, vertex in corners]
+    bound = min(e.dot_product(e) for e in edges)
+    bounds = []
+    while bound < squared_length_bound:
+        bounds.append(bound)
+        bound *= 4
+    bounds.append(squared_length_bound)
+    return bounds
+
+# surface shared with the worker processes (see saddle_connections)
+_worker_surface = None
+
+def _init_worker(surface):
+    global _worker_surface
+    _worker_surface = surface
+
+def _worker_corner_saddle_connections(args):
+    label, vertex, squared_length_bound, squared_length_min = args
+    return list(_corner_saddle_connections(_worker_surface, label, vertex, squared_length_bound, squared_length_min))
+
+def _shell_results(surface, corners, bounds, processes=None, checkpoint=None):
+    r"""
+    Iterator over the shells of squared length bounded by ``bounds`` (see
+    :func:`_shells`) that returns for each shell the list of the outputs of
+    :func:`_corner_saddle_connections` for each corner in ``corners``.
+
+    The work is split into one task per corner and per shell. With
+    ``processes``, the tasks are distributed over a pool of processes that
+    keeps working on the next shells while a shell is returned.
+
+    If ``checkpoint`` is provided, the pair made of the last bound and of the
+    dictionary ``(shell, corner) -> output`` of the tasks done so far is saved
+    to it and the tasks already saved are not computed again.
+    """
+    squared_length_bound = bounds[-1]
+    done = {}
+    if checkpoint is not None:
+        state = checkpoint.load()
+        if state is not None:
+            bound, done = state
+            if bound != squared_length_bound:
+                raise ValueError("the checkpoint was made with a different length bound")
+
+    todo = [(k, label, vertex, bounds[k], bounds[k-1] if k else 0)
+            for k in range(len(bounds)) for label, vertex in corners
+            if (k, (label, vertex)) not in done]
+    pool = None
+    if processes is None:
+        results = (list(_corner_saddle_connections(surface, label, vertex, hi, lo))
+                   for _, label, vertex, hi, lo in todo)
+    else:
+        from multiprocessing import Pool
+        pool = Pool(processes, _init_worker, (surface,))
+        results = pool.imap(_worker_corner_saddle_connections,
+                [(label, vertex, hi, lo) for _, label, vertex, hi, lo in todo])
+    try:
+        for k in range(len(bounds)):
+            shell = []
+            for corner in corners:
+                if (k, corner) not in done:
+                    done[(k, corner)] = next(results)
+                    if checkpoint is not None:
+                        checkpoint.update((squared_length_bound, done))
+                shell.append(done[(k, corner)])
+            yield shell
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    if checkpoint is not None:
+        checkpoint.save((squared_length_bound, done))
+
+def _tag_corner(i, corner, saddle_connections):
+    r"""
+    Prepend a comparison key to the output of :func:`_corner_saddle_connections`
+    so that the iterators of the different corners can be merged.
+    """
+    for k, (l2, end_data, w, hol) in enumerate(saddle_connections):
+        yield ((l2, i, k), corner, end_data, w, hol)
+
+def saddle_connections(surface, squared_length_bound, initial_label=None, initial_vertex=None, processes=None, checkpoint=None):
+    r"""
+    Iterator over the saddle connections of ``surface`` whose length is at
+    most the square root of ``squared_length_bound``, by increasing length.
+
+    For each corner the polygons of the surface are developed in the plane
+    and explored in a priority queue ordered by their distance to the corner,
+    restricted to the cone of directions that are still visible.
+
+    INPUT:
+
+    - ``surface`` -- a similarity surface
+
+    - ``squared_length_bound`` -- the square of the bound on the length
+
+    - ``initial_label``, ``initial_vertex`` -- optional restriction on the
+      starting corners. If only ``initial_label`` is provided, all the corners
+      of this polygon are used. Otherwise, all the corners of the surface are
+      used (and the surface must be finite).
+
+    - ``processes`` -- if provided, the search is split into shells of
+      squared length that grow by a factor four and the corners of each shell
+      are distributed over a pool of that many processes. The surface is sent
+      once to each process. The saddle connections of a shell are merged and
+      returned by increasing length as soon as all its corners are done while
+      the next shells are being computed.
+
+    - ``checkpoint`` -- an optional
+      :class:`~flatsurf.geometry.checkpoint.Checkpoint`. The search is split
+      into shells as for ``processes`` and the saddle connections of each
+      corner in each shell are saved to it as soon as they are found (see
+      :meth:`~flatsurf.geometry.checkpoint.Checkpoint.update`). If the
+      checkpoint already holds some of them, they are not computed again.
+
+    EXAMPLES::
+
+        sage: from flatsurf import *
+        sage: from flatsurf.geometry.saddle_connection import saddle_connections
+        sage: t = translation_surfaces.square_torus()
+        sage: L = list(saddle_connections(t, 25))
+        sage: len(L)
+        48
+        sage: all(L[i].holonomy().norm() <= L[i+1].holonomy().norm() for i in range(len(L)-1))
+        True
+        sage: all(gcd(sc.holonomy()) == 1 for sc in L)
+        True
+
+        sage: O = translation_surfaces.regular_octagon()
+        sage: L = list(saddle_connections(O, 16))
+        sage: len(L)
+        64
+        sage: L[0]
+        Saddle connection with holonomy (1, 0) from (0, 0) to (0, 1)
+        sage: it = saddle_connections(O, 16, processes=2)
+        sage: L2 = [next(it)]
+        sage: L2
+        [Saddle connection with holonomy (1, 0) from (0, 0) to (0, 1)]
+        sage: L2.extend(it)
+        sage: set(L) == set(L2)
+        True
+        sage: [sc.holonomy().dot_product(sc.holonomy()) for sc in L] == \
+        ....: [sc.holonomy().dot_product(sc.holonomy()) for sc in L2]
+        True
+
+        sage: len(list(saddle_connections(O, 16, 0, 0)))
+        8
+
+    The search does not go through the free edges of a window (see
+    :meth:`~flatsurf.geometry.similarity_surface.SimilaritySurface.window`)::
+
+        sage: S = translation_surfaces.infinite_staircase1()
+        sage: w = S.window(1)
+        sage: [sc.holonomy() for sc in saddle_connections(w, 10, 0, 0)]
+        [(1, 0), (1, 1), (2, 1), (1, 2), (3, 1), (1, 3)]
+        sage: [sc.holonomy() for sc in saddle_connections(S, 10, 0, 0)]
+        [(1, 0), (1, 1), (2, 1), (1, 2), (3, 1), (1, 3)]
+
+    With a checkpoint::
+
+        sage: from flatsurf.geometry.checkpoint import Checkpoint
+        sage: c = Checkpoint(tmp_dir() + 'saddle_connections.sobj')
+        sage: L3 = list(saddle_connections(O, 16, checkpoint=c))
+        sage: L3 == L
+        True
+        sage: bound, done = c.load()
+        sage: bound, len(done)
+        (16, 24)
+        sage: del done[(1, (0,3))]
+        sage: c.save((bound, done))
+        sage: list(saddle_connections(O, 16, checkpoint=c)) == L
+        True
+        sage: list(saddle_connections(O, 25, checkpoint=c))
+        Traceback (most recent call last):
+        ...
+        ValueError: the checkpoint was made with a different length bound
+    """
+    squared_length_bound = surface.base_ring()(squared_length_bound)
+    corners = _corners(surface, initial_label, initial_vertex)
+
+    if processes is None and checkpoint is None:
+        iterators = [_tag_corner(i, corner,
+                       _corner_saddle_connections(surface, corner[0], corner[1], squared_length_bound))
+                     for i,corner in enumerate(corners)]
+        for _, start_data, end_data, w, hol in heapq.merge(*iterators):
+            yield SaddleConnection(surface, start_data, end_data, w, hol)
+        return
+
+    bounds = _shells(surface, corners, squared_length_bound)
+    for shell in _shell_results(surface, corners, bounds, processes, checkpoint):
+        iterators = [_tag_corner(i, corners[i], res) for i,res in enumerate(shell)]
+        for _, start_data, end_data, w, hol in heapq.merge(*iterators):
+            yield SaddleConnection(surface, start_data, end_data, w, hol)
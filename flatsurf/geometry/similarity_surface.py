@@ -148,39 +148,93 @@ class SimilaritySurface(Surface):
     # generic methods
     #
     
-    #def compute_surface_type_from_gluings(self,limit=None):
-    #    r"""
-    #    Compute the surface type by looking at the edge gluings. 
-    #    If limit is defined, we try to guess the type by looking at limit many edges.
-    #    """
-    #    if limit is None:
-    #        if not self.is_finite():
-    #            raise ValueError("Need a limit when working with an infinite surface.")
-    #        it = self.edge_iterator()
-    #        label,edge = it.next()
-    #        # Use honest matrices!
-    #        m = SimilaritySurface_generic.edge_matrix(self,label,edge)
-    #        surface_type = surface_type_from_matrix(m)
-    #        for label,edge in it:
-    #            # Use honest matrices!
-    #            m = SimilaritySurface_generic.edge_matrix(self,label,edge)
-    #            surface_type = combine_surface_types(surface_type, surface_type_from_matrix(m))
-    #        return surface_type
-    #    else:
-    #        count=0
-    #        it = self.edge_iterator()
-    #        label,edge = it.next()
-    #        # Use honest matrices!
-    #        m = SimilaritySurface_generic.edge_matrix(self,label,edge)
-    #        surface_type = surface_type_from_matrix(m)
-    #        for label,edge in it:
-    #            # Use honest matrices!
-    #            m = SimilaritySurface_generic.edge_matrix(self,label,edge)
-    #            surface_type = combine_surface_types(surface_type, surface_type_from_matrix(m))
-    #            count=count+1
-    #            if count >= limit:
-    #                return surface_type
-    #        return surface_type
+    def surface_type(self, limit=None):
+        r"""
+        Return the most specific type of this surface (see
+        :class:`~flatsurf.geometry.surface_type.SurfaceType`) allowed by the
+        matrices of the gluings of its edges.
+
+        The matrices are computed from the polygons, whatever the class of
+        this surface is. The scan stops as soon as a gluing by a general
+        similarity is found and the type of a finite surface is computed only
+        once (see :meth:`invalidate_caches`).
+
+        INPUT:
+
+        - ``limit`` -- if provided, only the first ``limit`` edges are
+          looked at (this is required for infinite surfaces)
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: from flatsurf.geometry.surface_type import surface_type_to_str
+            sage: s = SimilaritySurface(translation_surfaces.regular_octagon())
+            sage: surface_type_to_str(s.surface_type())
+            'Translation surface'
+            sage: s = similarity_surfaces.example()
+            sage: surface_type_to_str(s.surface_type())
+            'Similarity surface'
+            sage: s = translation_surfaces.infinite_staircase1()
+            sage: surface_type_to_str(s.surface_type(limit=100))
+            'Translation surface'
+        """
+        try:
+            return self._surface_type
+        except AttributeError:
+            pass
+        if limit is None and not self.is_finite():
+            raise ValueError("a limit is needed for infinite surfaces")
+
+        from flatsurf.geometry.surface_type import SurfaceType, surface_type_from_matrix, combine_surface_types
+        surface_type = SurfaceType.TRANSLATION
+        seen = set()
+        count = 0
+        for p,e in self.edge_iterator():
+            if limit is not None and count >= limit:
+                return surface_type
+            count += 1
+            glued = self.opposite_edge(p,e)
+            if glued is None:
+                continue
+            pp,ee = glued
+            m = similarity_from_vectors(self.polygon(p).edge(e), -self.polygon(pp).edge(ee))
+            m.set_immutable()
+            if m in seen:
+                continue
+            seen.add(m)
+            surface_type = combine_surface_types(surface_type, surface_type_from_matrix(m))
+            if surface_type == SurfaceType.SIMILARITY:
+                break
+        if self.is_finite():
+            self._surface_type = surface_type
+        return surface_type
+
+    def specialize(self, limit=None):
+        r"""
+        Return this surface wrapped in the class of its type (see
+        :meth:`surface_type`).
+
+        The methods specific to this class (e.g. the faster edge matrices
+        and straight line flow of translation surfaces) are then available.
+        This surface is returned if it already has the right class.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: from flatsurf.geometry.surface import Surface_polygons_and_gluings
+            sage: P = polygons.square()
+            sage: s = SimilaritySurface(Surface_polygons_and_gluings([P,P], [((0,i),(1,i)) for i in range(4)]))
+            sage: s.specialize()
+            HalfTranslationSurface built from 2 polygons
+            sage: t = translation_surfaces.square_torus()
+            sage: t.specialize() is t
+            True
+        """
+        from flatsurf.geometry.surface_type import surface_type_class
+        cls = surface_type_class(self.surface_type(limit))
+        if type(self) is cls:
+            return self
+        return cls(self)
 
     def opposite_edge_pair(self,label_edge_pair):
         r"""
@@ -195,6 +249,115 @@ class SimilaritySurface(Surface):
             self._lw = LabelWalker(self)
         return self._lw
 
+    def vertex_index(self):
+        r"""
+        Return the index of the singularities of this finite surface.
+
+        See :class:`~flatsurf.geometry.vertex_index.VertexIndex`.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: s = translation_surfaces.regular_octagon()
+            sage: s.vertex_index().angles()
+            [3]
+            sage: s.vertex_index() is s.vertex_index()
+            True
+        """
+        try:
+            return self._vi
+        except AttributeError:
+            from flatsurf.geometry.vertex_index import VertexIndex
+            self._vi = VertexIndex(self)
+        return self._vi
+
+    def window(self, radius, label=None):
+        r"""
+        Return the finite surface made of the polygons within combinatorial
+        distance ``radius`` of the polygon ``label`` (by default the base
+        label).
+
+        The returned surface is an instance of a subclass of the class of
+        this surface that can be grown with
+        :meth:`~flatsurf.geometry.surface_window.WindowSurface.extend`. The
+        edges on its boundary are free. See
+        :class:`~flatsurf.geometry.surface_window.SurfaceWindow`. The
+        straight-line flows stop at the free edges as they do at the
+        singularities and :meth:`edge_matrix` and :meth:`edge_transformation`
+        raise a ``ValueError`` on them.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: T = translation_surfaces.t_fractal()
+            sage: w = T.window(3)
+            sage: w.num_polygons()
+            8
+            sage: len(w.underlying_surface().free_edges())
+            4
+            sage: TestSuite(w).run()
+        """
+        from flatsurf.geometry.surface_window import window_surface
+        return window_surface(self, radius, label)
+
+    def _glued_edge(self, p, e):
+        r"""
+        Return the edge glued to the edge ``e`` of the polygon ``p`` and raise
+        a ``ValueError`` if this edge is free.
+        """
+        glued = self.opposite_edge(p, e)
+        if glued is None:
+            raise ValueError("edge {} of polygon {} is free".format(e, p))
+        return glued
+
+    def has_free_edges(self):
+        r"""
+        Return whether some edges of this finite surface are not glued (see
+        :meth:`window`).
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: s = translation_surfaces.infinite_staircase1()
+            sage: s.window(1).has_free_edges()
+            True
+            sage: translation_surfaces.regular_octagon().has_free_edges()
+            False
+        """
+        if not self.is_finite():
+            raise ValueError("the surface must be finite")
+        return any(self.opposite_edge(p,e) is None for p,e in self.edge_iterator())
+
+    def invalidate_caches(self):
+        r"""
+        Forget the labels found by the label walker, the hash of this
+        surface, the tables of edge matrices and edge transformations, the
+        index of the singularities and the type of this surface.
+
+        This must be called after the polygons or the gluings of the
+        underlying surface have been modified.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: s = translation_surfaces.infinite_staircase1()
+            sage: lw = s.label_walker()
+            sage: lw.expand(100)
+            100
+            sage: s.invalidate_caches()
+            sage: len(lw)
+            1
+        """
+        try:
+            self._lw.invalidate()
+        except AttributeError:
+            pass
+        for attr in ('_hash', '_edge_matrices', '_edge_transformations', '_vi', '_surface_type'):
+            try:
+                delattr(self, attr)
+            except AttributeError:
+                pass
+
     def label_iterator(self):
         r"""
         Iterator over the polygon labels.
@@ -241,10 +404,15 @@ class SimilaritySurface(Surface):
     def edge_gluing_iterator(self):
         r"""
         Iterate over the ordered pairs of edges being glued.
+
+        The free edges (see
+        :class:`~flatsurf.geometry.surface_window.SurfaceWindow`) are
+        skipped.
         """
         for label,edge in self.edge_iterator():
-            label2,edge2 = self.opposite_edge(label,edge)
-            yield ((label,edge),(label2,edge2))
+            glued = self.opposite_edge(label,edge)
+            if glued is not None:
+                yield ((label,edge),glued)
 
     def num_polygons(self):
         r"""
@@ -292,20 +460,57 @@ class SimilaritySurface(Surface):
         r"""
         Return the edge to which this edge is identified and the matrix to be
         applied.
+
+        For finite surfaces, the matrices are computed once and kept in a
+        table (see :meth:`invalidate_caches`). They are immutable.
+
+        EXAMPLES::
+
+            sage: from flatsurf.geometry.similarity_surface_generators import SimilaritySurfaceGenerators
+            sage: s = SimilaritySurfaceGenerators.example()
+            sage: m = s.edge_matrix(0,0); m
+            [  1 1/2]
+            [-1/2   1]
+            sage: s.edge_matrix((0,0)) is m
+            True
+            sage: m.is_immutable()
+            True
+
+        The free edges of a window (see :meth:`window`) have no edge matrix::
+
+            sage: from flatsurf import *
+            sage: w = translation_surfaces.infinite_staircase1().window(1)
+            sage: w.edge_matrix(1, 1)
+            Traceback (most recent call last):
+            ...
+            ValueError: edge 1 of polygon 1 is free
         """
         if e is None:
             p,e = p
+        try:
+            return self._edge_matrices[(p,e)]
+        except AttributeError:
+            self._edge_matrices = {}
+        except KeyError:
+            pass
         u = self.polygon(p).edge(e)
-        pp,ee = self.opposite_edge(p,e)
+        pp,ee = self._glued_edge(p,e)
         v = self.polygon(pp).edge(ee)
 
         # be careful, because of the orientation, it is -v and not v
-        return similarity_from_vectors(u,-v)
+        m = similarity_from_vectors(u,-v)
+        m.set_immutable()
+        if self.is_finite():
+            self._edge_matrices[(p,e)] = m
+        return m
 
     def edge_transformation(self, p, e):
         r"""
         Return the similarity bringing the provided edge to the opposite edge.
 
+        For finite surfaces, the similarities are computed once and kept in a
+        table (see :meth:`invalidate_caches`).
+
         EXAMPLES::
         
             sage: from flatsurf.geometry.similarity_surface_generators import SimilaritySurfaceGenerators
@@ -321,15 +526,30 @@ class SimilaritySurface(Surface):
             (1, 3)
             sage: g((2,-2))
             (2, 0)
+            sage: s.edge_transformation(0,0) is g
+            True
+
+            sage: from flatsurf import *
+            sage: w = translation_surfaces.infinite_staircase1().window(1)
+            sage: w.edge_transformation(1, 3)
+            Traceback (most recent call last):
+            ...
+            ValueError: edge 3 of polygon 1 is free
         """
-        q=self.polygon(p)
+        try:
+            return self._edge_transformations[(p,e)]
+        except AttributeError:
+            self._edge_transformations = {}
+        except KeyError:
+            pass
         G=SimilarityGroup(self.base_ring())
-        a=self.polygon(p).vertex(e)
-        b=self.polygon(p).vertex(e+1)
+        q=self.polygon(p)
+        a=q.vertex(e)
+        b=q.vertex(e+1)
         # This is the similarity carrying the origin to a and (1,0) to b:
         g=G(b[0]-a[0],b[1]-a[1],a[0],a[1])
 
-        pp,ee = self.opposite_edge(p,e)
+        pp,ee = self._glued_edge(p,e)
         qq=self.polygon(pp)
         # Be careful here: opposite vertices are identified
         aa=qq.vertex(ee+1)
@@ -338,16 +558,32 @@ class SimilaritySurface(Surface):
         gg=G(bb[0]-aa[0],bb[1]-aa[1],aa[0],aa[1])
 
         # This is the similarity carrying (a,b) to (aa,bb):
-        return gg*(~g)
+        t = gg*(~g)
+        if self.is_finite():
+            self._edge_transformations[(p,e)] = t
+        return t
 
     def edge_dict(self):
+        r"""
+        Return the dictionary of the gluings of this finite surface. The free
+        edges are mapped to ``None``.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: translation_surfaces.square_torus().edge_dict()
+            {(0, 0): (0, 2), (0, 1): (0, 3), (0, 2): (0, 0), (0, 3): (0, 1)}
+            sage: w = translation_surfaces.infinite_staircase1().window(1)
+            sage: w.edge_dict()[(1,1)] is None
+            True
+        """
         if not self.is_finite():
             raise ValueError("the surface must be finite")
         edges = {}
         for l,p in self.label_polygon_iterator():
             for e in xrange(p.num_edges()):
-                ll,ee = self.opposite_edge(l,e)
-                edges[(l,e)] = (ll,ee)
+                edges[(l,e)] = self.opposite_edge(l,e)
+        return edges
 
     def minimal_translation_cover(self):
         r"""
@@ -367,9 +603,24 @@ class SimilaritySurface(Surface):
             TranslationSurface built from infinitely many polygons
             sage: T.polygon(T.base_label())
             Polygon: (0, 0), (2, -2), (2, 0)
+
+        The cover of a finite rational cone surface is finite and stored as a
+        list of polygons (see
+        :class:`~flatsurf.geometry.translation_surface.FiniteMinimalTranslationCover`)::
+
+            sage: from flatsurf.geometry.rational_cone_surface import RationalConeSurface
+            sage: P = polygons(vertices=[(0,0), (1,0), (0,1)])
+            sage: T = RationalConeSurface(similarity_surfaces.billiard(P)).minimal_translation_cover()
+            sage: T.underlying_surface().cover_label(3)
+            (1, [ 0 -1]
+            [ 1  0])
         """
-        from flatsurf.geometry.translation_surface import MinimalTranslationCover, TranslationSurface
-        return TranslationSurface(MinimalTranslationCover(self))
+        from flatsurf.geometry.translation_surface import (MinimalTranslationCover,
+                FiniteMinimalTranslationCover, TranslationSurface)
+        cover = MinimalTranslationCover(self)
+        if cover.is_finite() and not self.has_free_edges():
+            cover = FiniteMinimalTranslationCover(cover)
+        return TranslationSurface(cover)
 
     def vector_space(self):
         r"""
@@ -486,7 +737,48 @@ class SimilaritySurface(Surface):
             return self.tangent_bundle(R)(lab, p, v)
         else:
             return self.tangent_bundle(ring)(lab, p, v)
-    
+
+    def saddle_connections(self, squared_length_bound, initial_label=None, initial_vertex=None, processes=None, checkpoint=None):
+        r"""
+        Return an iterator over the saddle connections of length at most the
+        square root of ``squared_length_bound`` by increasing length.
+
+        See :func:`~flatsurf.geometry.saddle_connection.saddle_connections`
+        for the description of the arguments.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: s = translation_surfaces.mcmullen_L(1,1,1,1)
+            sage: it = s.saddle_connections(4)
+            sage: next(it)
+            Saddle connection with holonomy (1, 0) from (0, 0) to (0, 1)
+            sage: len(list(s.saddle_connections(4)))
+            24
+        """
+        from flatsurf.geometry.saddle_connection import saddle_connections
+        return saddle_connections(self, squared_length_bound, initial_label, initial_vertex, processes, checkpoint)
+
+    def direction_sweep(self, label, point, directions, job, processes=None, chunksize=1, checkpoint=None):
+        r"""
+        Return an iterator over the results of ``job`` on the tangent vectors
+        based at ``point`` in the polygon ``label`` in each of the directions
+        ``directions``.
+
+        See :func:`~flatsurf.geometry.direction_sweep.direction_sweep` for
+        the description of the arguments.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: from flatsurf.geometry.direction_sweep import ClosingJob
+            sage: t = translation_surfaces.square_torus()
+            sage: list(t.direction_sweep(0, (1/2,1/3), [(1,1), (2,3), (1,1/5)], ClosingJob(4)))
+            [2, None, None]
+        """
+        from flatsurf.geometry.direction_sweep import direction_sweep
+        return direction_sweep(self, label, point, directions, job, processes, chunksize, checkpoint)
+
     def triangulation_mapping(self):
         r"""
         Return a SurfaceMapping triangulating the suface.
@@ -645,6 +937,18 @@ class SimilaritySurface(Surface):
         - their base labels are equal,
         - their polygons are equal and labeled and glued in the same way.
         For infinite surfaces we use reference equality.
+
+        The surfaces are only compared polygon by polygon when their hashes
+        (see :meth:`__hash__`) agree.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: s = translation_surfaces.mcmullen_L(1,1,1,1)
+            sage: s == translation_surfaces.mcmullen_L(1,1,1,1)
+            True
+            sage: s == translation_surfaces.mcmullen_L(1,1,1,2)
+            False
         """
         if not self.is_finite():
             return self is other
@@ -660,6 +964,8 @@ class SimilaritySurface(Surface):
             return False
         if self.num_polygons() != other.num_polygons():
             return False
+        if hash(self) != hash(other):
+            return False
         for label,polygon in self.label_polygon_iterator():
             try:
                 polygon2 = other.polygon(label)
@@ -678,11 +984,35 @@ class SimilaritySurface(Surface):
     def __hash__(self):
         r"""
         Hash compatible with equals.
+
+        For finite surfaces, the hash is a fingerprint made of the base ring,
+        the base label, the polygons and the gluings. It is computed once and
+        kept until :meth:`invalidate_caches` is called. Infinite surfaces are
+        hashed by identity.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: s = translation_surfaces.mcmullen_L(1,1,1,1)
+            sage: len(set([s, translation_surfaces.mcmullen_L(1,1,1,1)]))
+            1
+            sage: s._hash == hash(s)
+            True
+            sage: s.invalidate_caches()
+            sage: hasattr(s, '_hash')
+            False
         """
+        try:
+            return self._hash
+        except AttributeError:
+            pass
+        if not self.is_finite():
+            return id(self)
         h = 17*hash(self.base_ring())+23*hash(self.base_label())
         for pair in self.label_polygon_iterator():
             h = h + 7*hash(pair)
         for edgepair in self.edge_gluing_iterator():
             h = h + 3*hash(edgepair)
-        return h
+        self._hash = hash(h)
+        return self._hash
 
@@ -87,7 +87,6 @@ class EInfinitySurface(Surface):
     represent horizontal cylinders.
     """
     def __init__(self,lambda_squared=None, field=None):
-        TranslationSurface_generic.__init__(self)
         if lambda_squared==None:
             from sage.rings.number_field.number_field import NumberField
             from sage.rings.polynomial.polynomial_ring_constructor import PolynomialRing
@@ -104,6 +103,16 @@ class EInfinitySurface(Surface):
                 self._field=field
                 self._l=field(lambda_squared)
 
+        # For n > 2, the weights satisfy
+        #   black(n) = white(n-1) - black(n-1)
+        #   white(n) = l*black(n) - white(n-1)
+        # so that (white(n), black(n)) = M^(n-2) (white(2), black(2)).
+        from sage.matrix.constructor import matrix
+        from sage.modules.free_module_element import vector
+        l=self._l
+        self._M=matrix(self._field, [[l-1, -l], [1, -1]])
+        self._v2=vector(self._field, [1-3*l+l**2, l-1])
+
     def _repr_(self):
         r"""
         String representation.
@@ -119,35 +128,60 @@ class EInfinitySurface(Surface):
     def base_label(self):
         return ZZ.zero()
 
-    @cached_method
+    def _weights(self, n):
+        r"""
+        Return the pair ``(white(n), black(n))`` for ``n >= 2``.
+
+        The recurrence is evaluated with a power of a 2x2 matrix so that only
+        `O(\log n)` products are computed and nothing is stored.
+        """
+        return self._M**(n-2) * self._v2
+
     def get_white(self,n):
-        r"""Get the weight of the white endpoint of edge n."""
+        r"""
+        Get the weight of the white endpoint of edge n.
+
+        EXAMPLES::
+
+            sage: from flatsurf.geometry.similarity_surface_generators import EInfinitySurface
+            sage: S = EInfinitySurface()
+            sage: [S.get_white(n) for n in range(-2, 5)]
+            [r^2 - 3*r + 1, r - 1, r, r, r^2 - 3*r + 1, r, r - 1]
+            sage: all(S.get_white(n) == S.base_ring().gen()*S.get_black(n) - S.get_white(n-1) for n in range(3, 20))
+            True
+            sage: S.get_white(10000) > 0
+            True
+        """
         l=self._l
         if n==0 or n==1:
             return l
         if n==-1:
             return l-1
-        if n==2:
-            return 1-3*l+l**2
-        if n>2:
-            x=self.get_white(n-1)
-            y=self.get_black(n)
-            return l*y-x
-        return self.get_white(-n)
+        if n<0:
+            n=-n
+        return self._weights(n)[0]
 
-    @cached_method
     def get_black(self,n):
-        r"""Get the weight of the black endpoint of edge n."""
+        r"""
+        Get the weight of the black endpoint of edge n.
+
+        EXAMPLES::
+
+            sage: from flatsurf.geometry.similarity_surface_generators import EInfinitySurface
+            sage: S = EInfinitySurface()
+            sage: [S.get_black(n) for n in range(-2, 5)]
+            [r^2 - 4*r + 2, r - 1, 1, r - 1, r - 1, r^2 - 4*r + 2, -r^2 + 5*r - 2]
+            sage: all(S.get_black(n) == S.get_white(n-1) - S.get_black(n-1) for n in range(3, 20))
+            True
+        """
         l=self._l
         if n==0:
             return self._field(1)
         if n==1 or n==-1 or n==2:
             return l-1
-        if n>2:
-            x=self.get_black(n-1)
-            y=self.get_white(n-1)
-            return y-x
-        return self.get_black(1-n)
+        if n<0:
+            n=1-n
+        return self._weights(n)[1]
 
     def polygon(self, lab):
         r"""
@@ -155,8 +189,8 @@ class EInfinitySurface(Surface):
         """
         if lab not in self.polygon_labels():
             raise ValueError("lab (=%s) not a valid label"%lab)
-        from flatsurf.geometry.polygon import rectangle
-        return rectangle(2*self.get_black(lab),self.get_white(lab))
+        from flatsurf.geometry.polygon import polygons
+        return polygons.rectangle(2*self.get_black(lab),self.get_white(lab))
 
     def polygon_labels(self):
         r"""
@@ -233,6 +267,15 @@ def e_infinity_surface(lambda_squared=None, field=None):
     Here, black vertices are colored *, and white o. 
     Black nodes represent vertical cylinders and white nodes
     represent horizontal cylinders.
+
+    EXAMPLES::
+
+        sage: from flatsurf.geometry.similarity_surface_generators import e_infinity_surface
+        sage: S = e_infinity_surface()
+        sage: S
+        TranslationSurface built from infinitely many polygons
+        sage: S.polygon(1000).num_edges()
+        4
     """
     return TranslationSurface(EInfinitySurface(lambda_squared, field))
 
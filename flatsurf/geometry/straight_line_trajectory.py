@@ -1,7 +1,9 @@
+from bisect import bisect
 from collections import deque, defaultdict
 
 from flatsurf.geometry.tangent_bundle import *
-from flatsurf.geometry.polygon import is_same_direction
+from flatsurf.geometry.polygon import is_same_direction, PolygonPosition
+from flatsurf.geometry.directional_flow import DirectionalFlow
 
 # Vincent question:
 # using deque has the disadvantage of losing the initial points
@@ -49,7 +51,184 @@ def get_linearity_coeff(u, v):
     else:
         raise ValueError("zero vector")
 
-class SegmentInPolygon:
+def find_cycle(f, x0, limit=None, key=None):
+    r"""
+    Detect a cycle in the sequence ``x0, f(x0), f(f(x0)), ...`` with Brent's
+    algorithm.
+
+    Only two states are kept in memory at any time. The sequence is assumed
+    to stop as soon as ``f`` returns ``None`` (e.g. when a trajectory hits a
+    singularity).
+
+    INPUT:
+
+    - ``f`` -- a function
+
+    - ``x0`` -- the initial state
+
+    - ``limit`` -- an optional bound on the number of evaluations of ``f``
+      used to find the period
+
+    - ``key`` -- an optional function used to compare states (by default the
+      states themselves are compared)
+
+    OUTPUT: either ``None`` if the sequence stops or the limit is reached, or
+    a pair ``(mu, lam)`` where ``mu`` is the length of the preperiod and
+    ``lam`` the length of the period.
+
+    EXAMPLES::
+
+        sage: from flatsurf.geometry.straight_line_trajectory import find_cycle
+        sage: find_cycle(lambda x: (x+3) % 10, 0)
+        (0, 10)
+        sage: find_cycle(lambda x: x**2 % 21, 2)
+        (1, 2)
+        sage: find_cycle(lambda x: x+1, 0, limit=100) is None
+        True
+        sage: find_cycle(lambda x: x-1 if x else None, 10) is None
+        True
+    """
+    if key is None:
+        key = lambda x: x
+
+    # find the period
+    power = lam = 1
+    tortoise = x0
+    k_tortoise = key(tortoise)
+    hare = f(x0)
+    n = 1
+    while True:
+        if hare is None:
+            return None
+        k_hare = key(hare)
+        if k_hare == k_tortoise:
+            break
+        if limit is not None and n >= limit:
+            return None
+        if power == lam:
+            tortoise = hare
+            k_tortoise = k_hare
+            power *= 2
+            lam = 0
+        hare = f(hare)
+        n += 1
+        lam += 1
+
+    # find the start of the period
+    tortoise = hare = x0
+    for i in range(lam):
+        hare = f(hare)
+    mu = 0
+    while key(tortoise) != key(hare):
+        tortoise = f(tortoise)
+        hare = f(hare)
+        mu += 1
+
+    return (mu, lam)
+
+def run_length_encoding(letters):
+    r"""
+    Iterator over the run-length encoding of the sequence ``letters`` as pairs
+    ``(letter, multiplicity)``.
+
+    The input is consumed lazily and can be an infinite iterator.
+
+    EXAMPLES::
+
+        sage: from flatsurf.geometry.straight_line_trajectory import run_length_encoding
+        sage: list(run_length_encoding('aabaaab'))
+        [('a', 2), ('b', 1), ('a', 3), ('b', 1)]
+        sage: list(run_length_encoding([]))
+        []
+
+        sage: from flatsurf import *
+        sage: t = translation_surfaces.square_torus()
+        sage: alphabet = {(0,0): 'a', (0,1): 'b', (0,2):'a', (0,3): 'b'}
+        sage: v = t.tangent_vector(0, (1/2,0), (7,13))
+        sage: l = v.straight_line_trajectory()
+        sage: list(run_length_encoding(l.coding_iterator(19, alphabet)))
+        [('a', 1), ('b', 1), ('a', 2), ('b', 1), ('a', 2), ('b', 1), ('a', 2),
+         ('b', 1), ('a', 2), ('b', 1), ('a', 2), ('b', 1), ('a', 2), ('b', 1)]
+    """
+    it = iter(letters)
+    try:
+        current = next(it)
+    except StopIteration:
+        return
+    n = 1
+    for letter in it:
+        if letter == current:
+            n += 1
+        else:
+            yield (current, n)
+            current = letter
+            n = 1
+    yield (current, n)
+
+def write_coding(letters, output, chunk_size=65536):
+    r"""
+    Write the sequence ``letters`` to ``output`` by chunks.
+
+    Only ``chunk_size`` letters are kept in memory at a time so that this
+    function can be used together with
+    :meth:`AbstractStraightLineTrajectory.coding_iterator` to save very long
+    codings.
+
+    INPUT:
+
+    - ``letters`` -- an iterable of strings (typically one character each)
+
+    - ``output`` -- either a file name or an object with a ``write`` method
+      (e.g. an open file or a ``mmap.mmap`` buffer)
+
+    - ``chunk_size`` -- (default: ``65536``) the number of letters written at
+      once
+
+    OUTPUT: the number of letters written
+
+    EXAMPLES::
+
+        sage: from flatsurf import *
+        sage: from flatsurf.geometry.straight_line_trajectory import write_coding
+        sage: t = translation_surfaces.square_torus()
+        sage: alphabet = {(0,0): 'a', (0,1): 'b', (0,2):'a', (0,3): 'b'}
+        sage: v = t.tangent_vector(0, (1/2,0), (7,13))
+        sage: l = v.straight_line_trajectory()
+
+        sage: filename = tmp_filename()
+        sage: write_coding(l.coding_iterator(99, alphabet), filename, chunk_size=7)
+        100
+        sage: w = open(filename).read()
+        sage: w[:20]
+        'abaabaabaabaabaabaab'
+        sage: w.count('a'), w.count('b')
+        (65, 35)
+
+        sage: import mmap
+        sage: buf = mmap.mmap(-1, 20)
+        sage: write_coding(l.coding_iterator(19, alphabet), buf)
+        20
+        sage: buf[:] == w[:20]
+        True
+    """
+    if isinstance(output, str):
+        with open(output, 'w') as f:
+            return write_coding(letters, f, chunk_size)
+
+    n = 0
+    chunk = []
+    for letter in letters:
+        chunk.append(letter)
+        if len(chunk) == chunk_size:
+            output.write(''.join(chunk))
+            n += len(chunk)
+            chunk = []
+    if chunk:
+        output.write(''.join(chunk))
+        n += len(chunk)
+    return n
+
+class SegmentInPolygon(object):
     r"""
     Maximal segment in a polygon of a similarity surface
 
@@ -62,6 +241,8 @@ class SegmentInPolygon:
         sage: SegmentInPolygon(v)
         Segment in polygon 0 starting at (1/3, -1/3) and ending at (1/3, 0)
     """
+    __slots__ = ['_start', '_end']
+
     def __init__(self, start, end=None):
         if not end is None:
             # WARNING: here we assume that both start and end are on the
@@ -82,6 +263,9 @@ class SegmentInPolygon:
                self._start != other._start or \
                self._end != other._end
 
+    def __hash__(self):
+        return hash((self._start, self._end))
+
     def __repr__(self):
         r"""
         TESTS::
@@ -131,6 +315,24 @@ class SegmentInPolygon:
     def polygon_label(self):
         return self._start.polygon_label()
 
+    def duration(self):
+        r"""
+        Return the time spent in this segment, that is the ratio between its
+        holonomy and the vector of its start.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: from flatsurf.geometry.straight_line_trajectory import SegmentInPolygon
+            sage: s = similarity_surfaces.example()
+            sage: v = s.tangent_vector(0, (1/3,-1/4), (0,1))
+            sage: SegmentInPolygon(v).duration()
+            1/3
+        """
+        v = self._start
+        w = v.vector()
+        return (self._end.point() - v.point()).dot_product(w) / w.dot_product(w)
+
     def invert(self):
         return SegmentInPolygon(self._end, self._start)
 
@@ -193,6 +395,17 @@ class AbstractStraightLineTrajectory:
 
     - ``def segment(self, i)``
     - ``def segments(self)``
+    - ``def flow(self, steps, statistics=None)``
+    - ``def _crossings(self, steps)``
+    - ``def segment_iterator(self, steps)``
+    - ``def _is_periodic(self)``
+    - ``def _segment_state(self, i)`` and ``def _restore(self, surface,
+      state)`` (see :meth:`checkpoint_state`)
+
+    and maintain the deque ``_times`` of the times at which the trajectory
+    enters its segments followed by the time at which it leaves the last one
+    (see :meth:`time_range`) together with the counters of dropped segments
+    (see :meth:`dropped_segments`).
     """
     def __repr__(self):
         start = self.segment(0).start()
@@ -272,8 +485,9 @@ class AbstractStraightLineTrajectory:
             ....:     assert w.count('b') == x-1
         """
         ans = []
+        segments = self.segments()
 
-        s = self._segments[0]
+        s = segments[0]
         start = s.start()
         if start._position._position_type == start._position.EDGE_INTERIOR:
             p = s.polygon_label()
@@ -282,8 +496,8 @@ class AbstractStraightLineTrajectory:
             if lab is not None:
                 ans.append(lab)
 
-        for i in range(len(self._segments)-1):
-            s = self._segments[i]
+        for i in range(len(segments)-1):
+            s = segments[i]
             end = s.end()
             p = s.polygon_label()
             e = end._position.get_edge()
@@ -291,10 +505,10 @@ class AbstractStraightLineTrajectory:
             if lab is not None:
                 ans.append(lab)
 
-        s = self._segments[-1]
+        s = segments[-1]
         end = s.end()
         if end._position._position_type == end._position.EDGE_INTERIOR and \
-           end.invert() != start:
+           not end.is_on_free_edge() and end.invert() != start:
             p = s.polygon_label()
             e = end._position.get_edge()
             lab = (p,e) if alphabet is None else alphabet.get((p,e))
@@ -303,17 +517,469 @@ class AbstractStraightLineTrajectory:
 
         return ans
 
+    def coding_iterator(self, steps=None, alphabet=None):
+        r"""
+        Return an iterator over the coding of the forward trajectory from the
+        initial point of this trajectory.
+
+        The letters are produced while flowing and no segment is stored. The
+        first ``n+1`` letters of this iterator coincide with the coding of
+        the trajectory made of the first ``n`` segments (see :meth:`coding`).
+        Contrarily to :meth:`coding` the iteration does not stop when the
+        trajectory closes up.
+
+        INPUT:
+
+        - ``steps`` -- an optional bound on the number of polygons crossed
+          (the iterator stops earlier if a singularity or a free edge is reached)
+
+        - ``alphabet`` -- an optional dictionary ``(lab,nb) -> letter``. If
+          some labels are avoided then these crossings are ignored.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: t = translation_surfaces.square_torus()
+            sage: alphabet = {(0,0): 'a', (0,1): 'b', (0,2):'a', (0,3): 'b'}
+
+            sage: v = t.tangent_vector(0, (1/2,0), (5,6))
+            sage: l = v.straight_line_trajectory()
+            sage: list(l.coding_iterator(1)) == l.coding()
+            True
+            sage: print ''.join(l.coding_iterator(alphabet=alphabet))
+            ababa
+
+            sage: v = t.tangent_vector(0, (1/2,0), (7,13))
+            sage: l = v.straight_line_trajectory()
+            sage: print ''.join(l.coding_iterator(19, alphabet))
+            abaabaabaabaabaabaab
+            sage: l.combinatorial_length()
+            1
+
+        The same is available for the implementation based on interval
+        exchanges::
+
+            sage: from flatsurf.geometry.straight_line_trajectory import StraightLineTrajectoryTranslation
+            sage: l = StraightLineTrajectoryTranslation(v)
+            sage: print ''.join(l.coding_iterator(19, alphabet))
+            abaabaabaabaabaabaab
+        """
+        if alphabet is None:
+            for c in self._crossings(steps):
+                yield c
+        else:
+            for c in self._crossings(steps):
+                lab = alphabet.get(c)
+                if lab is not None:
+                    yield lab
+
+    def intersection_numbers(self, other):
+        r"""
+        Return the pair ``(geometric, algebraic)`` made of the number of
+        intersections and the algebraic intersection number between this
+        trajectory and ``other``.
+
+        See
+        :func:`~flatsurf.geometry.trajectory_intersection.intersection_numbers`.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: t = translation_surfaces.square_torus()
+            sage: l1 = t.tangent_vector(0, (1/2,1/3), (1,2)).straight_line_trajectory()
+            sage: l2 = t.tangent_vector(0, (1/3,1/2), (-3,1)).straight_line_trajectory()
+            sage: l1.flow(5); l2.flow(5)
+            sage: l1.is_closed() and l2.is_closed()
+            True
+            sage: l1.intersection_numbers(l2)
+            (7, 7)
+        """
+        from flatsurf.geometry.trajectory_intersection import intersection_numbers
+        return intersection_numbers(self, other)
+
+    def _init_window(self, max_segments):
+        r"""
+        Check ``max_segments`` and initialize the counters of dropped
+        segments.
+        """
+        if max_segments is not None:
+            max_segments = int(max_segments)
+            if max_segments < 1:
+                raise ValueError("max_segments must be positive")
+        self._max_segments = max_segments
+        self._dropped_start = 0
+        self._dropped_end = 0
+
+    def max_segments(self):
+        r"""
+        Return the maximal number of segments kept in memory or ``None`` if
+        this trajectory is not bounded.
+
+        When the bound is reached, flowing forward (resp. backward) drops the
+        first (resp. last) segment so that only a window of the trajectory is
+        kept. The methods of the trajectory (e.g. :meth:`coding` or
+        :meth:`time_range`) apply to this window.
+        """
+        return self._max_segments
+
+    def dropped_segments(self):
+        r"""
+        Return the pair ``(n0, n1)`` where ``n0`` (resp. ``n1``) is the number
+        of segments dropped at the beginning (resp. the end) of this trajectory
+        (see :meth:`max_segments`).
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: O = translation_surfaces.regular_octagon()
+            sage: v = O.tangent_vector(0, (1,1), (33,45))
+            sage: L = v.straight_line_trajectory(max_segments=5)
+            sage: L.flow(100)
+            sage: L.combinatorial_length()
+            5
+            sage: L.dropped_segments()
+            (96, 0)
+            sage: L.flow(-8)
+            sage: L.dropped_segments()
+            (96, 8)
+        """
+        return (self._dropped_start, self._dropped_end)
+
+    def checkpoint_state(self, backward=False, window=False):
+        r"""
+        Return a compact state from which the flow of this trajectory can be
+        resumed with :meth:`resume`.
+
+        The state only holds the start of the last segment (or the first one
+        if ``backward`` is ``True``) as the label of a polygon, the position
+        of the point and the direction (for translation surfaces the position
+        is the exact triple used by the flow), together with the time and the
+        counters of dropped segments. The surface is not part of the state.
+
+        If ``window`` is ``True``, the state holds the start of the first
+        segment and the number of segments instead: the whole window of
+        segments is computed again by :meth:`resume`.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: O = translation_surfaces.regular_octagon()
+            sage: L = O.tangent_vector(0, (1,1), (33,45)).straight_line_trajectory()
+            sage: L.flow(30)
+            sage: state = L.checkpoint_state()
+            sage: sorted(state)
+            ['dropped', 'edge', 'label', 'max_segments', 'num_segments', 'position', 'time', 'vector']
+            sage: state['dropped']
+            (30, 0)
+            sage: L1 = L.resume(state)
+            sage: L1.combinatorial_length(), L1.segment(0) == L.segment(-1)
+            (1, True)
+            sage: L1.segment_times(0) == L.segment_times(-1)
+            True
+            sage: L1.flow(10); L.flow(10)
+            sage: L1.segment(-1) == L.segment(-1) and L1.time_range()[1] == L.time_range()[1]
+            True
+
+            sage: L2 = L.resume(L.checkpoint_state(window=True))
+            sage: list(L2.segments()) == L.segments() and L2.time_range() == L.time_range()
+            True
+        """
+        n = self.combinatorial_length()
+        if window:
+            i = 0
+            dropped = self.dropped_segments()
+        elif backward:
+            i = 0
+            dropped = (self._dropped_start, self._dropped_end + n - 1)
+            n = 1
+        else:
+            i = -1
+            dropped = (self._dropped_start + n - 1, self._dropped_end)
+            n = 1
+        state = self._segment_state(i)
+        state['num_segments'] = n
+        state['max_segments'] = self._max_segments
+        state['time'] = self.segment_times(i)[0]
+        state['dropped'] = dropped
+        return state
+
+    def resume(self, state):
+        r"""
+        Return the trajectory on the same surface as this one given by
+        ``state`` (see :meth:`checkpoint_state`).
+        """
+        T = self.__class__.__new__(self.__class__)
+        T._restore(self.initial_tangent_vector().surface(), state)
+        return T
+
+    def __getstate__(self):
+        r"""
+        Return the state of this trajectory used for pickling.
+
+        It is made of the surface and of the state of the window of segments
+        (see :meth:`checkpoint_state`).
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: from flatsurf.geometry.straight_line_trajectory import StraightLineTrajectory
+            sage: O = translation_surfaces.regular_octagon()
+            sage: v = O.tangent_vector(0, (1,1), (33,45))
+            sage: for L in [v.straight_line_trajectory(max_segments=5),
+            ....:           StraightLineTrajectory(v, max_segments=5)]:
+            ....:     L.flow(30)
+            ....:     L2 = loads(dumps(L))
+            ....:     print type(L2).__name__, L2.combinatorial_length(), L2.dropped_segments()
+            ....:     print L2.segments() == L.segments(), L2.time_range() == L.time_range()
+            StraightLineTrajectoryTranslation 5 (26, 0)
+            True True
+            StraightLineTrajectory 5 (26, 0)
+            True True
+        """
+        state = self.checkpoint_state(window=True)
+        state['surface'] = self.initial_tangent_vector().surface()
+        return state
+
+    def __setstate__(self, state):
+        self._restore(state['surface'], state)
+
+    def time_range(self):
+        r"""
+        Return the pair of times ``(t0, t1)`` at which this trajectory starts
+        and ends.
+
+        The time is measured relatively to the vector of the tangent vector
+        used to build the trajectory and its base point is at time ``0``. For
+        a translation surface the point at time ``t`` is hence obtained by
+        flowing the base point by ``t`` times this vector.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: O = translation_surfaces.regular_octagon()
+            sage: v = O.tangent_vector(0, (1,1), (33,45))
+            sage: L = v.straight_line_trajectory()
+            sage: L.time_range()
+            (-1/45, 1/78*a)
+            sage: L.flow(2)
+            sage: L.flow(-1)
+            sage: L.time_range()
+            (-1/66*a - 1/33, 1/26*a + 2/39)
+        """
+        return (self._times[0], self._times[-1])
+
+    def segment_times(self, i):
+        r"""
+        Return the pair of times ``(t0, t1)`` at which the trajectory enters
+        and leaves its ``i``-th segment.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: O = translation_surfaces.regular_octagon()
+            sage: v = O.tangent_vector(0, (1,1), (33,45))
+            sage: L = v.straight_line_trajectory()
+            sage: L.flow(2)
+            sage: L.flow(-1)
+            sage: L.segment_times(0)
+            (-1/66*a - 1/33, -1/45)
+            sage: L.segment_times(1)
+            (-1/45, 1/78*a)
+            sage: L.segment_times(-1)
+            (1/39*a + 1/39, 1/26*a + 2/39)
+        """
+        n = len(self._times) - 1
+        if i < 0:
+            i += n
+        if i < 0 or i >= n:
+            raise IndexError("segment index out of range")
+        return (self._times[i], self._times[i+1])
+
+    def segment_at_time(self, t):
+        r"""
+        Return the index of the segment containing the point at time ``t``.
+
+        The segments are closed on the left so that at a crossing time the
+        next segment is returned (unless ``t`` is the end of the trajectory).
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: O = translation_surfaces.regular_octagon()
+            sage: v = O.tangent_vector(0, (1,1), (33,45))
+            sage: L = v.straight_line_trajectory()
+            sage: L.flow(2)
+            sage: L.flow(-1)
+            sage: t0, t1 = L.time_range()
+            sage: L.segment_at_time(t0)
+            0
+            sage: L.segment_at_time(0)
+            1
+            sage: L.segment_at_time(L.segment_times(2)[0])
+            2
+            sage: L.segment_at_time(t1)
+            3
+            sage: L.segment_at_time(1)
+            Traceback (most recent call last):
+            ...
+            ValueError: t = 1 is not in the time range of the trajectory
+        """
+        t0, t1 = self.time_range()
+        if t < t0 or t > t1:
+            raise ValueError("t = {} is not in the time range of the trajectory".format(t))
+        return min(bisect(self._times, t) - 1, len(self._times) - 2)
+
+    def flow_for_time(self, t):
+        r"""
+        Extend this trajectory (forward or backward) until the time ``t`` is
+        reached.
+
+        The trajectory is not extended beyond singularities nor when it closes
+        up. Use :meth:`time_range` to check whether ``t`` has been reached.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: O = translation_surfaces.regular_octagon()
+            sage: v = O.tangent_vector(0, (1,1), (33,45))
+            sage: L = v.straight_line_trajectory()
+            sage: L.flow_for_time(1/5)
+            sage: L.time_range()
+            (-1/45, 7/78*a + 3/26)
+            sage: L.combinatorial_length()
+            7
+        """
+        while t > self._times[-1] and \
+              not self.is_forward_separatrix() and \
+              not self.is_closed():
+            self.flow(1)
+        while t < self.time_range()[0] and \
+              not self.is_backward_separatrix() and \
+              not self.is_closed():
+            self.flow(-1)
+
+    def position_at_time(self, t, extend=True):
+        r"""
+        Return the tangent vector of this trajectory at time ``t``.
+
+        The time is measured relatively to the vector of the initial tangent
+        vector and its base point is at time ``0`` (see :meth:`time_range`).
+        The segment containing the point is found by bisection.
+
+        INPUT:
+
+        - ``t`` -- a time
+
+        - ``extend`` -- boolean (default ``True``) -- whether to extend the
+          trajectory if ``t`` is not in its time range. Closed trajectories
+          of translation surfaces are considered periodic.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: t = translation_surfaces.square_torus()
+            sage: v = t.tangent_vector(0, (1/2,1/4), (1,2))
+            sage: L = v.straight_line_trajectory()
+            sage: L.position_at_time(0)
+            SimilaritySurfaceTangentVector in polygon 0 based at (1/2, 1/4) with vector (1, 2)
+            sage: L.position_at_time(1/4)
+            SimilaritySurfaceTangentVector in polygon 0 based at (3/4, 3/4) with vector (1, 2)
+            sage: L.position_at_time(1/2)
+            SimilaritySurfaceTangentVector in polygon 0 based at (0, 1/4) with vector (1, 2)
+            sage: L.position_at_time(-3/4)
+            SimilaritySurfaceTangentVector in polygon 0 based at (3/4, 3/4) with vector (1, 2)
+
+        The trajectory is closed and its points are computed without further
+        flowing::
+
+            sage: L.is_closed()
+            True
+            sage: L.combinatorial_length()
+            3
+            sage: L.position_at_time(1000001/2)
+            SimilaritySurfaceTangentVector in polygon 0 based at (0, 1/4) with vector (1, 2)
+            sage: L.combinatorial_length()
+            3
+
+            sage: L = v.straight_line_trajectory()
+            sage: L.position_at_time(1, extend=False)
+            Traceback (most recent call last):
+            ...
+            ValueError: t = 1 is not in the time range of the trajectory
+
+        The time is not the Euclidean length but depends on the vector::
+
+            sage: O = translation_surfaces.regular_octagon()
+            sage: L = O.tangent_vector(0, (1,1), (33,45)).straight_line_trajectory()
+            sage: L.position_at_time(1/5)
+            SimilaritySurfaceTangentVector in polygon 0 based at (-5/2*a + 18/5, -7/2*a + 5) with vector (33, 45)
+            sage: L.position_at_time(-1/5)
+            SimilaritySurfaceTangentVector in polygon 0 based at (2*a - 13/5, 3*a - 4) with vector (33, 45)
+        """
+        if extend:
+            t0, t1 = self.time_range()
+            if t < t0 or t > t1:
+                self.flow_for_time(t)
+                t0, t1 = self.time_range()
+            if (t < t0 or t > t1) and self._is_periodic():
+                # periodic trajectory
+                from sage.functions.other import floor
+                t -= floor((t - t0) / (t1 - t0)) * (t1 - t0)
+        i = self.segment_at_time(t)
+        t0, _ = self.segment_times(i)
+        v = self.segment(i).start()
+        return v.bundle()(v.polygon_label(), v.point() + (t - t0) * v.vector(), v.vector())
+
 class StraightLineTrajectory(AbstractStraightLineTrajectory):
     r"""
     Straight-line trajectory in a similarity surface.
+
+    INPUT:
+
+    - ``tangent_vector`` -- the initial tangent vector
+
+    - ``max_segments`` -- an optional bound on the number of segments kept in
+      memory (see :meth:`max_segments`)
+
+    EXAMPLES:
+
+    A trajectory that only keeps its last three segments::
+
+        sage: from flatsurf import *
+        sage: from flatsurf.geometry.straight_line_trajectory import StraightLineTrajectory
+        sage: t = translation_surfaces.square_torus()
+        sage: alphabet = {(0,0): 'a', (0,1): 'b', (0,2):'a', (0,3): 'b'}
+        sage: v = t.tangent_vector(0, (1/2,0), (7,13))
+        sage: L = StraightLineTrajectory(v, max_segments=3)
+        sage: L.flow(15)
+        sage: L.combinatorial_length()
+        3
+        sage: print ''.join(L.coding(alphabet))
+        baab
+        sage: print ''.join(v.straight_line_trajectory().coding_iterator(19, alphabet))
+        abaabaabaabaabaabaab
+        sage: L.flow(10)
+        sage: L.is_closed()
+        False
     """
-    def __init__(self, tangent_vector):
-        self._segments = deque()
+    def __init__(self, tangent_vector, max_segments=None):
+        self._init_window(max_segments)
+        self._segments = deque(maxlen=self._max_segments)
         seg = SegmentInPolygon(tangent_vector)
         self._segments.append(seg)
         self._setup_forward()
         self._setup_backward()
 
+        # The time along the trajectory is measured with respect to the
+        # vector of the segments so that the base point of tangent_vector is
+        # at time 0 (see position_at_time). The deque self._times contains
+        # the times at which the trajectory enters its segments followed by
+        # the time at which it leaves the last one.
+        w = tangent_vector.vector()
+        t0 = (seg.start().point() - tangent_vector.point()).dot_product(w) / w.dot_product(w)
+        self._times = deque([t0, t0 + seg.duration()],
+                            None if max_segments is None else self._max_segments + 1)
+
     def segment(self, i):
         r"""
         EXAMPLES::
@@ -343,16 +1009,36 @@ class StraightLineTrajectory(AbstractStraightLineTrajectory):
     def segments(self):
         return self._segments
 
+    def _segment_state(self, i):
+        r"""
+        Return the dictionary made of the label, the point and the vector of
+        the start of the ``i``-th segment (see :meth:`checkpoint_state`).
+        """
+        v = self._segments[i].start()
+        return {'label': v.polygon_label(), 'point': v.point(), 'vector': v.vector()}
+
+    def _restore(self, surface, state):
+        r"""
+        Initialize this trajectory from ``state`` (see
+        :meth:`checkpoint_state`).
+        """
+        v = surface.tangent_vector(state['label'], state['point'], state['vector'])
+        self.__init__(v, state['max_segments'])
+        self.flow(state['num_segments'] - 1)
+        shift = state['time'] - self._times[0]
+        self._times = deque((t + shift for t in self._times), self._times.maxlen)
+        self._dropped_start, self._dropped_end = state['dropped']
+
     def _setup_forward(self):
         v = self.terminal_tangent_vector()
-        if v.is_based_at_singularity():
+        if v.is_based_at_singularity() or v.is_on_free_edge():
             self._forward = None
         else:
             self._forward = v.invert()
 
     def _setup_backward(self):
         v = self.initial_tangent_vector()
-        if v.is_based_at_singularity():
+        if v.is_based_at_singularity() or v.is_on_free_edge():
             self._backward = None
         else:
             self._backward = v.invert()
@@ -360,6 +1046,10 @@ class StraightLineTrajectory(AbstractStraightLineTrajectory):
     def initial_tangent_vector(self):
         return self._segments[0].start()
 
+    def _is_periodic(self):
+        return self.is_closed() and \
+               self._forward.vector() == self.initial_tangent_vector().vector()
+
     def terminal_tangent_vector(self):
         return self._segments[-1].end()
 
@@ -413,12 +1103,17 @@ class StraightLineTrajectory(AbstractStraightLineTrajectory):
         return (not self.is_forward_separatrix()) and \
             self._forward.differs_by_scaling(self.initial_tangent_vector())
 
-    def flow(self, steps):
+    def flow(self, steps, statistics=None):
         r"""
         Append or preprend segments to the trajectory.
         If steps is positive, attempt to append this many segments.
         If steps is negative, attempt to prepend this many segments.
-        Will fail gracefully the trajectory hits a singularity or closes up.
+        Will fail gracefully the trajectory hits a singularity or a free edge
+        (see :meth:`~flatsurf.geometry.surface.Surface.opposite_edge`) or
+        closes up.
+
+        If ``statistics`` is provided, the new segments are added to it (see
+        :class:`~flatsurf.geometry.trajectory_statistics.TrajectoryStatistics`).
 
         EXAMPLES::
 
@@ -435,20 +1130,191 @@ class StraightLineTrajectory(AbstractStraightLineTrajectory):
             sage: traj.flow(-1)
             sage: traj
             Straight line trajectory made of 3 segments from (15/16, 45/16) in polygon 1 to (61/36, 11/12) in polygon 1
+
+        On a window of an infinite surface, the trajectories stop at the free
+        edges::
+
+            sage: from flatsurf.geometry.straight_line_trajectory import StraightLineTrajectory
+            sage: w = translation_surfaces.infinite_staircase1().window(1)
+            sage: v = w.tangent_vector(0, (1/2,1/3), (1,3))
+            sage: L = v.straight_line_trajectory()
+            sage: L.flow(100); L.flow(-100)
+            sage: L
+            Straight line trajectory made of 5 segments from (13/18, 0) in polygon 2 to (1, 5/6) in polygon 1
+            sage: L.is_saddle_connection()
+            True
+            sage: L2 = StraightLineTrajectory(v)
+            sage: L2.flow(100); L2.flow(-100)
+            sage: list(L2.segments()) == L.segments()
+            True
+            sage: L2.coding() == L.coding() == list(L.coding_iterator())
+            True
+            sage: L.periodic_orbit() is None and L2.periodic_orbit() is None
+            True
         """
         while steps>0 and \
             (not self.is_forward_separatrix()) and \
             (not self.is_closed()):
-                self._segments.append(SegmentInPolygon(self._forward))
+                seg = SegmentInPolygon(self._forward)
+                full = len(self._segments) == self._max_segments
+                self._segments.append(seg)
+                self._times.append(self._times[-1] + seg.duration())
                 self._setup_forward()
+                if full:
+                    self._dropped_start += 1
+                    self._setup_backward()
+                if statistics is not None:
+                    statistics.add_segment(seg)
                 steps -= 1
         while steps<0 and \
             (not self.is_backward_separatrix()) and \
             (not self.is_closed()):
-                self._segments.appendleft(SegmentInPolygon(self._backward).invert())
+                seg = SegmentInPolygon(self._backward).invert()
+                full = len(self._segments) == self._max_segments
+                self._segments.appendleft(seg)
+                self._times.appendleft(self._times[0] - seg.duration())
                 self._setup_backward()
+                if full:
+                    self._dropped_end += 1
+                    self._setup_forward()
+                if statistics is not None:
+                    statistics.add_segment(seg)
                 steps += 1
 
+    def segment_iterator(self, steps=None):
+        r"""
+        Return an iterator over the segments of the forward trajectory from the
+        first segment of this trajectory.
+
+        The segments are not stored so that the memory usage does not depend
+        on the number of segments. The iteration does not stop when the
+        trajectory closes up.
+
+        INPUT:
+
+        - ``steps`` -- an optional bound on the number of segments (the
+          iterator stops earlier if a singularity or a free edge is reached)
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: t = translation_surfaces.square_torus()
+            sage: v = t.tangent_vector(0, (1/2,1/4), (1,2))
+            sage: L = v.straight_line_trajectory()
+            sage: list(L.segment_iterator(4))
+            [Segment in polygon 0 starting at (3/8, 0) and ending at (7/8, 1),
+             Segment in polygon 0 starting at (7/8, 0) and ending at (1, 1/4),
+             Segment in polygon 0 starting at (0, 1/4) and ending at (3/8, 1),
+             Segment in polygon 0 starting at (3/8, 0) and ending at (7/8, 1)]
+            sage: L.combinatorial_length()
+            1
+        """
+        seg = self._segments[0]
+        n = 0
+        while steps is None or n < steps:
+            yield seg
+            n += 1
+            if seg.end_is_singular() or seg.end().is_on_free_edge():
+                return
+            seg = seg.next()
+
+    def _crossings(self, steps=None):
+        r"""
+        Iterator over the pairs ``(p, e)`` of edges crossed by the forward
+        trajectory from the initial point (see :meth:`coding_iterator`).
+        """
+        v = self._segments[0].start()
+        if v._position._position_type == v._position.EDGE_INTERIOR:
+            yield (v.polygon_label(), v._position.get_edge())
+        n = 0
+        while steps is None or n < steps:
+            w = v.forward_to_polygon_boundary()
+            if w.is_based_at_singularity() or w.is_on_free_edge():
+                return
+            yield (v.polygon_label(), w._position.get_edge())
+            v = w.invert()
+            n += 1
+
+    def periodic_orbit(self, limit=None, alphabet=None):
+        r"""
+        Look for a periodic orbit starting from the last segment of this
+        trajectory.
+
+        The trajectory is continued without storing any new segment and the
+        states (polygon label, base point and direction up to scaling) are
+        compared using Brent's cycle detection. The trajectory itself is not
+        modified.
+
+        INPUT:
+
+        - ``limit`` -- an optional bound on the number of polygons crossed
+
+        - ``alphabet`` -- an optional dictionary ``(lab,nb) -> letter`` as in
+          :meth:`coding`
+
+        OUTPUT: ``None`` if a singularity or a free edge is hit or the limit
+        is reached.
+        Otherwise a triple ``(period, coding, holonomy)`` where ``period`` is
+        the number of segments of the periodic orbit, ``coding`` the list of
+        edges crossed along one period and ``holonomy`` the holonomy of the
+        period developed in the polygon of the first segment.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: p = polygons.square()
+            sage: t = similarity_surfaces([p], {(0,0):(0,2), (0,1):(0,3)})
+            sage: v = t.tangent_vector(0, (1/5,1/7), (2,3))
+            sage: l = v.straight_line_trajectory()
+            sage: l.periodic_orbit()
+            (5, [(0, 2), (0, 1), (0, 2), (0, 1), (0, 2)], (2, 3))
+            sage: l.combinatorial_length()
+            1
+
+            sage: v = t.tangent_vector(0, (0,0), (2,3))
+            sage: v.straight_line_trajectory().periodic_orbit() is None
+            True
+            sage: v = t.tangent_vector(0, (1/5,1/7), (2,3))
+            sage: v.straight_line_trajectory().periodic_orbit(limit=3) is None
+            True
+        """
+        def f(v):
+            w = v.forward_to_polygon_boundary()
+            if w.is_based_at_singularity() or w.is_on_free_edge():
+                return None
+            return w.invert()
+        def key(v):
+            u = v.vector()
+            u = u / abs(u[0] if u[0] else u[1])
+            return (v.polygon_label(), tuple(v.point()), tuple(u))
+
+        v = self._segments[-1].start()
+        res = find_cycle(f, v, limit, key)
+        if res is None:
+            return None
+        mu, lam = res
+        for i in range(mu):
+            v = f(v)
+
+        from sage.matrix.constructor import identity_matrix
+        s = v.surface()
+        V = v.bundle().vector_space()
+        D = identity_matrix(V.base_ring(), 2)
+        coding = []
+        holonomy = V.zero()
+        for i in range(lam):
+            w = v.forward_to_polygon_boundary()
+            p = v.polygon_label()
+            e = w._position.get_edge()
+            holonomy += D * (w.point() - v.point())
+            lab = (p,e) if alphabet is None else alphabet.get((p,e))
+            if lab is not None:
+                coding.append(lab)
+            D = D * ~s.edge_transformation(p,e).derivative()
+            v = w.invert()
+
+        return (lam, coding, holonomy)
+
     # DEPRECATED STUFF
 
     def initial_segment(self):
@@ -466,10 +1332,13 @@ class StraightLineTrajectoryTranslation(AbstractStraightLineTrajectory):
     Straight line trajectory in a translation surface.
 
     This is similar to :class:`StraightLineTrajectory` but implemented using
-    interval exchange maps. It should be faster than the implementation via
-    segments and flowing in polygons.
+    interval exchange maps. It is faster than the implementation via segments
+    and flowing in polygons and it is the one returned by
+    :meth:`~flatsurf.geometry.tangent_bundle.SimilaritySurfaceTangentVector.straight_line_trajectory`
+    on translation surfaces.
 
-    Though, there is one big difference, this class can model an edge!
+    Though, there is one big difference, this class can not model an edge: a
+    ``ValueError`` is raised if the trajectory runs along an edge.
 
     This class only stores a list of triples ``(p, e, x)`` where:
     
@@ -482,11 +1351,31 @@ class StraightLineTrajectoryTranslation(AbstractStraightLineTrajectory):
       of the induced interval in the iet)
 
     (see the methods :meth:`_prev` and :meth:`_next`)
+
+    As for :class:`StraightLineTrajectory`, the optional argument
+    ``max_segments`` bounds the number of triples kept in memory.
+
+    EXAMPLES::
+
+        sage: from flatsurf import *
+        sage: from flatsurf.geometry.straight_line_trajectory import StraightLineTrajectoryTranslation
+        sage: O = translation_surfaces.regular_octagon()
+        sage: v = O.tangent_vector(0, (1,1), (33,45))
+        sage: L = StraightLineTrajectoryTranslation(v, max_segments=10)
+        sage: L.flow(1000)
+        sage: L.combinatorial_length()
+        10
+        sage: L.dropped_segments()
+        (991, 0)
+        sage: L.segments() == list(L.segment_iterator(10))
+        True
     """
-    def __init__(self, tangent_vector):
+    def __init__(self, tangent_vector, max_segments=None):
+        self._init_window(max_segments)
         t = tangent_vector.polygon_label()
         self._vector = tangent_vector.vector()
         self._s = tangent_vector.surface()
+        self._bundle = tangent_vector.bundle()
 
         start = SegmentInPolygon(tangent_vector).start()
         pos = start._position
@@ -500,14 +1389,23 @@ class StraightLineTrajectoryTranslation(AbstractStraightLineTrajectory):
         p = start.polygon_label()
         poly = self._s.polygon(p)
 
-        T = self._get_iet(p)
+        self._flow = DirectionalFlow(self._s, self._vector)
+        T = self._flow.flow_map(p)
+        if i not in T.bot_labels():
+            raise ValueError("the trajectory runs along an edge")
         x = get_linearity_coeff(poly.vertex(i+1) - poly.vertex(i),
                                 start.point() - poly.vertex(i))
         x *= T.length_bot(i)
 
-        self._points = deque() # we store triples (lab, edge, rel_pos)
+        self._points = deque(maxlen=self._max_segments) # we store triples (lab, edge, rel_pos)
         self._points.append((p, i, x))
 
+        # see StraightLineTrajectory.__init__
+        w = self._vector
+        t0 = (start.point() - tangent_vector.point()).dot_product(w) / w.dot_product(w)
+        self._times = deque([t0, t0 + self._duration(p, i, x)],
+                            None if max_segments is None else self._max_segments + 1)
+
     def _next(self, p, e, x):
         r"""
         Return the image of ``(p, e, x)``
@@ -530,30 +1428,42 @@ class StraightLineTrajectoryTranslation(AbstractStraightLineTrajectory):
             sage: assert L._previous(*t2) == t1
             sage: assert L._previous(*t1) == t0
         """
-        e, x = self._get_iet(p).forward_image(e, x)
-        p, e = self._s.opposite_edge(p, e)
-        return (p, e, x)
+        return self._flow.forward_image(p, e, x)
 
     def _previous(self, p, e, x):
         r"""
         Return the preimage of ``(p, e, x)``
         """
-        p, e = self._s.opposite_edge(p, e)
-        e, x = self._get_iet(p).backward_image(e, x)
-        return (p, e, x)
+        return self._flow.backward_image(p, e, x)
 
     def combinatorial_length(self):
         return len(self._points)
 
-    def _get_iet(self, label):
-        polygon = self._s.polygon(label)
-        try:
-            return self._iets[polygon]
-        except AttributeError:
-            self._iets = {polygon: polygon.flow_map(self._vector)}
-        except KeyError:
-            self._iets[polygon] = polygon.flow_map(self._vector)
-        return self._iets[polygon]
+    def _segment_state(self, i):
+        r"""
+        Return the dictionary made of the triple ``(p, e, x)`` of the
+        ``i``-th segment and of the direction (see :meth:`checkpoint_state`).
+        """
+        p,e,x = self._points[i]
+        return {'label': p, 'edge': e, 'position': x, 'vector': self._vector}
+
+    def _restore(self, surface, state):
+        r"""
+        Initialize this trajectory from ``state`` (see
+        :meth:`checkpoint_state`) without locating its point in the polygon.
+        """
+        self._init_window(state['max_segments'])
+        self._vector = state['vector']
+        self._s = surface
+        self._bundle = surface.tangent_bundle(self._vector.base_ring())
+        self._flow = DirectionalFlow(surface, self._vector)
+        t = (state['label'], state['edge'], state['position'])
+        self._points = deque([t], self._max_segments)
+        t0 = state['time']
+        self._times = deque([t0, t0 + self._duration(*t)],
+                            None if self._max_segments is None else self._max_segments + 1)
+        self.flow(state['num_segments'] - 1)
+        self._dropped_start, self._dropped_end = state['dropped']
 
     def segment(self, i):
         r"""
@@ -577,32 +1487,129 @@ class StraightLineTrajectoryTranslation(AbstractStraightLineTrajectory):
             Segment in polygon 0 starting at (-1/13*a, 1/13*a) and ending at
             (9/26*a + 11/13, 17/26*a + 15/13)
         """
-        lab, e0, x0 = self._points[i]
-        iet = self._get_iet(lab)
-        e1, x1 = iet.forward_image(e0, x0)
+        return self._segment(*self._points[i])
+
+    def _segment(self, lab, e0, x0):
+        r"""
+        Return the segment starting from ``(lab, e0, x0)``.
+        """
+        point0, e1, point1 = self._segment_endpoints(lab, e0, x0)
         poly = self._s.polygon(lab)
+        tb = self._bundle
+        V = tb.vector_space()
+        # the endpoints in the interior of edges do not need to be located
+        if x0:
+            pos0 = PolygonPosition(PolygonPosition.EDGE_INTERIOR, edge=e0)
+            v0 = SimilaritySurfaceTangentVector(tb, lab, V(point0), self._vector, pos0)
+        else:
+            v0 = self._s.tangent_vector(lab, point0, self._vector)
+        if point1 != poly.vertex(e1+1):
+            pos1 = PolygonPosition(PolygonPosition.EDGE_INTERIOR, edge=e1)
+            v1 = SimilaritySurfaceTangentVector(tb, lab, V(point1), -self._vector, pos1)
+        else:
+            v1 = self._s.tangent_vector(lab, point1, -self._vector)
+        return SegmentInPolygon(v0,v1)
 
-        l0 = iet.length_bot(e0)
-        l1 = iet.length_top(e1)
+    def _segment_endpoints(self, p, e, x):
+        r"""
+        Return the triple ``(point0, e1, point1)`` where ``point0`` and
+        ``point1`` are the coordinates of the endpoints in the polygon ``p`` of
+        the segment starting from ``(p, e, x)`` and ``e1`` is the edge through
+        which the segment leaves the polygon.
 
-        point0 = poly.vertex(e0) + poly.edge(e0) * x0/l0
-        point1 = poly.vertex(e1) + poly.edge(e1) * (l1-x1)/l1
-        v0 = self._s.tangent_vector(lab, point0, self._vector)
-        v1 = self._s.tangent_vector(lab, point1, -self._vector)
-        return SegmentInPolygon(v0,v1)
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: from flatsurf.geometry.straight_line_trajectory import StraightLineTrajectoryTranslation
+            sage: t = translation_surfaces.square_torus()
+            sage: v = t.tangent_vector(0, (1/5,1/7), (2,3))
+            sage: L = StraightLineTrajectoryTranslation(v)
+            sage: L._segment_endpoints(*L._points[0])
+            ((11/105, 0), 2, (27/35, 1))
+        """
+        return self._flow.segment_endpoints(p, e, x)
+
+    def _duration(self, p, e, x):
+        r"""
+        Return the time spent in the segment starting from ``(p, e, x)`` (see
+        :meth:`SegmentInPolygon.duration`).
+        """
+        point0, e1, point1 = self._segment_endpoints(p, e, x)
+        w = self._vector
+        return (point1 - point0).dot_product(w) / w.dot_product(w)
 
     def segments(self):
-        return [self.segment(i) for i in self.combinatorial_length()]
+        r"""
+        Return the list of segments of this trajectory.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: from flatsurf.geometry.straight_line_trajectory import StraightLineTrajectoryTranslation
+            sage: t = translation_surfaces.square_torus()
+            sage: L = StraightLineTrajectoryTranslation(t.tangent_vector(0, (1/2,1/4), (1,2)))
+            sage: L.flow(2)
+            sage: L.segments()
+            [Segment in polygon 0 starting at (3/8, 0) and ending at (7/8, 1),
+             Segment in polygon 0 starting at (7/8, 0) and ending at (1, 1/4),
+             Segment in polygon 0 starting at (0, 1/4) and ending at (3/8, 1)]
+        """
+        return [self._segment(*t) for t in self._points]
+
+    def initial_tangent_vector(self):
+        return self.segment(0).start()
+
+    def terminal_tangent_vector(self):
+        return self.segment(-1).end()
+
+    def coding(self, alphabet=None):
+        r"""
+        Return the coding of this trajectory with respect to the sides of the
+        polygons.
+
+        See :meth:`AbstractStraightLineTrajectory.coding`. The coding is read
+        on the triples ``(p, e, x)`` without building the segments.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: from flatsurf.geometry.straight_line_trajectory import StraightLineTrajectory, StraightLineTrajectoryTranslation
+            sage: t = translation_surfaces.square_torus()
+            sage: v = t.tangent_vector(0, (1/2,0), (5,6))
+            sage: L = StraightLineTrajectoryTranslation(v)
+            sage: L.flow(10); L.flow(-10)
+            sage: L.coding()
+            [(0, 2), (0, 1), (0, 2), (0, 1), (0, 2), (0, 1), (0, 2), (0, 1), (0, 2)]
+            sage: L2 = StraightLineTrajectory(v)
+            sage: L2.flow(10); L2.flow(-10)
+            sage: L.coding() == L2.coding()
+            True
+        """
+        crossings = []
+        p,e,x = self._points[0]
+        if not x.is_zero():
+            crossings.append((p,e))
+        for p,e,x in self._points:
+            crossings.append((p, self._flow.flow_map(p).forward_image(e, x)[0]))
+        if self.is_forward_separatrix() or self.is_closed():
+            crossings.pop()
+        if alphabet is None:
+            return crossings
+        return [alphabet[c] for c in crossings if c in alphabet]
+
+    def _is_periodic(self):
+        return self.is_closed()
 
     def is_closed(self):
         return self._points[0] == self._next(*self._points[-1])
 
     def is_forward_separatrix(self):
-        p1,e1,x1 = self._next(*self._points[-1])
-        return x1.is_zero()
+        t = self._next(*self._points[-1])
+        return t is None or t[2].is_zero()
 
     def is_backward_separatrix(self):
-        return self._points[0][2].is_zero()
+        return self._points[0][2].is_zero() or \
+               self._previous(*self._points[0]) is None
 
     def is_saddle_connection(self):
         r"""
@@ -627,21 +1634,170 @@ class StraightLineTrajectoryTranslation(AbstractStraightLineTrajectory):
         """
         return self.is_forward_separatrix() and self.is_backward_separatrix() 
 
-    def flow(self, steps):
+    def flow(self, steps, statistics=None):
+        r"""
+        Append or preprend segments to the trajectory.
+
+        See :meth:`StraightLineTrajectory.flow`.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: from flatsurf.geometry.straight_line_trajectory import StraightLineTrajectory, StraightLineTrajectoryTranslation
+            sage: from flatsurf.geometry.trajectory_statistics import TrajectoryStatistics
+            sage: O = translation_surfaces.regular_octagon()
+            sage: v = O.tangent_vector(0, (1,1), (33,45))
+            sage: L = StraightLineTrajectoryTranslation(v)
+            sage: S = TrajectoryStatistics()
+            sage: L.flow(2, S); L.flow(-1, S)
+            sage: L
+            Straight line trajectory made of 4 segments from (-1/2*a, 7/22*a + 7/11) in polygon 0 to (7/26*a + 9/13, 19/26*a + 17/13) in polygon 0
+            sage: S
+            Statistics of 3 segments
+            sage: L2 = StraightLineTrajectory(v)
+            sage: L2.flow(2); L2.flow(-1)
+            sage: L.time_range() == L2.time_range()
+            True
+        """
         if steps > 0:
             t = self._points[-1]
             for i in range(steps):
                 t = self._next(*t)
-                if t == self._points[0] or t[2].is_zero():
+                if t is None or t == self._points[0] or t[2].is_zero():
                     break
+                if len(self._points) == self._max_segments:
+                    self._dropped_start += 1
                 self._points.append(t)
+                self._times.append(self._times[-1] + self._duration(*t))
+                if statistics is not None:
+                    statistics.add_segment(self._segment(*t))
         elif steps < 0:
             t = self._points[0]
             for i in range(-steps):
                 if t[2].is_zero():
                     break
                 t = self._previous(*t)
-                if t == self._points[-1]:
-                    # closed curve or backward separatrix
+                if t is None or t == self._points[-1]:
+                    # free edge, closed curve or backward separatrix
                     break
+                if len(self._points) == self._max_segments:
+                    self._dropped_end += 1
                 self._points.appendleft(t)
+                self._times.appendleft(self._times[0] - self._duration(*t))
+                if statistics is not None:
+                    statistics.add_segment(self._segment(*t))
+
+    def segment_iterator(self, steps=None):
+        r"""
+        Return an iterator over the segments of the forward trajectory from the
+        first segment of this trajectory.
+
+        See :meth:`StraightLineTrajectory.segment_iterator`.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: from flatsurf.geometry.straight_line_trajectory import StraightLineTrajectoryTranslation
+            sage: t = translation_surfaces.square_torus()
+            sage: v = t.tangent_vector(0, (1/2,1/4), (1,2))
+            sage: L = StraightLineTrajectoryTranslation(v)
+            sage: list(L.segment_iterator(4)) == list(v.straight_line_trajectory().segment_iterator(4))
+            True
+        """
+        p,e,x = self._points[0]
+        n = 0
+        while steps is None or n < steps:
+            yield self._segment(p, e, x)
+            n += 1
+            t = self._next(p, e, x)
+            if t is None or t[2].is_zero():
+                return
+            p,e,x = t
+
+    def _crossings(self, steps=None):
+        r"""
+        Iterator over the pairs ``(p, e)`` of edges crossed by the forward
+        trajectory from the initial point (see :meth:`coding_iterator`).
+        """
+        p,e,x = self._points[0]
+        if not x.is_zero():
+            yield (p,e)
+        n = 0
+        while steps is None or n < steps:
+            e1, pp, ee, x = self._flow.forward_step(p, e, x)
+            if pp is None or x.is_zero():
+                return
+            yield (p,e1)
+            p,e = pp,ee
+            n += 1
+
+    def periodic_orbit(self, limit=None, alphabet=None):
+        r"""
+        Look for a periodic orbit starting from the last segment of this
+        trajectory.
+
+        The interval exchange is iterated on the triples ``(p, e, x)``
+        without storing them and the cycle is detected with Brent's
+        algorithm. The trajectory itself is not modified.
+
+        INPUT:
+
+        - ``limit`` -- an optional bound on the number of polygons crossed
+
+        - ``alphabet`` -- an optional dictionary ``(lab,nb) -> letter`` as in
+          :meth:`coding`
+
+        OUTPUT: ``None`` if a singularity or a free edge is hit or the limit
+        is reached.
+        Otherwise a triple ``(period, coding, holonomy)`` where ``period`` is
+        the number of segments of the periodic orbit, ``coding`` the list of
+        edges crossed along one period and ``holonomy`` the holonomy of the
+        period.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: from flatsurf.geometry.straight_line_trajectory import StraightLineTrajectoryTranslation
+            sage: t = translation_surfaces.square_torus()
+            sage: v = t.tangent_vector(0, (1/5,1/7), (2,3))
+            sage: L = StraightLineTrajectoryTranslation(v)
+            sage: L.periodic_orbit()
+            (5, [(0, 2), (0, 1), (0, 2), (0, 1), (0, 2)], (2, 3))
+            sage: L.periodic_orbit(limit=3) is None
+            True
+            sage: L.combinatorial_length()
+            1
+
+            sage: O = translation_surfaces.regular_octagon()
+            sage: v = O.tangent_vector(0, (1/3,1/5), (1,0))
+            sage: L = StraightLineTrajectoryTranslation(v)
+            sage: period, coding, holonomy = L.periodic_orbit()
+            sage: period
+            2
+            sage: holonomy
+            (a + 2, 0)
+        """
+        def f(t):
+            t = self._next(*t)
+            return None if t is None or t[2].is_zero() else t
+
+        t = self._points[-1]
+        res = find_cycle(f, t, limit)
+        if res is None:
+            return None
+        mu, lam = res
+        for i in range(mu):
+            t = f(t)
+
+        coding = []
+        holonomy = self._s.vector_space().zero()
+        for i in range(lam):
+            p,e,x = t
+            point0, e1, point1 = self._segment_endpoints(p, e, x)
+            holonomy += point1 - point0
+            lab = (p,e1) if alphabet is None else alphabet.get((p,e1))
+            if lab is not None:
+                coding.append(lab)
+            t = self._next(p, e, x)
+
+        return (lam, coding, holonomy)
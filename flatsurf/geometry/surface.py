@@ -2,6 +2,8 @@ from sage.structure.sage_object import SageObject
 
 from sage.sets.family import Family
 
+from collections import OrderedDict
+
 class Surface(SageObject):
     r"""
     An oriented surface built from a set of polygons and edges identified with
@@ -23,6 +25,7 @@ class Surface(SageObject):
         - polygon(self, lab): the polygon associated to the label ``lab``
         - base_label(self): return a first label
         - opposite_edge(self, lab, edge): a couple (``other_label``, ``other_edge``) representing the edge being glued
+          (or ``None`` if the edge is free, see :class:`~flatsurf.geometry.surface_window.SurfaceWindow`)
         - is_finite(self): return true if the surface is built from finitely many labeled polygons
     """
     # Do we really want to inherit from SageObject?
@@ -194,12 +197,145 @@ class Surface_polygons_and_gluings(Surface):
                 raise ValueError("The pair"+str((p,e))+" is not a valid edge identifier.")
         return self._edge_identifications[(p,e)]
 
+class LRUCachedSurface(Surface):
+    r"""
+    Surface that keeps the most recently used polygons and gluings of another
+    surface.
+
+    This is useful for surfaces whose polygons are computed on each call
+    (e.g. infinite surfaces defined by formulas): a trajectory revisiting the
+    same polygons then only computes them once. At most ``maxsize`` polygons
+    and ``maxsize`` gluings are stored and the least recently used ones are
+    discarded first.
+
+    INPUT:
+
+    - ``surface`` -- a surface (not wrapped in a
+      :class:`~flatsurf.geometry.similarity_surface.SimilaritySurface`)
+
+    - ``maxsize`` -- (default: ``1024``) the maximal number of polygons (and
+      of gluings) kept in memory
+
+    EXAMPLES::
+
+        sage: from flatsurf import *
+        sage: from flatsurf.geometry.surface import LRUCachedSurface
+        sage: s = translation_surfaces.infinite_staircase1()
+        sage: c = LRUCachedSurface(s.underlying_surface(), 8)
+        sage: c
+        Cache of 0 polygons and 0 gluings of The infinite staircase
+        sage: T = TranslationSurface(c)
+        sage: L = T.tangent_vector(0, (1/2,1/3), (2,1)).straight_line_trajectory()
+        sage: L.flow(100)
+        sage: L.is_closed()
+        True
+        sage: c.hits(), c.misses()
+        (21, 10)
+        sage: c
+        Cache of 4 polygons and 6 gluings of The infinite staircase
+
+    Flowing along the same periodic trajectory only uses the cache::
+
+        sage: L = T.tangent_vector(0, (1/2,1/3), (2,1)).straight_line_trajectory()
+        sage: L.flow(100)
+        sage: c.hits(), c.misses()
+        (50, 10)
+        sage: L2 = s.tangent_vector(0, (1/2,1/3), (2,1)).straight_line_trajectory()
+        sage: L2.flow(100)
+        sage: L2.coding() == L.coding()
+        True
+    """
+    def __init__(self, surface, maxsize=1024):
+        maxsize = int(maxsize)
+        if maxsize < 1:
+            raise ValueError("maxsize must be positive")
+        self._s = surface
+        self._maxsize = maxsize
+        self._polygons = OrderedDict()
+        self._gluings = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def _repr_(self):
+        return "Cache of {} polygons and {} gluings of {}".format(
+                len(self._polygons), len(self._gluings), self._s)
+
+    def base_ring(self):
+        return self._s.base_ring()
+
+    def base_label(self):
+        return self._s.base_label()
+
+    def is_finite(self):
+        return self._s.is_finite()
+
+    def num_polygons(self):
+        return self._s.num_polygons()
+
+    def polygon(self, lab):
+        r"""
+        Return the polygon with label ``lab``.
+        """
+        cache = self._polygons
+        try:
+            # moved to the end of the cache as the most recently used
+            p = cache.pop(lab)
+            self._hits += 1
+        except KeyError:
+            p = self._s.polygon(lab)
+            self._misses += 1
+            if len(cache) >= self._maxsize:
+                cache.popitem(last=False)
+        cache[lab] = p
+        return p
+
+    def opposite_edge(self, p, e):
+        cache = self._gluings
+        key = (p, e)
+        try:
+            edge = cache.pop(key)
+            self._hits += 1
+        except KeyError:
+            edge = self._s.opposite_edge(p, e)
+            self._misses += 1
+            if len(cache) >= self._maxsize:
+                cache.popitem(last=False)
+        cache[key] = edge
+        return edge
+
+    def maxsize(self):
+        r"""
+        Return the maximal number of polygons (and of gluings) kept in memory.
+        """
+        return self._maxsize
+
+    def hits(self):
+        r"""
+        Return the number of calls to :meth:`polygon` and :meth:`opposite_edge`
+        answered from the cache.
+        """
+        return self._hits
+
+    def misses(self):
+        r"""
+        Return the number of calls to :meth:`polygon` and :meth:`opposite_edge`
+        forwarded to the underlying surface.
+        """
+        return self._misses
+
+    def clear_cache(self):
+        r"""
+        Empty the cache and reset the counters.
+        """
+        self._polygons.clear()
+        self._gluings.clear()
+        self._hits = 0
+        self._misses = 0
+
 #####
 ##### LABEL WALKER
 #####
 
-from collections import deque
-
 class LabelWalker:
     r"""
     Take a canonical walk around the surface and find the labels of polygons.
@@ -209,40 +345,129 @@ class LabelWalker:
     where combinatorial distance measures the minimal number of edges which need to be crossed to reach the
     polygon with a givel label. Ties are broken using lexigraphical order on the numbers associated to edges crossed
     (labels are not used in this lexigraphical ordering).
+
+    The labels found so far are stored in a list (their position in the list
+    is their number) together with the list of the edges to walk through to
+    get closer to the base label. Since the walk visits the polygons in the
+    order of their numbers, the state of the walk is just the number of the
+    polygon being visited and the next edge to cross. Many labels can be
+    found at once with :meth:`expand` and the state can be saved and restored
+    (see :meth:`save_state`).
+
+    EXAMPLES::
+
+        sage: from flatsurf import *
+        sage: from flatsurf.geometry.surface import LabelWalker
+        sage: s = translation_surfaces.infinite_staircase1()
+        sage: lw = LabelWalker(s)
+        sage: lw.expand(1000)
+        1000
+        sage: len(lw)
+        1001
+        sage: lw.number_to_label(1000), lw.edge_back(lw.number_to_label(1000))
+        (500, 2)
+        sage: lw.edge_back(-700)
+        3
+        sage: len(lw)
+        1400
+
+        sage: t = translation_surfaces.regular_octagon()
+        sage: lw = LabelWalker(t)
+        sage: lw.expand()
+        0
+        sage: lw.is_complete()
+        True
     """
     
     class LabelWalkerIterator:
+        # number of labels looked for at once when the iterator goes beyond
+        # the labels already found
+        batch_size = 64
+
         def __init__(self, label_walker):
             self._lw = label_walker
             self._i = 0
         
         def next(self):
-            if self._i < len(self._lw):
-                label = self._lw.number_to_label(self._i)
-                self._i = self._i +1
-                return label
-            if self._i == len(self._lw):
-                label = self._lw.find_a_new_label()
-                if label is None:
-                    raise StopIteration()
-                self._i = self._i+1
-                return label
-            raise StopIteration()
+            if self._i == len(self._lw) and self._lw.expand(self.batch_size) == 0:
+                raise StopIteration()
+            label = self._lw.number_to_label(self._i)
+            self._i = self._i + 1
+            return label
             
         def __iter__(self):
             return self
     
     def __init__(self, surface):
         self._s=surface
+        self.invalidate()
+
+    def invalidate(self):
+        r"""
+        Forget all the labels found so far.
+
+        This must be called if the polygons or the gluings of the surface
+        are modified.
+        """
         self._labels=[self._s.base_label()]
         self._label_dict={self._s.base_label():0}
-        
-        # This will stores an edge to move through to get to a polygon closer to the base_polygon
-        self._label_edge_back = {self._s.base_label():None} 
-        
-        self._walk=deque()
-        self._walk.append((self._s.base_label(),0))
-    
+
+        # This stores for each label the edge to move through to get to a
+        # polygon closer to the base_polygon
+        self._edge_backs=[None]
+
+        # the walk is at the edge _walk_edge of the polygon number _walk_number
+        self._walk_number=0
+        self._walk_edge=0
+
+    def save_state(self):
+        r"""
+        Return the state of the walk.
+
+        It can be given to :meth:`restore_state` of a walker on the same
+        surface (e.g. after the surface has been loaded again from disk).
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: from flatsurf.geometry.surface import LabelWalker
+            sage: s = translation_surfaces.infinite_staircase1()
+            sage: lw = LabelWalker(s)
+            sage: lw.expand(10)
+            10
+            sage: state = loads(dumps(lw.save_state()))
+            sage: lw2 = LabelWalker(s)
+            sage: lw2.restore_state(state)
+            sage: len(lw2)
+            11
+            sage: lw.expand(5); lw2.expand(5)
+            5
+            5
+            sage: [lw.number_to_label(i) for i in range(16)] == [lw2.number_to_label(i) for i in range(16)]
+            True
+        """
+        return {'labels': list(self._labels),
+                'edge_backs': list(self._edge_backs),
+                'walk': (self._walk_number, self._walk_edge)}
+
+    def restore_state(self, state):
+        r"""
+        Restore the state ``state`` returned by :meth:`save_state`.
+        """
+        labels = state['labels']
+        if labels[0] != self._s.base_label():
+            raise ValueError("the state does not correspond to this surface")
+        self._labels = list(labels)
+        self._label_dict = {label:i for i,label in enumerate(labels)}
+        self._edge_backs = list(state['edge_backs'])
+        self._walk_number, self._walk_edge = state['walk']
+
+    def is_complete(self):
+        r"""
+        Return whether all the labels have been found.
+        """
+        return self._walk_number == len(self._labels)
+
     def label_dictionary(self):
         r""" 
         Return a dictionary mapping labels to integers which gives a canonical order on labels.
@@ -257,17 +482,16 @@ class LabelWalker:
         Remark: This could be slow on infinite surfaces!
         """
         try:
-            return self._label_edge_back[label]
+            return self._edge_backs[self._label_dict[label]]
         except KeyError:
             if limit is None:
                 if not self._s.is_finite():
                     limit=1000
                 else:
                     limit=self._s.num_polygons()
-            for i in xrange(limit):
-                new_label=self.find_a_new_label()
-                if label == new_label:
-                    return self._label_edge_back[label]
+            self._expand(limit, label)
+            if label in self._label_dict:
+                return self._edge_backs[self._label_dict[label]]
         # Maybe the surface is not connected?
         raise KeyError("Unable to find label %s. Are you sure the surface is connected?"%(label))
     
@@ -293,44 +517,73 @@ class LabelWalker:
         """
         return len(self._labels)
 
+    def _expand(self, n=None, target=None):
+        r"""
+        Walk until ``n`` new labels are found (or until the end of the walk if
+        ``n`` is ``None``) or until the label ``target`` is found. Return the
+        number of new labels.
+        """
+        s = self._s
+        labels = self._labels
+        label_dict = self._label_dict
+        edge_backs = self._edge_backs
+        i = self._walk_number
+        e = self._walk_edge
+        found = 0
+        done = (n == 0)
+        while not done and i < len(labels):
+            label = labels[i]
+            num_edges = s.polygon(label).num_edges()
+            while e < num_edges:
+                glued = s.opposite_edge(label,e)
+                e += 1
+                if glued is None:
+                    # free edge
+                    continue
+                opposite_label,opposite_edge = glued
+                if opposite_label not in label_dict:
+                    label_dict[opposite_label] = len(labels)
+                    labels.append(opposite_label)
+                    edge_backs.append(opposite_edge)
+                    found += 1
+                    if found == n or opposite_label == target:
+                        done = True
+                        break
+            if e == num_edges:
+                i += 1
+                e = 0
+        self._walk_number = i
+        self._walk_edge = e
+        return found
+
+    def expand(self, n=None):
+        r"""
+        Look for ``n`` new labels (or for all the labels if ``n`` is
+        ``None``) and return the number of labels found.
+        """
+        if n is None and not self._s.is_finite():
+            raise ValueError("the surface is infinite")
+        return self._expand(n)
+
     def find_a_new_label(self):
         r"""
         Finds a new label, stores it, and returns it. Returns None if we have already found all labels.
         """
-        while len(self._walk)>0:
-            label,e = self._walk.popleft()
-            opposite_label,opposite_edge=self._s.opposite_edge(label,e)
-            e=e+1
-            if e < self._s.polygon(label).num_edges():
-                self._walk.appendleft((label,e))
-            if not opposite_label in self._label_dict:
-                n=len(self._labels)
-                self._labels.append(opposite_label)
-                self._label_dict[opposite_label]=n
-                self._walk.append((opposite_label,0))
-                self._label_edge_back[opposite_label]=opposite_edge
-                return opposite_label
+        if self._expand(1):
+            return self._labels[-1]
         return None
 
     def find_new_labels(self,n):
         r"""
         Look for n new labels. Return the list of labels found.
         """
-        new_labels = []
-        for i in range(n):
-            label = self.find_a_new_label()
-            if label is None:
-                return new_labels
-            else:
-                new_labels.append(label)
-        return new_labels
-        
+        k = self._expand(n)
+        return self._labels[len(self._labels)-k:]
         
     def find_all_labels(self):
         assert(self._s.is_finite())
-        label = self.find_a_new_label()
-        while not label is None:
-            label = self.find_a_new_label()
+        if not self.is_complete():
+            self._expand()
             
     def number_to_label(self, n):
         r"""
@@ -18,7 +18,10 @@ class SurfacePoint:
         if pos.is_in_edge_interior():
             # This is annoyingly slow because of vertices(). Maybe we should cache translations too...
             e=pos.get_edge()
-            ll,ee=self._ss.opposite_edge(self._l,e)
+            glued=self._ss.opposite_edge(self._l,e)
+            if glued is None:
+                raise ValueError("the flow reaches the free edge {} of polygon {}".format(e, self._l))
+            ll,ee=glued
             pp=self._ss.polygon(ll)
             v0=p.vertices()[e]
             v1=pp.vertices()[(ee+1)%pp.num_edges()]
@@ -1,5 +1,23 @@
 r"""
-Generally useful tools for working with surfaces of all types.
+Types of similarity surfaces.
+
+The type of a surface is determined by the matrices of the gluings of its
+edges (see
+:meth:`~flatsurf.geometry.similarity_surface.SimilaritySurface.edge_matrix`).
+It is computed by
+:meth:`~flatsurf.geometry.similarity_surface.SimilaritySurface.surface_type`
+and the surface can be wrapped in the class of its type with
+:meth:`~flatsurf.geometry.similarity_surface.SimilaritySurface.specialize`.
+
+EXAMPLES::
+
+    sage: from flatsurf.geometry.surface_type import SurfaceType, surface_type_from_matrix, combine_surface_types, surface_type_to_str
+    sage: st = surface_type_from_matrix(matrix(QQ, [[-1,0],[0,-1]]))
+    sage: surface_type_to_str(st)
+    'Half-translation surface'
+    sage: st = combine_surface_types(st, surface_type_from_matrix(matrix(QQ, [[2,0],[0,2]])))
+    sage: surface_type_to_str(st)
+    'Half-dilation surface'
 """
 
 from flatsurf.geometry.matrix_2x2 import is_cosine_sine_of_rational
@@ -163,65 +181,39 @@ def is_half_translation_surface_type(st):
         st == SurfaceType.TRANSLATION
 
 def is_translation_surface_type(st):
-    r"""Return if all the 2x2 gluing matrices are in {I, -I}."""
+    r"""Return if all the 2x2 gluing matrices are the identity."""
     return \
         st == SurfaceType.TRANSLATION
 
-######
-###### Returning best surface types
-
-
-def surface_from_polygons_and_gluings(polygons, gluings):
+def surface_type_class(surface_type):
     r"""
-    Construct the most specific surface possible from the provided polygons and gluings.
-    
+    Return the class of the surfaces of the given type.
+
     EXAMPLES::
-        sage: from flatsurf.geometry.polygon import Polygons
-        sage: K.<sqrt2> = NumberField(x**2 - 2, embedding=1.414)
-        sage: octagon = Polygons(K)([(1,0),(sqrt2/2, sqrt2/2),(0, 1),(-sqrt2/2, sqrt2/2),(-1,0),(-sqrt2/2, -sqrt2/2),(0, -1),(sqrt2/2, -sqrt2/2)])
-        sage: square1 = Polygons(K)([(1,0),(0,1),(-1,0),(0,-1)])
-        sage: square2 = Polygons(K)([(sqrt2/2, sqrt2/2),(-sqrt2/2, sqrt2/2),(-sqrt2/2, -sqrt2/2),(sqrt2/2, -sqrt2/2)])
-        sage: gluings=[((1,i),(0, (2*i+4)%8 )) for i in range(4)]
-        sage: for i in range(4):
-        ...       gluings.append( ((2,i), (0, (2*i+5)%8 )) )
-        sage: from flatsurf.geometry.surface import surface_from_polygons_and_gluings
-        sage: s=surface_from_polygons_and_gluings([octagon,square1,square2], gluings)
-        sage: type(s)
-        <class 'flatsurf.geometry.translation_surface.TranslationSurface_polygons_and_gluings'>
-    """
-    from flatsurf.geometry.similarity_surface import SimilaritySurface_polygons_and_gluings
-    surface = SimilaritySurface_polygons_and_gluings(polygons,gluings)
-    surface_type = surface.compute_surface_type_from_gluings()
-    if is_translation_surface_type(surface_type):
-        from flatsurf.geometry.translation_surface import TranslationSurface_polygons_and_gluings
-        surface = TranslationSurface_polygons_and_gluings(polygons,gluings)
-    elif is_rational_cone_surface_type(surface_type):
-        from flatsurf.geometry.rational_cone_surface import RationalConeSurface_polygons_and_gluings
-        surface = RationalConeSurface_polygons_and_gluings(polygons,gluings)
-    elif is_cone_surface_type(surface_type):
-        from flatsurf.geometry.cone_surface import ConeSurface_polygons_and_gluings
-        surface = ConeSurface_polygons_and_gluings(polygons,gluings)
-    #surface._check()
-    return surface
-    
-def convert_to_type(surface, surface_type):
-    r"""
-    Converts the provided surface to one of the given type.
+
+        sage: from flatsurf.geometry.surface_type import SurfaceType, surface_type_class
+        sage: surface_type_class(SurfaceType.HALF_TRANSLATION)
+        <class 'flatsurf.geometry.half_translation_surface.HalfTranslationSurface'>
     """
     if surface_type == SurfaceType.SIMILARITY:
-        from flatsurf.geometry.similarity_surface import convert_to_similarity_surface
-        return convert_to_similarity_surface(surface)
+        from flatsurf.geometry.similarity_surface import SimilaritySurface
+        return SimilaritySurface
     if surface_type == SurfaceType.HALF_DILATION:
-        from flatsurf.geometry.half_dilation_surface import convert_to_half_dilation_surface
-        return convert_to_half_dilation_surface(surface)
+        from flatsurf.geometry.half_dilation_surface import HalfDilationSurface
+        return HalfDilationSurface
+    if surface_type == SurfaceType.DILATION:
+        from flatsurf.geometry.dilation_surface import DilationSurface
+        return DilationSurface
     if surface_type == SurfaceType.CONE:
-        from flatsurf.geometry.cone_surface import convert_to_cone_surface
-        return convert_to_cone_surface(surface)
+        from flatsurf.geometry.cone_surface import ConeSurface
+        return ConeSurface
     if surface_type == SurfaceType.RATIONAL_CONE:
-        from flatsurf.geometry.rational_cone_surface import convert_to_rational_cone_surface
-        return convert_to_rational_cone_surface(surface)
+        from flatsurf.geometry.rational_cone_surface import RationalConeSurface
+        return RationalConeSurface
+    if surface_type == SurfaceType.HALF_TRANSLATION:
+        from flatsurf.geometry.half_translation_surface import HalfTranslationSurface
+        return HalfTranslationSurface
     if surface_type == SurfaceType.TRANSLATION:
-        from flatsurf.geometry.translation_surface import convert_to_translation_surface
-        return convert_to_translation_surface(surface)
-    raise NotImplementedError("Not implemented for surfaces of type %s."%surface_type_to_str(surface_type))
-
+        from flatsurf.geometry.translation_surface import TranslationSurface
+        return TranslationSurface
+    raise ValueError("unknown surface type %s"%surface_type)
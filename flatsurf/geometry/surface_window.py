@@ -0,0 +1,307 @@
+r"""
+Finite windows in (possibly infinite) surfaces.
+
+A :class:`SurfaceWindow` is made of the polygons of a surface within a given
+combinatorial distance of a base polygon. It is a finite surface whose
+polygons are labeled ``0, 1, ...`` by increasing distance. The edges glued to
+polygons outside of the window are free: :meth:`SurfaceWindow.opposite_edge`
+returns ``None`` for them. A window is obtained with
+:meth:`~flatsurf.geometry.similarity_surface.SimilaritySurface.window` and
+grown with :meth:`WindowSurface.extend`.
+
+EXAMPLES::
+
+    sage: from flatsurf import *
+    sage: s = translation_surfaces.infinite_staircase1()
+    sage: w = s.window(2)
+    sage: w
+    TranslationSurface built from 5 polygons
+    sage: W = w.underlying_surface()
+    sage: [W.original_label(lab) for lab in range(W.num_polygons())]
+    [0, -1, 1, -2, 2]
+    sage: W.free_edges()
+    [(3, 0), (3, 2), (4, 1), (4, 3)]
+
+The finite surface algorithms can be run on the window. The vertices of the
+staircase belong to two singularities of infinite angle, so they are all on
+the boundary of the window and their angles are only partial::
+
+    sage: I = w.vertex_index()
+    sage: I.angles()
+    [5/4, 5/4, 5/4, 5/4]
+    sage: [I.is_boundary(i) for i in range(4)]
+    [True, True, True, True]
+
+The window is grown in place::
+
+    sage: w.extend(3)
+    2
+    sage: w.num_polygons()
+    7
+    sage: w.vertex_index().angles()
+    [7/4, 7/4, 7/4, 7/4]
+"""
+
+from flatsurf.geometry.surface import Surface
+
+from sage.misc.persist import dumps
+from sage.structure.dynamic_class import dynamic_class
+
+class SurfaceWindow(Surface):
+    r"""
+    The polygons of ``surface`` within combinatorial distance ``radius`` of
+    the polygon ``label``.
+
+    Two polygons are at distance one if they share an edge. The polygons of
+    the window are labeled by consecutive integers starting from ``0`` (the
+    polygon ``label``) in the order in which they are found by a breadth
+    first search.
+
+    The surface is pickled together with the window when it can be. If it
+    can not, only the polygons, the gluings and the labels are pickled and
+    the window loaded from the file can not be extended.
+
+    INPUT:
+
+    - ``surface`` -- a similarity surface
+
+    - ``radius`` -- a non-negative integer
+
+    - ``label`` -- the label of the central polygon (by default the base
+      label of ``surface``)
+
+    EXAMPLES::
+
+        sage: from flatsurf import *
+        sage: from flatsurf.geometry.surface_window import SurfaceWindow
+        sage: O = translation_surfaces.regular_octagon()
+        sage: W = SurfaceWindow(O, 0)
+        sage: W.num_polygons()
+        1
+        sage: W.opposite_edge(0, 3)
+        (0, 7)
+        sage: W.free_edges()
+        []
+    """
+    def __init__(self, surface, radius, label=None):
+        if radius < 0:
+            raise ValueError("the radius must be non-negative")
+        if label is None:
+            label = surface.base_label()
+        self._s = surface
+        self._base_ring = surface.base_ring()
+        self._radius = 0
+        self._labels = [label]
+        self._label_dict = {label: 0}
+        self._polygons = [surface.polygon(label)]
+        # beginning of the polygons at the current radius
+        self._shell = 0
+        self._gluings = [[None] * self._polygons[0].num_edges()]
+        self._glue(0)
+        self.extend(radius)
+
+    def __getstate__(self):
+        r"""
+        TESTS::
+
+            sage: from flatsurf import *
+            sage: from flatsurf.geometry.surface_window import SurfaceWindow
+            sage: W = loads(dumps(SurfaceWindow(translation_surfaces.regular_octagon(), 0)))
+            sage: W.surface()
+            TranslationSurface built from 1 polygon
+
+            sage: w = loads(dumps(translation_surfaces.infinite_staircase1().window(1)))
+            sage: w.extend(2)
+            2
+        """
+        state = self.__dict__.copy()
+        try:
+            dumps(self._s)
+        except Exception:
+            state['_s'] = None
+        return state
+
+    def _glue(self, n):
+        r"""
+        Fill the gluings of the polygons numbered from ``n`` whose opposite
+        polygon belong to the window.
+        """
+        s = self._s
+        label_dict = self._label_dict
+        for p in range(n, len(self._labels)):
+            label = self._labels[p]
+            gluings = self._gluings[p]
+            for e in range(len(gluings)):
+                glued = s.opposite_edge(label, e)
+                if glued is None:
+                    continue
+                ll,ee = glued
+                pp = label_dict.get(ll)
+                if pp is not None:
+                    gluings[e] = (pp,ee)
+                    self._gluings[pp][ee] = (p,e)
+
+    def _repr_(self):
+        if self._s is None:
+            return "Window of radius {} with {} polygons".format(
+                    self._radius, len(self._labels))
+        return "Window of radius {} with {} polygons in {}".format(
+                self._radius, len(self._labels), self._s)
+
+    def surface(self):
+        r"""
+        Return the surface this window is taken from (or ``None`` if the
+        window was loaded from a file).
+        """
+        return self._s
+
+    def radius(self):
+        r"""
+        Return the radius of this window.
+        """
+        return self._radius
+
+    def extend(self, radius):
+        r"""
+        Add the polygons at distance at most ``radius`` and return the
+        number of new polygons.
+
+        The caches of the surfaces built on this window are not reset (use
+        :meth:`WindowSurface.extend` instead).
+        """
+        s = self._s
+        if s is None and self._radius < radius:
+            raise ValueError("the window was loaded without its surface and can not be extended")
+        labels = self._labels
+        label_dict = self._label_dict
+        n = len(labels)
+        while self._radius < radius:
+            start = len(labels)
+            for p in range(self._shell, start):
+                label = labels[p]
+                for e in range(self._polygons[p].num_edges()):
+                    glued = s.opposite_edge(label, e)
+                    if glued is None:
+                        continue
+                    ll = glued[0]
+                    if ll not in label_dict:
+                        label_dict[ll] = len(labels)
+                        labels.append(ll)
+                        polygon = s.polygon(ll)
+                        self._polygons.append(polygon)
+                        self._gluings.append([None] * polygon.num_edges())
+            if len(labels) == start:
+                # all polygons have been found
+                self._radius = radius
+                break
+            self._shell = start
+            self._glue(start)
+            self._radius += 1
+        return len(labels) - n
+
+    def original_label(self, lab):
+        r"""
+        Return the label in the original surface of the polygon ``lab`` of
+        this window.
+        """
+        return self._labels[lab]
+
+    def label(self, original_label):
+        r"""
+        Return the label in this window of the polygon ``original_label`` of
+        the original surface.
+        """
+        return self._label_dict[original_label]
+
+    def free_edges(self):
+        r"""
+        Return the list of the edges ``(label, edge)`` that are not glued.
+        """
+        return [(p,e) for p in range(len(self._gluings))
+                for e,glued in enumerate(self._gluings[p]) if glued is None]
+
+    def base_ring(self):
+        return self._base_ring
+
+    def base_label(self):
+        return 0
+
+    def is_finite(self):
+        return True
+
+    def num_polygons(self):
+        return len(self._labels)
+
+    def polygon(self, lab):
+        return self._polygons[lab]
+
+    def opposite_edge(self, p, e):
+        r"""
+        Return the edge glued to the edge ``e`` of the polygon ``p`` or
+        ``None`` if this edge is glued to a polygon outside of the window.
+        """
+        return self._gluings[p][e]
+
+class WindowSurface(object):
+    r"""
+    Methods of the surfaces built on a :class:`SurfaceWindow` (see
+    :func:`window_surface`).
+    """
+    def extend(self, radius):
+        r"""
+        Grow this window up to the radius ``radius`` and return the number of
+        new polygons.
+
+        The caches of this surface are reset (see
+        :meth:`~flatsurf.geometry.similarity_surface.SimilaritySurface.invalidate_caches`).
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: w = translation_surfaces.infinite_staircase1().window(1)
+            sage: w.num_polygons()
+            3
+            sage: w.extend(10)
+            18
+            sage: w.num_polygons()
+            21
+            sage: w.extend(5)
+            0
+            sage: w.underlying_surface().radius()
+            10
+        """
+        n = self.underlying_surface().extend(radius)
+        if n:
+            self.invalidate_caches()
+        return n
+
+def window_surface(surface, radius, label=None):
+    r"""
+    Return the window of radius ``radius`` around the polygon ``label`` of
+    ``surface`` (see :class:`SurfaceWindow`).
+
+    The returned surface is an instance of a subclass of the class of
+    ``surface`` which also derives from :class:`WindowSurface`.
+
+    EXAMPLES::
+
+        sage: from flatsurf import *
+        sage: from flatsurf.geometry.surface_window import window_surface, WindowSurface
+        sage: s = translation_surfaces.infinite_staircase1()
+        sage: w = window_surface(s, 1)
+        sage: isinstance(w, WindowSurface) and isinstance(w, s.__class__)
+        True
+        sage: ww = window_surface(w, 0)
+        sage: ww.num_polygons()
+        1
+        sage: ww.__class__ is w.__class__
+        True
+        sage: ww.extend(2)
+        2
+        sage: ww.extend(3)
+        0
+    """
+    cls = surface.__class__
+    if not issubclass(cls, WindowSurface):
+        cls = dynamic_class(cls.__name__, (WindowSurface, cls), doccls=cls)
+    return cls(SurfaceWindow(surface, radius, label))
@@ -1,8 +1,41 @@
 from flatsurf.geometry.polygon import *
 
-class SimilaritySurfaceTangentVector:
-    def __init__(self, tangent_bundle, polygon_label, point, vector):
+class SimilaritySurfaceTangentVector(object):
+    r"""
+    A tangent vector to a similarity surface.
+
+    If ``position`` is provided, the tangent vector is built without any
+    check: ``position`` must be the position of ``point`` in the polygon
+    ``polygon_label`` and ``vector`` must point into the interior of this
+    polygon. This is meant for callers that already know where the point
+    lies, for example when flowing to the boundary of a polygon.
+
+    EXAMPLES::
+
+        sage: from flatsurf import *
+        sage: from flatsurf.geometry.tangent_bundle import SimilaritySurfaceTangentVector
+        sage: s = similarity_surfaces.example()
+        sage: v = s.tangent_vector(0, (1/2,-1/4), (0,1))
+        sage: w = v.forward_to_polygon_boundary()
+        sage: w
+        SimilaritySurfaceTangentVector in polygon 0 based at (1/2, 0) with vector (0, -1)
+        sage: w.position()
+        point positioned on interior of edge 2 of polygon
+        sage: w == s.tangent_vector(0, (1/2,0), (0,-1))
+        True
+        sage: hash(w) == hash(s.tangent_vector(0, (1/2,0), (0,-1)))
+        True
+    """
+    __slots__ = ['_bundle', '_polygon_label', '_point', '_vector', '_position']
+
+    def __init__(self, tangent_bundle, polygon_label, point, vector, position=None):
         self._bundle = tangent_bundle
+        if position is not None:
+            self._polygon_label = polygon_label
+            self._point = point
+            self._vector = vector
+            self._position = position
+            return
         p = self.surface().polygon(polygon_label)
         pos = p.get_point_position(point)
         if vector == self._bundle.vector_space().zero():
@@ -17,7 +50,10 @@ class SimilaritySurfaceTangentVector:
             edge_v = p.edge(e)
             if wedge_product(edge_v,vector)<0 or is_opposite_direction(edge_v,vector):
                 # Need to move point and vector to opposite edge.
-                label2,e2 = self.surface().opposite_edge(polygon_label,e)
+                glued = self.surface().opposite_edge(polygon_label,e)
+                if glued is None:
+                    raise ValueError("the vector points out of the free edge {} of polygon {}".format(e, polygon_label))
+                label2,e2 = glued
                 similarity = self.surface().edge_transformation(polygon_label,e)
                 point2=similarity(point)
                 vector2=similarity.derivative()*vector
@@ -42,7 +78,10 @@ class SimilaritySurfaceTangentVector:
                 raise ValueError("Singular point with vector pointing away from polygon")
             if wp0 == 0:
                 # vector points backward along edge 0
-                label2,e2 = self.surface().opposite_edge(polygon_label,v-1)
+                glued = self.surface().opposite_edge(polygon_label,v-1)
+                if glued is None:
+                    raise ValueError("the vector points out of the free edge {} of polygon {}".format(v-1, polygon_label))
+                label2,e2 = glued
                 similarity = self.surface().edge_transformation(polygon_label,v-1)
                 point2=similarity(point)
                 vector2=similarity.derivative()*vector
@@ -75,7 +114,7 @@ class SimilaritySurfaceTangentVector:
         return not self.__eq__(other)
 
     def __hash__(self):
-        return hash(tuple(sorted(self.__dict__.items())))
+        return hash((self._polygon_label, tuple(self._point), tuple(self._vector)))
 
     def surface(self):
         r"""Return the underlying surface."""
@@ -87,6 +126,36 @@ class SimilaritySurfaceTangentVector:
         """
         return self._position.is_vertex()
 
+    def is_on_free_edge(self):
+        r"""
+        Return whether the base point lies in the interior of an edge that is
+        not glued to any other edge (see
+        :meth:`~flatsurf.geometry.surface.Surface.opposite_edge`).
+
+        Straight line flows stop at such points as they do at singularities.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: w = translation_surfaces.infinite_staircase1().window(1)
+            sage: w.opposite_edge(1, 1) is None
+            True
+            sage: v = w.tangent_vector(1, (1/2,1/2), (1,0))
+            sage: v.is_on_free_edge()
+            False
+            sage: u = v.forward_to_polygon_boundary()
+            sage: u
+            SimilaritySurfaceTangentVector in polygon 1 based at (1, 1/2) with vector (-1, 0)
+            sage: u.is_on_free_edge()
+            True
+            sage: u.invert()
+            Traceback (most recent call last):
+            ...
+            ValueError: the vector points out of the free edge 1 of polygon 1
+        """
+        return self._position.is_in_edge_interior() and \
+            self.surface().opposite_edge(self._polygon_label, self._position.get_edge()) is None
+
     def singularity(self):
         r"""Return the index of the vertex."""
         return self._position.get_vertex()
@@ -222,19 +291,56 @@ class SimilaritySurfaceTangentVector:
         p=self.polygon()
         point2,pos2 = p.flow_to_exit(self.point(), self.vector())
         #diff=point2-point
+        if pos2.is_in_edge_interior():
+            # the flow crosses the edge so that the reversed vector points
+            # into the polygon
+            position = pos2
+        else:
+            position = None
         new_vector = SimilaritySurfaceTangentVector(
             self.bundle(),
             self.polygon_label(),
             point2,
-            -self.vector())
+            -self.vector(),
+            position)
         return new_vector
 
-    def straight_line_trajectory(self):
+    def straight_line_trajectory(self, max_segments=None):
         r"""
         Return the straight line trajectory associated to this vector.
+
+        If ``max_segments`` is provided, the trajectory only keeps that many
+        segments in memory (see
+        :meth:`~flatsurf.geometry.straight_line_trajectory.AbstractStraightLineTrajectory.max_segments`).
+
+        On translation surfaces, the trajectory is computed with the interval
+        exchange maps of the polygons (see
+        :class:`~flatsurf.geometry.straight_line_trajectory.StraightLineTrajectoryTranslation`)
+        unless it runs along an edge. Otherwise, it is computed by flowing in
+        the polygons (see
+        :class:`~flatsurf.geometry.straight_line_trajectory.StraightLineTrajectory`).
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: t = translation_surfaces.square_torus()
+            sage: type(t.tangent_vector(0, (1/2,1/3), (2,3)).straight_line_trajectory())
+            <class 'flatsurf.geometry.straight_line_trajectory.StraightLineTrajectoryTranslation'>
+            sage: type(t.tangent_vector(0, (0,0), (1,0)).straight_line_trajectory())
+            <class 'flatsurf.geometry.straight_line_trajectory.StraightLineTrajectory'>
+            sage: s = similarity_surfaces.example()
+            sage: type(s.tangent_vector(0, (1,-1/2), (3,-1)).straight_line_trajectory())
+            <class 'flatsurf.geometry.straight_line_trajectory.StraightLineTrajectory'>
         """
-        from flatsurf.geometry.straight_line_trajectory import StraightLineTrajectory
-        return StraightLineTrajectory(self)
+        from flatsurf.geometry.straight_line_trajectory import StraightLineTrajectory, StraightLineTrajectoryTranslation
+        from flatsurf.geometry.translation_surface import TranslationSurface
+        if isinstance(self.surface(), TranslationSurface):
+            try:
+                return StraightLineTrajectoryTranslation(self, max_segments)
+            except ValueError:
+                # the trajectory runs along an edge
+                pass
+        return StraightLineTrajectory(self, max_segments)
 
 class SimilaritySurfaceTangentBundle:
     r"""
@@ -0,0 +1,308 @@
+r"""
+Intersections between straight-line trajectories.
+
+The segments of the trajectories are bucketed by polygon (see
+:class:`SegmentIndex`). Inside a convex polygon each segment is a chord
+joining two points of the boundary and two chords cross if and only if their
+endpoints alternate along the boundary. The boundary points are sorted and
+the alternating pairs are counted with a binary indexed tree so that the
+intersections between two families of ``n`` and ``m`` segments are counted
+in time `O((n+m) \log(n+m))` instead of `O(nm)`.
+
+Two numbers are computed: the geometric number of intersections (the number
+of transverse intersection points counted with multiplicity) and the
+algebraic intersection number (each intersection counted with the sign of the
+frame made of the directions of the two trajectories). Intersections at the
+singularities are not counted.
+
+EXAMPLES::
+
+    sage: from flatsurf import *
+    sage: from flatsurf.geometry.trajectory_intersection import intersection_numbers
+    sage: t = translation_surfaces.square_torus()
+    sage: h = t.tangent_vector(0, (1/3,1/2), (1,0)).straight_line_trajectory()
+    sage: v = t.tangent_vector(0, (1/2,1/3), (2,3)).straight_line_trajectory()
+    sage: h.flow(10)
+    sage: v.flow(10)
+    sage: intersection_numbers(h, v)
+    (3, 3)
+    sage: intersection_numbers(v, h)
+    (3, -3)
+"""
+
+from bisect import bisect_left, bisect_right
+
+from flatsurf.geometry.polygon import wedge_product
+
+def _segments(x):
+    r"""
+    Return an iterable of the segments of ``x`` which is either a trajectory,
+    a saddle connection or an iterable of segments.
+    """
+    from flatsurf.geometry.saddle_connection import SaddleConnection
+    if isinstance(x, SaddleConnection):
+        x = x.trajectory()
+    if hasattr(x, 'segments'):
+        return x.segments()
+    return x
+
+def _count_alternating(A, B):
+    r"""
+    Return the number of pairs of chords ``(lo1, hi1, s1)`` in ``A`` and
+    ``(lo2, hi2, s2)`` in ``B`` such that ``lo1 < lo2 < hi1 < hi2`` together
+    with the sum of the products ``s1 * s2`` over these pairs.
+
+    EXAMPLES::
+
+        sage: from flatsurf.geometry.trajectory_intersection import _count_alternating
+        sage: _count_alternating([(0, 2, 1), (1, 3, -1)], [(1, 4, 1), (2, 5, 1)])
+        (2, 0)
+    """
+    A = sorted(A)
+    B = sorted(B)
+    his = sorted(set(hi for _,hi,_ in A))
+    n = len(his)
+    # binary indexed trees over the ranks of the upper ends of the chords of A
+    count = [0] * (n + 1)
+    signed = [0] * (n + 1)
+
+    def prefix(tree, i):
+        s = 0
+        while i > 0:
+            s += tree[i]
+            i -= i & -i
+        return s
+
+    total = 0
+    total_signed = 0
+    j = 0
+    for lo2, hi2, s2 in B:
+        while j < len(A) and A[j][0] < lo2:
+            _, hi1, s1 = A[j]
+            i = bisect_left(his, hi1) + 1
+            while i <= n:
+                count[i] += 1
+                signed[i] += s1
+                i += i & -i
+            j += 1
+        i0 = bisect_right(his, lo2)
+        i1 = bisect_left(his, hi2)
+        if i0 < i1:
+            total += prefix(count, i1) - prefix(count, i0)
+            total_signed += s2 * (prefix(signed, i1) - prefix(signed, i0))
+    return total, total_signed
+
+class SegmentIndex(object):
+    r"""
+    Segments of trajectories in a similarity surface bucketed by polygon.
+
+    For each segment, only the positions of its endpoints along the boundary
+    of its polygon and its direction are stored.
+
+    INPUT:
+
+    - ``surface`` -- a similarity surface
+
+    - ``segments`` -- an optional trajectory, saddle connection or iterable of
+      segments (see
+      :class:`~flatsurf.geometry.straight_line_trajectory.SegmentInPolygon`)
+      to be added to the index
+
+    EXAMPLES::
+
+        sage: from flatsurf import *
+        sage: from flatsurf.geometry.trajectory_intersection import SegmentIndex
+        sage: s = translation_surfaces.mcmullen_L(1,1,1,1)
+        sage: L = s.tangent_vector(0, (1/2,1/3), (3,5)).straight_line_trajectory()
+        sage: I = SegmentIndex(s)
+        sage: I.add_segments(L.segment_iterator(1000))
+        sage: I
+        Index of 1000 segments in 2 polygons
+        sage: J = SegmentIndex(s, s.tangent_vector(1, (1/2,1/3), (5,-3)).straight_line_trajectory().segment_iterator(1000))
+        sage: I.intersection_numbers(J)
+        (255876, -255876)
+    """
+    def __init__(self, surface, segments=None):
+        self._s = surface
+        self._num_segments = 0
+        self._chords = {}
+        self._edge_starts = {}
+        self._polygons = {}
+        if segments is not None:
+            self.add_segments(segments)
+
+    def __repr__(self):
+        return "Index of {} segments in {} polygons".format(self._num_segments, len(self._chords))
+
+    def surface(self):
+        r"""
+        Return the underlying surface.
+        """
+        return self._s
+
+    def num_segments(self):
+        r"""
+        Return the number of segments in the index.
+        """
+        return self._num_segments
+
+    def _boundary_coordinate(self, lab, v):
+        r"""
+        Return the position of the base point of the tangent vector ``v`` on
+        the boundary of the polygon ``lab``: ``i`` for the vertex ``i`` and
+        ``e + t`` for the point at ``t`` of the way along the edge ``e``.
+        """
+        pos = v.position()
+        if pos.is_vertex():
+            return pos.get_vertex()
+        e = pos.get_edge()
+        try:
+            poly = self._polygons[lab]
+        except KeyError:
+            poly = self._polygons[lab] = self._s.polygon(lab)
+        u = v.point() - poly.vertex(e)
+        w = poly.edge(e)
+        return e + (u[0] / w[0] if w[0] else u[1] / w[1])
+
+    def add_segment(self, seg):
+        r"""
+        Add the segment ``seg`` to the index.
+        """
+        lab = seg.polygon_label()
+        start = seg.start()
+        a = self._boundary_coordinate(lab, start)
+        b = self._boundary_coordinate(lab, seg.end())
+        if a < b:
+            chord = (a, b, 1)
+        else:
+            chord = (b, a, -1)
+        try:
+            self._chords[lab].append(chord)
+        except KeyError:
+            self._chords[lab] = [chord]
+        pos = start.position()
+        if pos.is_in_edge_interior():
+            key = (lab, pos.get_edge(), a - pos.get_edge())
+            try:
+                self._edge_starts[key].append(start.vector())
+            except KeyError:
+                self._edge_starts[key] = [start.vector()]
+        self._num_segments += 1
+
+    def add_segments(self, segments):
+        r"""
+        Add the segments of ``segments`` to the index.
+
+        The argument ``segments`` can either be a trajectory, a saddle
+        connection or an iterable of segments.
+        """
+        for seg in _segments(segments):
+            self.add_segment(seg)
+
+    def intersection_numbers(self, other):
+        r"""
+        Return the pair ``(geometric, algebraic)`` made of the number of
+        intersections and the algebraic intersection number between the
+        segments of ``self`` and the segments of ``other``.
+
+        An intersection is counted positively in the algebraic intersection
+        number if the direction of the segment of ``self`` followed by the
+        direction of the segment of ``other`` is a direct basis.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: from flatsurf.geometry.trajectory_intersection import SegmentIndex
+            sage: t = translation_surfaces.square_torus()
+            sage: h = t.tangent_vector(0, (0,1/2), (1,0)).straight_line_trajectory()
+            sage: v = t.tangent_vector(0, (1/2,0), (0,1)).straight_line_trajectory()
+            sage: SegmentIndex(t, h).intersection_numbers(SegmentIndex(t, v))
+            (1, 1)
+
+        Intersections on the edges are counted once::
+
+            sage: h = t.tangent_vector(0, (0,1/2), (1,1)).straight_line_trajectory()
+            sage: v = t.tangent_vector(0, (0,1/2), (-1,2)).straight_line_trajectory()
+            sage: h.flow(10); v.flow(10)
+            sage: SegmentIndex(t, h).intersection_numbers(SegmentIndex(t, v))
+            (3, 3)
+
+        Segments may start on the free edges of a window::
+
+            sage: w = translation_surfaces.infinite_staircase1().window(1)
+            sage: h = w.tangent_vector(0, (1/2,1/3), (1,3)).straight_line_trajectory()
+            sage: v = w.tangent_vector(1, (1/3,1/2), (1,0)).straight_line_trajectory()
+            sage: h.flow(10); h.flow(-10)
+            sage: SegmentIndex(w, h).intersection_numbers(SegmentIndex(w, v))
+            (2, -2)
+        """
+        if other._s != self._s:
+            raise ValueError("the segments must belong to the same surface")
+
+        geometric = 0
+        algebraic = 0
+
+        # intersections in the interior of the polygons
+        for lab, A in self._chords.items():
+            B = other._chords.get(lab)
+            if B is None:
+                continue
+            n1, s1 = _count_alternating(A, B)
+            n2, s2 = _count_alternating(B, A)
+            geometric += n1 + n2
+            algebraic += s1 - s2
+
+        # intersections on the edges: they are counted once, in the polygon
+        # where both segments start
+        for (q, f, t), vectors in other._edge_starts.items():
+            glued = self._s.opposite_edge(q, f)
+            keys = [((q, f, t), None)]
+            if glued is not None and (glued != (q, f) or t != 1 - t):
+                p, e = glued
+                keys.append(((p, e, 1 - t), self._s.edge_matrix(q, f)))
+            for key, m in keys:
+                us = self._edge_starts.get(key)
+                if us is None:
+                    continue
+                for v in vectors:
+                    if m is not None:
+                        v = m * v
+                    for u in us:
+                        w = wedge_product(u, v)
+                        if w:
+                            geometric += 1
+                            algebraic += 1 if w > 0 else -1
+
+        return geometric, algebraic
+
+def intersection_numbers(a, b):
+    r"""
+    Return the pair ``(geometric, algebraic)`` made of the number of
+    intersections and the algebraic intersection number between ``a`` and
+    ``b``.
+
+    The arguments can be straight-line trajectories, saddle connections or
+    iterables of segments (e.g. the output of
+    :meth:`~flatsurf.geometry.straight_line_trajectory.AbstractStraightLineTrajectory.segment_iterator`).
+
+    EXAMPLES::
+
+        sage: from flatsurf import *
+        sage: from flatsurf.geometry.trajectory_intersection import intersection_numbers
+        sage: O = translation_surfaces.regular_octagon()
+        sage: sc = next(sc for sc in O.saddle_connections(16, 0, 0) if sc.holonomy()[1] > 0)
+        sage: sc
+        Saddle connection with holonomy (1/2*a + 1, 1/2*a) from (0, 0) to (0, 2)
+        sage: L = O.tangent_vector(0, (1,1/2), (1,0)).straight_line_trajectory()
+        sage: L.flow(10)
+        sage: intersection_numbers(L, sc)
+        (1, 1)
+        sage: intersection_numbers(sc, L)
+        (1, -1)
+    """
+    a = iter(_segments(a))
+    seg = next(a)
+    I = SegmentIndex(seg.start().surface())
+    I.add_segment(seg)
+    I.add_segments(a)
+    return I.intersection_numbers(SegmentIndex(I.surface(), b))
@@ -0,0 +1,230 @@
+r"""
+Statistics accumulated along straight-line trajectories.
+
+The accumulators are updated segment by segment and only store counters so
+that very long trajectories can be studied without being stored. They can be
+fed from :meth:`~flatsurf.geometry.straight_line_trajectory.StraightLineTrajectory.segment_iterator`
+or while flowing (see
+:meth:`~flatsurf.geometry.straight_line_trajectory.StraightLineTrajectory.flow`).
+
+EXAMPLES::
+
+    sage: from flatsurf import *
+    sage: from flatsurf.geometry.trajectory_statistics import TrajectoryStatistics
+    sage: s = translation_surfaces.mcmullen_L(1,1,1,1)
+    sage: v = s.tangent_vector(0, (1/2,1/3), (3,5))
+    sage: L = v.straight_line_trajectory()
+    sage: S = TrajectoryStatistics()
+    sage: S.add_trajectory(L, 100)
+    sage: S
+    Statistics of 100 segments
+    sage: S.polygon_hits()
+    {0: 64, 1: 36}
+    sage: S.total_time() == sum(S.polygon_times().values())
+    True
+"""
+
+from sage.structure.sage_object import SageObject
+
+class TrajectoryStatistics(SageObject):
+    r"""
+    Accumulator of statistics along straight-line trajectories.
+
+    The following quantities are recorded:
+
+    - the number of segments in each polygon (:meth:`polygon_hits`)
+
+    - the number of times each edge is crossed (:meth:`edge_hits`)
+
+    - the time spent in each polygon (:meth:`polygon_times`) where the time
+      spent in a segment is given by
+      :meth:`~flatsurf.geometry.straight_line_trajectory.SegmentInPolygon.duration`
+
+    - the integrals of the observables along the segments (:meth:`integrals`)
+
+    INPUT:
+
+    - ``observables`` -- an optional dictionary ``name -> f`` where ``f`` is a
+      function that takes a segment as argument and returns the integral of
+      the observable along this segment. For the statistics to be saved,
+      these functions must be picklable (e.g. defined at the top level of a
+      module).
+
+    EXAMPLES::
+
+        sage: from flatsurf import *
+        sage: from flatsurf.geometry.trajectory_statistics import TrajectoryStatistics
+        sage: t = translation_surfaces.square_torus()
+        sage: v = t.tangent_vector(0, (1/2,1/4), (1,2))
+        sage: def x_integral(seg):
+        ....:     return seg.duration() * (seg.start().point()[0] + seg.end().point()[0]) / 2
+        sage: S = TrajectoryStatistics({'x': x_integral})
+        sage: S.add_trajectory(v.straight_line_trajectory(), 30)
+        sage: S.edge_hits()
+        {(0, 1): 10, (0, 2): 20}
+        sage: S.total_time()
+        10
+        sage: S.time_averages()
+        {'x': 1/2}
+    """
+    def __init__(self, observables=None):
+        self._observables = {} if observables is None else dict(observables)
+        self._num_segments = 0
+        self._total_time = 0
+        self._polygon_hits = {}
+        self._edge_hits = {}
+        self._polygon_times = {}
+        self._integrals = {name: 0 for name in self._observables}
+
+    def _repr_(self):
+        return "Statistics of {} segments".format(self._num_segments)
+
+    def add_segment(self, seg):
+        r"""
+        Update the statistics with the segment ``seg``.
+        """
+        lab = seg.polygon_label()
+        t = seg.duration()
+        self._num_segments += 1
+        self._total_time += t
+        self._polygon_hits[lab] = self._polygon_hits.get(lab, 0) + 1
+        self._polygon_times[lab] = self._polygon_times.get(lab, 0) + t
+        pos = seg.end().position()
+        if pos.is_in_edge_interior():
+            e = (lab, pos.get_edge())
+            self._edge_hits[e] = self._edge_hits.get(e, 0) + 1
+        for name, f in self._observables.items():
+            self._integrals[name] += f(seg)
+
+    def add_segments(self, segments):
+        r"""
+        Update the statistics with each segment of the iterable ``segments``.
+        """
+        for seg in segments:
+            self.add_segment(seg)
+
+    def add_trajectory(self, trajectory, steps=None):
+        r"""
+        Update the statistics with the first ``steps`` segments of the forward
+        trajectory starting from the first segment of ``trajectory``.
+
+        The segments are produced while flowing and are not stored in
+        ``trajectory``.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: from flatsurf.geometry.trajectory_statistics import TrajectoryStatistics
+            sage: O = translation_surfaces.regular_octagon()
+            sage: L = O.tangent_vector(0, (1,1), (33,45)).straight_line_trajectory()
+            sage: S = TrajectoryStatistics()
+            sage: S.add_trajectory(L, 1000)
+            sage: S.num_segments()
+            1000
+            sage: L.combinatorial_length()
+            1
+        """
+        self.add_segments(trajectory.segment_iterator(steps))
+
+    def num_segments(self):
+        r"""
+        Return the number of segments.
+        """
+        return self._num_segments
+
+    def total_time(self):
+        r"""
+        Return the total time spent along the segments.
+        """
+        return self._total_time
+
+    def polygon_hits(self):
+        r"""
+        Return the dictionary ``label -> number of segments in the polygon``.
+        """
+        return self._polygon_hits
+
+    def edge_hits(self):
+        r"""
+        Return the dictionary ``(label, edge) -> number of crossings``.
+
+        A segment crossing an edge is counted in the polygon that it leaves.
+        """
+        return self._edge_hits
+
+    def polygon_times(self):
+        r"""
+        Return the dictionary ``label -> time spent in the polygon``.
+        """
+        return self._polygon_times
+
+    def integrals(self):
+        r"""
+        Return the dictionary ``name -> integral of the observable``.
+        """
+        return self._integrals
+
+    def visit_frequencies(self):
+        r"""
+        Return the dictionary ``label -> proportion of time spent in the
+        polygon``.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: from flatsurf.geometry.trajectory_statistics import TrajectoryStatistics
+            sage: s = translation_surfaces.mcmullen_L(1,1,1,1)
+            sage: v = s.tangent_vector(0, (1/2,1/3), (3,5))
+            sage: S = TrajectoryStatistics()
+            sage: S.add_trajectory(v.straight_line_trajectory(), 100)
+            sage: S.visit_frequencies()
+            {0: 49/72, 1: 23/72}
+        """
+        T = self._total_time
+        return {lab: t / T for lab, t in self._polygon_times.items()}
+
+    def time_averages(self):
+        r"""
+        Return the dictionary ``name -> time average of the observable``.
+        """
+        T = self._total_time
+        return {name: x / T for name, x in self._integrals.items()}
+
+    def merge(self, other):
+        r"""
+        Return the statistics obtained by accumulating both ``self`` and
+        ``other``.
+
+        The observables of both statistics must have the same names.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: from flatsurf.geometry.trajectory_statistics import TrajectoryStatistics
+            sage: s = translation_surfaces.mcmullen_L(1,1,1,1)
+            sage: L1 = s.tangent_vector(0, (1/2,1/3), (3,5)).straight_line_trajectory()
+            sage: L2 = s.tangent_vector(1, (1/2,1/3), (5,3)).straight_line_trajectory()
+            sage: S1 = TrajectoryStatistics()
+            sage: S1.add_trajectory(L1, 100)
+            sage: S2 = TrajectoryStatistics()
+            sage: S2.add_trajectory(L2, 50)
+            sage: S = S1 + S2
+            sage: S
+            Statistics of 150 segments
+            sage: S.polygon_hits() == {lab: S1.polygon_hits().get(lab,0) + S2.polygon_hits().get(lab,0) for lab in (0,1)}
+            True
+        """
+        if set(self._observables) != set(other._observables):
+            raise ValueError("the statistics do not have the same observables")
+        S = TrajectoryStatistics(self._observables)
+        S._num_segments = self._num_segments + other._num_segments
+        S._total_time = self._total_time + other._total_time
+        for d, d1, d2 in [(S._polygon_hits, self._polygon_hits, other._polygon_hits),
+                          (S._edge_hits, self._edge_hits, other._edge_hits),
+                          (S._polygon_times, self._polygon_times, other._polygon_times),
+                          (S._integrals, self._integrals, other._integrals)]:
+            for k in set(d1).union(d2):
+                d[k] = d1.get(k, 0) + d2.get(k, 0)
+        return S
+
+    __add__ = merge
@@ -3,7 +3,9 @@ Translation Surfaces.
 """
 from sage.misc.cachefunc import cached_method
 
-from flatsurf.geometry.surface import Surface
+from copy import copy
+
+from flatsurf.geometry.surface import Surface, Surface_polygons_and_gluings
 from flatsurf.geometry.half_translation_surface import HalfTranslationSurface 
 from flatsurf.geometry.dilation_surface import DilationSurface
 
@@ -33,14 +35,37 @@ class TranslationSurface(HalfTranslationSurface, DilationSurface):
         for lab in it:
             p = self.polygon(lab)
             for e in xrange(p.num_edges()):
-                tester.assertTrue(self.edge_matrix(lab,e).is_one())
+                if self.opposite_edge(lab,e) is not None:
+                    tester.assertTrue(self.edge_matrix(lab,e).is_one())
 
     def edge_matrix(self, p, e=None):
+        r"""
+        Return the identity matrix.
+
+        The same immutable matrix is returned for all edges. A
+        ``ValueError`` is raised for a free edge.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: O = translation_surfaces.regular_octagon()
+            sage: O.edge_matrix(0,3)
+            [1 0]
+            [0 1]
+            sage: O.edge_matrix(0,3) is O.edge_matrix(0,5)
+            True
+        """
         if e is None:
             p,e = p
         if e < 0 or e >= self.polygon(p).num_edges():
             raise ValueError
-        return identity_matrix(self.base_ring(),2)
+        self._glued_edge(p,e)
+        try:
+            return self._identity
+        except AttributeError:
+            self._identity = identity_matrix(self.base_ring(),2)
+            self._identity.set_immutable()
+        return self._identity
 
     def stratum(self):
         r"""
@@ -56,6 +81,26 @@ class TranslationSurface(HalfTranslationSurface, DilationSurface):
 
     #angles = ConeSurface_generic.angles
 
+    def cylinder_decomposition(self, direction, limit=None):
+        r"""
+        Return the list of cylinders of this surface in the completely
+        periodic direction ``direction``.
+
+        See :func:`~flatsurf.geometry.cylinder.cylinder_decomposition`.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: O = translation_surfaces.regular_octagon()
+            sage: C = O.cylinder_decomposition((1,0))
+            sage: [c.holonomy() for c in C]
+            [(a + 2, 0), (a + 1, 0)]
+            sage: [c.labels() for c in C]
+            [[0, 0], [0]]
+        """
+        from flatsurf.geometry.cylinder import cylinder_decomposition
+        return cylinder_decomposition(self, direction, limit)
+
     def canonicalize_mapping(self):
         r"""
         Return a SurfaceMapping canonicalizing this translation surface.
@@ -93,9 +138,151 @@ class TranslationSurface(HalfTranslationSurface, DilationSurface):
 class MinimalTranslationCover(Surface):
     r"""
     We label copy by cartesian product (polygon from bot, matrix).
+
+    The matrices are interned: a label is a pair ``(label, i)`` where ``i``
+    is the index of the matrix in the list of the monodromy matrices met so
+    far (see :meth:`monodromy_matrix`) and the products of the edge matrices
+    with these matrices are cached. If the surface is a finite rational cone
+    surface, the monodromy group is finite and it is computed together with
+    the products of its elements by the edge matrices once for all when the
+    cover is built.
+
+    The copies of the free edges of the surface (see
+    :meth:`~flatsurf.geometry.similarity_surface.SimilaritySurface.window`)
+    are free edges of the cover.
+
+    EXAMPLES::
+
+        sage: from flatsurf import *
+        sage: from flatsurf.geometry.translation_surface import MinimalTranslationCover
+        sage: S = similarity_surfaces.example()
+        sage: M = MinimalTranslationCover(S)
+        sage: M.base_label()
+        (0, 0)
+        sage: M.opposite_edge((0,0), 0)
+        ((1, 1), 1)
+        sage: M.monodromy_matrix(1)
+        [ 4/5 -2/5]
+        [ 2/5  4/5]
+        sage: M.num_monodromy_matrices()
+        2
+
+        sage: P = polygons(vertices=[(0,0), (1,0), (0,1)])
+        sage: from flatsurf.geometry.rational_cone_surface import RationalConeSurface
+        sage: Q = RationalConeSurface(similarity_surfaces.billiard(P))
+        sage: M = MinimalTranslationCover(Q)
+        sage: M.num_monodromy_matrices()
+        4
+
+        sage: M = MinimalTranslationCover(S.window(0))
+        sage: M.opposite_edge((0,0), 0) is None
+        True
     """
     def __init__(self, similarity_surface):
         self._ss = similarity_surface
+        I = identity_matrix(self.base_ring(), 2)
+        I.set_immutable()
+        self._matrices = [I]
+        self._matrix_ids = {I: 0}
+        # (label, edge) -> index of the inverse of the edge matrix
+        self._edge_ids = {}
+        # (index of an edge matrix, index of a matrix) -> index of the product
+        self._products = {}
+
+        if self.is_finite():
+            self._compute_monodromy_group()
+
+    def _intern(self, m):
+        r"""
+        Return the index of the matrix ``m`` in the list of monodromy
+        matrices, adding it if needed.
+        """
+        m.set_immutable()
+        try:
+            return self._matrix_ids[m]
+        except KeyError:
+            i = self._matrix_ids[m] = len(self._matrices)
+            self._matrices.append(m)
+            return i
+
+    def _edge_id(self, p, e):
+        r"""
+        Return the index of the inverse of the matrix of the edge ``e`` of the
+        polygon ``p`` of the underlying surface.
+        """
+        try:
+            return self._edge_ids[(p,e)]
+        except KeyError:
+            a = self._edge_ids[(p,e)] = self._intern(~self._ss.edge_matrix(p,e))
+            return a
+
+    def _product(self, a, i):
+        r"""
+        Return the index of the product of the matrices of indices ``a`` and
+        ``i``.
+        """
+        try:
+            return self._products[(a,i)]
+        except KeyError:
+            j = self._products[(a,i)] = self._intern(self._matrices[a] * self._matrices[i])
+            return j
+
+    def _compute_monodromy_group(self):
+        r"""
+        Compute the monodromy group of a finite surface and the products of
+        its elements by the edge matrices.
+        """
+        generators = set(self._edge_id(p,e)
+                         for p,poly in self._ss.label_polygon_iterator()
+                         for e in range(poly.num_edges())
+                         if self._ss.opposite_edge(p,e) is not None)
+        todo = [0]
+        seen = set(todo)
+        while todo:
+            i = todo.pop()
+            for a in generators:
+                j = self._product(a,i)
+                if j not in seen:
+                    seen.add(j)
+                    todo.append(j)
+
+    def monodromy_matrix(self, i):
+        r"""
+        Return the monodromy matrix of index ``i``.
+        """
+        return self._matrices[i]
+
+    def monodromy_index(self, m):
+        r"""
+        Return the index of the monodromy matrix ``m``.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: from flatsurf.geometry.translation_surface import MinimalTranslationCover
+            sage: from flatsurf.geometry.rational_cone_surface import RationalConeSurface
+            sage: P = polygons(vertices=[(0,0), (1,0), (0,1)])
+            sage: M = MinimalTranslationCover(RationalConeSurface(similarity_surfaces.billiard(P)))
+            sage: M.monodromy_index(matrix([[0,1],[-1,0]]))
+            1
+            sage: M.monodromy_index(matrix([[2,0],[0,1]]))
+            Traceback (most recent call last):
+            ...
+            ValueError: the matrix is not a monodromy matrix of the cover
+        """
+        if m.is_mutable():
+            m = copy(m)
+            m.set_immutable()
+        try:
+            return self._matrix_ids[m]
+        except KeyError:
+            raise ValueError("the matrix is not a monodromy matrix of the cover")
+
+    def num_monodromy_matrices(self):
+        r"""
+        Return the number of monodromy matrices met so far.
+        """
+        return len(self._matrices)
 
     def is_finite(self):
         if not self._ss.is_finite():
@@ -107,21 +294,123 @@ class MinimalTranslationCover(Surface):
         return self._ss.base_ring()
 
     def base_label(self):
-        from sage.matrix.constructor import identity_matrix
-        I = identity_matrix(self.base_ring(),2)
-        I.set_immutable()
-        return (self._ss.base_label(), I)
+        return (self._ss.base_label(), 0)
 
     def polygon(self, lab):
-        return lab[1] * self._ss.polygon(lab[0])
+        return self._matrices[lab[1]] * self._ss.polygon(lab[0])
 
     def opposite_edge(self, p, e):
-        pp,m = p  # this is the polygon m * ss.polygon(p)
-        p2,e2 = self._ss.opposite_edge(pp,e)
-        me = self._ss.edge_matrix(pp,e)
-        mm = ~me * m
-        mm.set_immutable()
-        return ((p2,mm),e2)
+        pp,i = p  # this is the polygon m * ss.polygon(p)
+        glued = self._ss.opposite_edge(pp,e)
+        if glued is None:
+            # the copies of a free edge are free
+            return None
+        p2,e2 = glued
+        return ((p2, self._product(self._edge_id(pp,e), i)), e2)
+
+class FiniteMinimalTranslationCover(Surface_polygons_and_gluings):
+    r"""
+    The minimal translation cover of a finite rational cone surface stored as
+    a list of polygons and gluings.
+
+    The cover is explored once from its base label. The polygons are labeled
+    by ``0, 1, ...`` in the order of this exploration and the labels of the
+    lazy cover (see :class:`MinimalTranslationCover`) can be recovered with
+    :meth:`cover_label`.
+
+    INPUT:
+
+    - ``surface`` -- a finite rational cone surface or its
+      :class:`MinimalTranslationCover`
+
+    EXAMPLES::
+
+        sage: from flatsurf import *
+        sage: from flatsurf.geometry.translation_surface import FiniteMinimalTranslationCover
+        sage: from flatsurf.geometry.rational_cone_surface import RationalConeSurface
+        sage: P = polygons(vertices=[(0,0), (1,0), (0,1)])
+        sage: Q = RationalConeSurface(similarity_surfaces.billiard(P))
+        sage: C = FiniteMinimalTranslationCover(Q)
+        sage: C.num_polygons()
+        8
+        sage: C.opposite_edge(0, 0)
+        (1, 2)
+        sage: C.cover_label(1)
+        (1, [ 0  1]
+        [-1  0])
+        sage: C.label(*C.cover_label(5))
+        5
+    """
+    def __init__(self, surface):
+        if isinstance(surface, MinimalTranslationCover):
+            cover = surface
+        else:
+            cover = MinimalTranslationCover(surface)
+        if not cover.is_finite():
+            raise ValueError("the minimal translation cover must be finite")
+
+        labels = [cover.base_label()]
+        label_ids = {labels[0]: 0}
+        polygons = [cover.polygon(labels[0])]
+        gluings = {}
+        i = 0
+        while i < len(labels):
+            for e in range(polygons[i].num_edges()):
+                ll,ee = cover.opposite_edge(labels[i], e)
+                if ll not in label_ids:
+                    label_ids[ll] = len(labels)
+                    labels.append(ll)
+                    polygons.append(cover.polygon(ll))
+                gluings[(i,e)] = (label_ids[ll], ee)
+            i += 1
+
+        Surface_polygons_and_gluings.__init__(self, polygons, gluings)
+        self._cover = cover
+        self._cover_labels = labels
+        self._label_ids = label_ids
+
+    def num_polygons(self):
+        return len(self._cover_labels)
+
+    def cover_label(self, lab):
+        r"""
+        Return the pair ``(label, matrix)`` made of the label of the polygon
+        of the covered surface and the monodromy matrix that correspond to
+        the polygon ``lab``.
+        """
+        p,i = self._cover_labels[lab]
+        return (p, self._cover.monodromy_matrix(i))
+
+    def label(self, label, matrix):
+        r"""
+        Return the label of the polygon that corresponds to the polygon
+        ``label`` of the covered surface and to the monodromy matrix
+        ``matrix``.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: from flatsurf.geometry.translation_surface import FiniteMinimalTranslationCover
+            sage: from flatsurf.geometry.rational_cone_surface import RationalConeSurface
+            sage: P = polygons(vertices=[(0,0), (1,0), (0,1)])
+            sage: C = FiniteMinimalTranslationCover(RationalConeSurface(similarity_surfaces.billiard(P)))
+            sage: C.label(0, matrix([[-1,0],[0,-1]]))
+            4
+            sage: C.label(0, matrix([[2,0],[0,1]]))
+            Traceback (most recent call last):
+            ...
+            ValueError: the matrix is not a monodromy matrix of the cover
+            sage: C.label(2, identity_matrix(2))
+            Traceback (most recent call last):
+            ...
+            ValueError: no polygon of the cover corresponds to (2, [1 0]
+            [0 1])
+        """
+        lab = (label, self._cover.monodromy_index(matrix))
+        try:
+            return self._label_ids[lab]
+        except KeyError:
+            raise ValueError("no polygon of the cover corresponds to {}".format((label, matrix)))
 
 class AbstractOrigami(Surface):
     r'''Abstract base class for origamis.
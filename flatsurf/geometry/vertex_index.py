@@ -0,0 +1,195 @@
+r"""
+Singularities of finite similarity surfaces.
+
+The vertices of the polygons of a surface are identified by the gluings. A
+:class:`VertexIndex` computes these identifications once: each corner
+``(label, vertex)`` gets the number of the singularity it belongs to and the
+corners around each singularity are stored in counterclockwise order. The
+total angles are computed only when they are asked for and only once per
+singularity. The surface may have free edges (see
+:class:`~flatsurf.geometry.surface_window.SurfaceWindow`).
+
+EXAMPLES::
+
+    sage: from flatsurf import *
+    sage: O = translation_surfaces.regular_octagon()
+    sage: I = O.vertex_index()
+    sage: I
+    Index of 1 singularities of TranslationSurface built from 1 polygon
+    sage: I.link(0)
+    [(0, 0), (0, 3), (0, 6), (0, 1), (0, 4), (0, 7), (0, 2), (0, 5)]
+    sage: I.angle(0)
+    3
+"""
+
+from sage.structure.sage_object import SageObject
+
+class VertexIndex(SageObject):
+    r"""
+    The singularities of a finite similarity surface.
+
+    The singularities are numbered in the order in which they are met when
+    the polygons are visited in the order of the label walker (see
+    :meth:`~flatsurf.geometry.similarity_surface.SimilaritySurface.label_walker`).
+
+    INPUT:
+
+    - ``surface`` -- a finite similarity surface
+
+    EXAMPLES::
+
+        sage: from flatsurf import *
+        sage: from flatsurf.geometry.vertex_index import VertexIndex
+        sage: s = translation_surfaces.mcmullen_L(1,1,1,1)
+        sage: I = VertexIndex(s)
+        sage: I.num_singularities()
+        1
+        sage: I.angles()
+        [3]
+        sage: I.singularity(1, 2)
+        0
+        sage: I.vertex_array()
+        [[0, 0, 0, 0, 0, 0], [0, 0, 0, 0]]
+
+        sage: S = SymmetricGroup(2)
+        sage: t = translation_surfaces.origami(S('(1,2)'), S('()'))
+        sage: I = VertexIndex(t)
+        sage: I.num_singularities()
+        2
+        sage: I.angles()
+        [1, 1]
+        sage: I.vertex_array()
+        [[0, 1, 1, 0], [1, 0, 0, 1]]
+    """
+    def __init__(self, surface):
+        if not surface.is_finite():
+            raise ValueError("the surface must be finite")
+        self._s = surface
+        self._singularity = {}
+        self._links = []
+        self._angles = []
+        self._boundary = set()
+        self._labels = []
+        for label in surface.label_iterator():
+            self._labels.append(label)
+            n = surface.polygon(label).num_edges()
+            for v in range(n):
+                if (label, v) in self._singularity:
+                    continue
+                i = len(self._links)
+                link = []
+                p,e = label,v
+                boundary = False
+                while True:
+                    self._singularity[(p,e)] = i
+                    link.append((p,e))
+                    glued = surface.opposite_edge(p, (e-1) % surface.polygon(p).num_edges())
+                    if glued is None:
+                        boundary = True
+                        break
+                    p,e = glued
+                    if p == label and e == v:
+                        break
+                if boundary:
+                    # complete the link clockwise from (label, v)
+                    p,e = label,v
+                    while True:
+                        glued = surface.opposite_edge(p, e)
+                        if glued is None:
+                            break
+                        p,e = glued
+                        e = (e+1) % surface.polygon(p).num_edges()
+                        self._singularity[(p,e)] = i
+                        link.insert(0, (p,e))
+                    self._boundary.add(i)
+                self._links.append(link)
+                self._angles.append(None)
+
+    def _repr_(self):
+        return "Index of {} singularities of {}".format(len(self._links), self._s)
+
+    def surface(self):
+        r"""
+        Return the underlying surface.
+        """
+        return self._s
+
+    def num_singularities(self):
+        r"""
+        Return the number of singularities (including the regular points
+        that are vertices of the polygons).
+        """
+        return len(self._links)
+
+    def singularity(self, label, vertex):
+        r"""
+        Return the number of the singularity at the vertex ``vertex`` of the
+        polygon ``label``.
+        """
+        return self._singularity[(label, vertex)]
+
+    def is_boundary(self, i):
+        r"""
+        Return whether the singularity ``i`` is on a free edge (see
+        :class:`~flatsurf.geometry.surface_window.SurfaceWindow`).
+
+        The link of such a singularity starts and ends at a free edge and
+        its angle only accounts for the polygons of the surface.
+        """
+        return i in self._boundary
+
+    def link(self, i):
+        r"""
+        Return the list of corners ``(label, vertex)`` around the
+        singularity ``i`` in counterclockwise order.
+
+        Each corner is followed by the corner on the other side of the edge
+        that ends at it.
+
+        EXAMPLES::
+
+            sage: from flatsurf import *
+            sage: s = translation_surfaces.mcmullen_L(1,1,1,1)
+            sage: I = s.vertex_index()
+            sage: I.link(0)
+            [(0, 0),
+             (0, 2),
+             (0, 3),
+             (0, 5),
+             (1, 0),
+             (1, 1),
+             (0, 4),
+             (0, 1),
+             (1, 2),
+             (1, 3)]
+        """
+        return list(self._links[i])
+
+    def angle(self, i):
+        r"""
+        Return the total angle around the singularity ``i`` divided by `2\pi`.
+
+        The angle is computed the first time it is asked for.
+        """
+        a = self._angles[i]
+        if a is None:
+            a = sum(self._s.polygon(p).angle(e) for p,e in self._links[i])
+            self._angles[i] = a
+        return a
+
+    def angles(self):
+        r"""
+        Return the list of the total angles around the singularities divided
+        by `2\pi`.
+        """
+        return [self.angle(i) for i in range(len(self._links))]
+
+    def vertex_array(self):
+        r"""
+        Return the list whose ``n``-th entry is the list of the singularities
+        at the vertices of the ``n``-th polygon in the order of the label
+        walker.
+        """
+        s = self._s
+        return [[self._singularity[(label, v)] for v in range(s.polygon(label).num_edges())]
+                for label in self._labels]
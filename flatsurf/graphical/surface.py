@@ -128,14 +128,22 @@ class GraphicalSurface:
             sage: g.make_all_visible(adjacent=False)
             sage: g.plot()
             Graphics object consisting of 16 graphics primitives
+
+        The free edges of a window are not crossed::
+
+            sage: w = translation_surfaces.infinite_staircase1().window(1)
+            sage: g = w.graphical_surface(cached=False, edge_labels='gluings and number')
+            sage: g.make_all_visible()
+            sage: g.plot()
+            Graphics object consisting of 28 graphics primitives
         """
         if limit is None:
             assert self._ss.is_finite()
             if adjacent:
                 for l,poly in self._ss.label_polygon_iterator():
                     for e in range(poly.num_edges()):
-                        l2,e2 = self._ss.opposite_edge(l,e)
-                        if not self.is_visible(l2):
+                        glued = self._ss.opposite_edge(l,e)
+                        if glued is not None and not self.is_visible(glued[0]):
                             self.make_adjacent_and_visible(l,e)
             else:
                 from flatsurf.geometry.translation import TranslationGroup
@@ -156,8 +164,8 @@ class GraphicalSurface:
                 i = 0
                 for l,poly in self._ss.label_polygon_iterator():
                     for e in range(poly.num_edges()):
-                        l2,e2 = self._ss.opposite_edge(l,e)
-                        if not self.is_visible(l2):
+                        glued = self._ss.opposite_edge(l,e)
+                        if glued is not None and not self.is_visible(glued[0]):
                             self.make_adjacent_and_visible(l,e)
                             i=i+1
                             if i>=limit:
@@ -289,7 +297,11 @@ class GraphicalSurface:
             sage: g.is_adjacent(0,1)
             False
         """
-        pp,ee = self.opposite_edge(p,e)
+        glued = self.opposite_edge(p,e)
+        if glued is None:
+            # free edge
+            return False
+        pp,ee = glued
         if not self.is_visible(pp):
             return False
         g = self.graphical_polygon(p)
@@ -347,17 +359,17 @@ class GraphicalSurface:
         if self._edge_labels == 'gluings':
             ans = []
             for e in range(p.num_edges()):
-                if self.is_adjacent(lab, e):
+                glued = s.opposite_edge(lab,e)
+                if glued is None or self.is_adjacent(lab, e):
                     ans.append(None)
                 else: 
-                    llab,ee = s.opposite_edge(lab,e)
-                    ans.append(str(llab))
+                    ans.append(str(glued[0]))
         elif self._edge_labels == 'number':
             ans = map(str, range(p.num_edges()))
         elif self._edge_labels == 'gluings and number':
             ans = []
             for e in range(p.num_edges()):
-                if self.is_adjacent(lab, e):
+                if self.is_adjacent(lab, e) or s.opposite_edge(lab,e) is None:
                     ans.append(str(e))
                 else:
                     ans.append("{} -> {}".format(e, s.opposite_edge(lab,e)))